@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 
-from auth import get_auth_service
+from auth import get_auth_service, get_current_user
 from core.config import get_settings
+from core.password_hasher import PasswordHasherBusyError
+from core.security import Principal
+from database import run_db
 from schemas import RefreshRequest, TokenResponse
 from services.auth_service import AuthService, AuthenticationError, RefreshTokenError
 
@@ -10,14 +13,20 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     auth_service: AuthService = Depends(get_auth_service),
 ) -> TokenResponse:
     try:
-        result = auth_service.authenticate(form_data.username, form_data.password)
+        result = await auth_service.authenticate(form_data.username, form_data.password)
     except AuthenticationError as exc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(exc)) from exc
+    except PasswordHasherBusyError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+            headers={"Retry-After": "1"},
+        ) from exc
 
     settings = get_settings()
     return TokenResponse(
@@ -30,12 +39,12 @@ def login(
 
 
 @router.post("/refresh", response_model=TokenResponse)
-def refresh_token(
+async def refresh_token(
     payload: RefreshRequest,
     auth_service: AuthService = Depends(get_auth_service),
 ) -> TokenResponse:
     try:
-        result = auth_service.refresh(payload.refresh_token)
+        result = await run_db(auth_service.refresh, payload.refresh_token)
     except RefreshTokenError as exc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(exc)) from exc
 
@@ -47,3 +56,11 @@ def refresh_token(
         expires_in=settings.access_token_exp_minutes * 60,
         refresh_expires_in=settings.refresh_token_exp_minutes * 60,
     )
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    current_user: Principal = Depends(get_current_user),
+    auth_service: AuthService = Depends(get_auth_service),
+) -> None:
+    await run_db(auth_service.revoke_user_sessions, current_user.id)
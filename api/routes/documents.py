@@ -1,42 +1,256 @@
-from io import BytesIO
+from typing import List, Optional
+from urllib.parse import quote
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
-from fastapi.responses import StreamingResponse
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from auth import get_current_user, get_document_service
-from models import User
-from schemas import DocumentOut
-from services.document_service import DocumentNotFoundError, DocumentService
+from core.config import get_settings
+from core.http_caching import (
+    RangeNotSatisfiableError,
+    format_http_date,
+    if_range_matches,
+    is_not_modified,
+    iter_byte_range,
+    parse_range,
+    representation_etag,
+)
+from core.security import Principal
+from database import run_db
+from schemas import DocumentExportRequest, DocumentMetaOut, DocumentOut, DocumentPage
+from services.document_service import (
+    DocumentNotFoundError,
+    DocumentService,
+    DocumentTooLargeError,
+    InvalidBatchError,
+    InvalidCursorError,
+    QuotaExceededError,
+)
+from storage.compression import accepts_encoding
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
 
+def _attachment_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
 @router.post("", response_model=DocumentOut, status_code=status.HTTP_201_CREATED)
 async def upload_document(
     file: UploadFile = File(...),
     uri: str = Form(...),
     document_service: DocumentService = Depends(get_document_service),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> DocumentOut:
-    document = await document_service.save_upload(file=file, uri=uri)
+    try:
+        document = await document_service.save_upload(file=file, uri=uri, owner_id=current_user.id)
+    except DocumentTooLargeError as exc:
+        raise HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=str(exc)) from exc
+    except QuotaExceededError as exc:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(exc)) from exc
     return document
 
 
-@router.get("/{document_id}")
-def download_document(
+@router.post("/batch", response_model=List[DocumentOut], status_code=status.HTTP_201_CREATED)
+async def upload_documents(
+    files: List[UploadFile] = File(...),
+    uris: List[str] = Form(..., alias="uri"),
+    document_service: DocumentService = Depends(get_document_service),
+    current_user: Principal = Depends(get_current_user),
+) -> List[DocumentOut]:
+    try:
+        return await document_service.save_batch(files, uris, owner_id=current_user.id)
+    except InvalidBatchError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except DocumentTooLargeError as exc:
+        raise HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=str(exc)) from exc
+    except QuotaExceededError as exc:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(exc)) from exc
+
+
+@router.post("/export")
+async def export_documents(
+    payload: DocumentExportRequest,
+    document_service: DocumentService = Depends(get_document_service),
+    current_user: Principal = Depends(get_current_user),
+) -> StreamingResponse:
+    try:
+        documents = await document_service.get_documents(payload.ids, current_user.id)
+    except InvalidBatchError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except DocumentNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+    # the archive is produced entry by entry while the response is being sent
+    return StreamingResponse(
+        document_service.export_archive(documents),
+        media_type="application/zip",
+        headers={"Content-Disposition": _attachment_disposition("documents.zip")},
+    )
+
+
+@router.get("", response_model=DocumentPage)
+async def list_documents(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    uri_prefix: Optional[str] = None,
+    mime_type: Optional[str] = None,
+    document_service: DocumentService = Depends(get_document_service),
+    current_user: Principal = Depends(get_current_user),
+) -> DocumentPage:
+    try:
+        page = await run_db(
+            document_service.list_documents,
+            limit=limit,
+            cursor=cursor,
+            uri_prefix=uri_prefix,
+            mime_type=mime_type,
+            owner_id=current_user.id,
+        )
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    return DocumentPage(
+        items=[DocumentMetaOut.model_validate(document) for document in page.items],
+        next_cursor=page.next_cursor,
+    )
+
+
+@router.get("/{document_id}/meta", response_model=DocumentMetaOut)
+async def get_document_meta(
+    document_id: int,
+    document_service: DocumentService = Depends(get_document_service),
+    current_user: Principal = Depends(get_current_user),
+) -> DocumentMetaOut:
+    try:
+        return await document_service.fetch_document(document_id, current_user.id)
+    except DocumentNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+
+@router.api_route("/{document_id}", methods=["GET", "HEAD"])
+async def download_document(
     document_id: int,
+    request: Request,
     document_service: DocumentService = Depends(get_document_service),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     try:
-        document = document_service.get_document(document_id=document_id)
+        document = await document_service.fetch_document(document_id, current_user.id)
+    except DocumentNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+    encoding = document_service.content_encoding(document)
+    passthrough = encoding is not None and accepts_encoding(
+        request.headers.get("accept-encoding"), encoding
+    )
+    headers = {
+        "ETag": representation_etag(document.blob_key, encoding if passthrough else None),
+        "Last-Modified": format_http_date(document.created_at),
+        "Cache-Control": get_settings().document_cache_control,
+    }
+    if encoding is not None:
+        headers["Vary"] = "Accept-Encoding"
+
+    # validators come from the row alone, so revalidation never touches the blob
+    if is_not_modified(request.headers, etag=headers["ETag"], last_modified=document.created_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if passthrough:
+        headers["Content-Encoding"] = encoding
+
+    serves_stored_bytes = encoding is None or passthrough
+    if request.method == "GET" and "range" not in request.headers and serves_stored_bytes:
+        content = await document_service.small_content(document)
+        if content is not None:
+            headers["Content-Disposition"] = _attachment_disposition(document.filename)
+            headers["Accept-Ranges"] = "bytes"
+            return Response(content, media_type=document.mime_type, headers=headers)
+
+    try:
+        path = await run_in_threadpool(document_service.content_path, document)
+    except DocumentNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+    # verified downloads are hashed as they stream, so they cannot be served straight
+    # from the file; ranges are partial and cannot be checked against the whole-file hash
+    verify = get_settings().download_verify_checksum and "range" not in request.headers
+    if path is not None and serves_stored_bytes and not verify:
+        # handles Range/If-Range against the stored, possibly compressed, representation.
+        # uvicorn does not offer http.response.pathsend, so Starlette reads the file in
+        # 64 KiB chunks on a worker thread; nothing here uses sendfile
+        return FileResponse(
+            path,
+            media_type=document.mime_type,
+            filename=document.filename,
+            content_disposition_type="attachment",
+            headers=headers,
+        )
+
+    headers["Content-Disposition"] = _attachment_disposition(document.filename)
+    headers["Accept-Ranges"] = "bytes"
+    size = document.blob.stored_size_bytes if passthrough else document.size_bytes
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header and if_range_matches(
+        request.headers, etag=headers["ETag"], last_modified=document.created_at
+    ):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiableError as exc:
+            headers["Content-Range"] = str(exc)
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, headers=headers
+            )
+
+    status_code = status.HTTP_200_OK
+    headers["Content-Length"] = str(size)
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+    if request.method == "HEAD":
+        return Response(status_code=status_code, media_type=document.mime_type, headers=headers)
+
+    try:
+        content = await run_in_threadpool(
+            document_service.open_content, document, decode=not passthrough
+        )
     except DocumentNotFoundError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
+    if byte_range is not None:
+        # decompressed content has no seekable offsets, so the bytes before the
+        # range are decoded and skipped
+        content = iter_byte_range(content, *byte_range)
     return StreamingResponse(
-        BytesIO(document.file_bytes),
-        media_type=document.mime_type,
-        headers={
-            "Content-Disposition": f'attachment; filename="{document.filename}"'
-        },
+        content, status_code=status_code, media_type=document.mime_type, headers=headers
     )
+
+
+@router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_document(
+    document_id: int,
+    document_service: DocumentService = Depends(get_document_service),
+    current_user: Principal = Depends(get_current_user),
+) -> None:
+    try:
+        await run_db(document_service.delete_document, document_id, current_user.id)
+    except DocumentNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
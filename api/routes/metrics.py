@@ -0,0 +1,148 @@
+import secrets
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+import database
+from core.admission import get_admission_controller
+from core.config import get_settings
+from core.document_cache import get_document_cache
+from core.instrumentation import get_metrics_registry
+from core.metrics import format_counter, format_gauge, format_histogram
+from core.password_hasher import get_password_hasher
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+POOL_GAUGES = ("size", "checked_out", "checked_in", "overflow")
+POOL_CONNECTION_AGE_GAUGES = {
+    "count": ("db_pool_connections", "Open connections in the pool"),
+    "max": ("db_pool_connection_age_max_seconds", "Age of the oldest open connection"),
+    "avg": ("db_pool_connection_age_avg_seconds", "Average age of the open connections"),
+}
+PASSWORD_HASHER_COUNTERS = {
+    "completed": "password_hasher_completed_total",
+    "rejected": "password_hasher_rejected_total",
+    "queue_wait_seconds_total": "password_hasher_queue_wait_seconds_total",
+}
+DOCUMENT_CACHE_COUNTERS = ("hits", "misses", "evictions", "bypassed")
+
+metrics_bearer = HTTPBearer(auto_error=False)
+
+
+def require_metrics_token(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(metrics_bearer),
+) -> None:
+    expected = get_settings().metrics_token
+    if not expected:
+        return
+    supplied = credentials.credentials if credentials is not None else ""
+    if not secrets.compare_digest(supplied.encode("utf-8"), expected.encode("utf-8")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+router = APIRouter(
+    prefix="/metrics", tags=["metrics"], dependencies=[Depends(require_metrics_token)]
+)
+
+
+def _pool_metrics() -> List[str]:
+    gauges: Dict[str, List] = {}
+    counters: Dict[str, List] = {}
+    age_gauges: Dict[str, List] = {field: [] for field in POOL_CONNECTION_AGE_GAUGES}
+    checkout_waits: List = []
+    for name, (pool, metrics) in database.pools().items():
+        snapshot = metrics.snapshot(pool)
+        labels = (("pool", name),)
+        for field in POOL_GAUGES:
+            if field in snapshot:
+                gauges.setdefault(f"db_pool_{field}", []).append((labels, snapshot[field]))
+        for counter, value in snapshot["counters"].items():
+            counters.setdefault(f"db_pool_{counter}_total", []).append((labels, value))
+        for field, value in snapshot["connection_age_seconds"].items():
+            age_gauges[field].append((labels, value))
+        checkout_waits.append((labels, snapshot["checkout_wait_seconds"]))
+
+    lines: List[str] = []
+    for metric, values in sorted(gauges.items()):
+        lines.extend(format_gauge(metric, "Connection pool state", values))
+    for field, (metric, help_text) in POOL_CONNECTION_AGE_GAUGES.items():
+        lines.extend(format_gauge(metric, help_text, age_gauges[field]))
+    for metric, values in sorted(counters.items()):
+        lines.extend(format_counter(metric, "Connection pool events", values))
+    lines.extend(
+        format_histogram(
+            "db_pool_checkout_wait_seconds", "Time spent waiting for a connection", checkout_waits
+        )
+    )
+
+    if database.replica_set is not None:
+        replicas = database.replica_set.snapshot()
+        lines.extend(
+            format_gauge(
+                "db_replica_healthy",
+                "Whether the replica is in the read rotation",
+                [((("replica", replica["name"]),), int(replica["healthy"])) for replica in replicas],
+            )
+        )
+        lines.extend(
+            format_gauge(
+                "db_replica_lag_seconds",
+                "Replication lag at the last health check",
+                [
+                    ((("replica", replica["name"]),), replica["lag_seconds"])
+                    for replica in replicas
+                    if replica["lag_seconds"] is not None
+                ],
+            )
+        )
+    return lines
+
+
+@router.get("", response_class=PlainTextResponse)
+def prometheus_metrics() -> PlainTextResponse:
+    lines = get_metrics_registry().render()
+    lines.extend(_pool_metrics())
+    for field, value in asdict(get_password_hasher().stats()).items():
+        if field in PASSWORD_HASHER_COUNTERS:
+            help_text = "Password hashing totals"
+            lines.extend(format_counter(PASSWORD_HASHER_COUNTERS[field], help_text, [((), value)]))
+        else:
+            help_text = "Password hashing pool state"
+            lines.extend(format_gauge(f"password_hasher_{field}", help_text, [((), value)]))
+    for field, value in get_admission_controller().upload_gate.stats().items():
+        lines.extend(format_gauge(f"upload_gate_{field}", "Upload admission state", [((), value)]))
+    cache = get_document_cache()
+    if cache is not None:
+        for field, value in cache.stats().items():
+            if field in DOCUMENT_CACHE_COUNTERS:
+                name = f"document_cache_{field}_total"
+                lines.extend(format_counter(name, "Document cache totals", [((), value)]))
+            else:
+                name = f"document_cache_{field}"
+                lines.extend(format_gauge(name, "Document cache state", [((), value)]))
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/db-pool")
+def db_pool_metrics() -> Dict[str, Any]:
+    pools: Dict[str, Any] = {
+        name: metrics.snapshot(pool) for name, (pool, metrics) in database.pools().items()
+    }
+    if database.replica_set is not None:
+        pools["replicas"] = database.replica_set.snapshot()
+    return pools
+
+
+@router.get("/document-cache")
+def document_cache_metrics() -> Dict[str, Any]:
+    cache = get_document_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
@@ -0,0 +1,111 @@
+from fastapi import APIRouter, Depends, HTTPException, Path, Request, status
+
+from auth import get_current_user, get_upload_session_service
+from core.security import Principal
+from database import run_db
+from schemas import DocumentOut, UploadPartOut, UploadSessionCreate, UploadSessionOut
+from services.document_service import DocumentTooLargeError, QuotaExceededError
+from services.upload_session_service import (
+    InvalidUploadPartError,
+    UploadSessionNotFoundError,
+    UploadSessionService,
+    UploadSessionStateError,
+)
+
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+
+
+@router.post("", response_model=UploadSessionOut, status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    payload: UploadSessionCreate,
+    upload_service: UploadSessionService = Depends(get_upload_session_service),
+    current_user: Principal = Depends(get_current_user),
+) -> UploadSessionOut:
+    upload = await run_db(
+        upload_service.create_upload,
+        user_id=current_user.id,
+        filename=payload.filename,
+        mime_type=payload.mime_type,
+        uri=payload.uri,
+    )
+    return UploadSessionOut(
+        id=upload.id,
+        filename=upload.filename,
+        mime_type=upload.mime_type,
+        uri=upload.uri,
+        status=upload.status,
+        created_at=upload.created_at,
+        expires_at=upload.expires_at,
+    )
+
+
+@router.get("/{upload_id}", response_model=UploadSessionOut)
+async def get_upload(
+    upload_id: str,
+    upload_service: UploadSessionService = Depends(get_upload_session_service),
+    current_user: Principal = Depends(get_current_user),
+) -> UploadSessionOut:
+    try:
+        return await run_db(upload_service.get_upload, upload_id, current_user.id)
+    except UploadSessionNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+
+@router.put("/{upload_id}/parts/{part_number}", response_model=UploadPartOut)
+async def upload_part(
+    upload_id: str,
+    request: Request,
+    part_number: int = Path(...),
+    upload_service: UploadSessionService = Depends(get_upload_session_service),
+    current_user: Principal = Depends(get_current_user),
+) -> UploadPartOut:
+    try:
+        return await upload_service.upload_part(
+            upload_id, current_user.id, part_number, request.stream()
+        )
+    except UploadSessionNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except InvalidUploadPartError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except UploadSessionStateError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    except DocumentTooLargeError as exc:
+        raise HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=str(exc)) from exc
+    except QuotaExceededError as exc:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(exc)) from exc
+
+
+@router.post(
+    "/{upload_id}/complete", response_model=DocumentOut, status_code=status.HTTP_201_CREATED
+)
+async def complete_upload(
+    upload_id: str,
+    upload_service: UploadSessionService = Depends(get_upload_session_service),
+    current_user: Principal = Depends(get_current_user),
+) -> DocumentOut:
+    try:
+        return await upload_service.complete(upload_id, current_user.id)
+    except UploadSessionNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except InvalidUploadPartError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except UploadSessionStateError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    except DocumentTooLargeError as exc:
+        raise HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=str(exc)) from exc
+    except QuotaExceededError as exc:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(exc)) from exc
+
+
+@router.delete("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(
+    upload_id: str,
+    upload_service: UploadSessionService = Depends(get_upload_session_service),
+    current_user: Principal = Depends(get_current_user),
+) -> None:
+    try:
+        await upload_service.abort(upload_id, current_user.id)
+    except UploadSessionNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except UploadSessionStateError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
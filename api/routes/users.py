@@ -1,20 +1,46 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 
-from auth import get_user_service
-from schemas import UserCreate, UserOut
+from auth import get_current_user, get_document_service, get_user_service
+from core.config import get_settings
+from core.password_hasher import PasswordHasherBusyError
+from core.security import Principal
+from database import run_db
+from schemas import UsageOut, UserCreate, UserOut
+from services.document_service import DocumentService
 from services.user_service import UserAlreadyExistsError, UserService
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.post("", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-def create_user(
+async def create_user(
     payload: UserCreate,
     user_service: UserService = Depends(get_user_service),
 ) -> UserOut:
     try:
-        user = user_service.create_user(username=payload.username, password=payload.password)
+        user = await user_service.create_user(username=payload.username, password=payload.password)
     except UserAlreadyExistsError as exc:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    except PasswordHasherBusyError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+            headers={"Retry-After": "1"},
+        ) from exc
 
     return UserOut(id=user.id, username=user.username)
+
+
+@router.get("/me/usage", response_model=UsageOut)
+async def get_my_usage(
+    document_service: DocumentService = Depends(get_document_service),
+    current_user: Principal = Depends(get_current_user),
+) -> UsageOut:
+    usage = await run_db(document_service.get_usage, current_user.id)
+    settings = get_settings()
+    return UsageOut(
+        document_count=usage.document_count if usage is not None else 0,
+        total_bytes=usage.total_bytes if usage is not None else 0,
+        max_documents=settings.user_quota_max_documents or None,
+        max_bytes=settings.user_quota_max_bytes or None,
+    )
@@ -1,24 +1,47 @@
+from typing import AsyncIterator
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from database import SessionLocal
+from core.document_cache import get_document_cache
+from core.password_hasher import get_password_hasher
+from core.security import Principal
+from core.token_cache import get_access_token_cache
+from database import AsyncSessionLocal, SessionLocal, current_async_session, run_db
+from repositories.blob_repository import BlobRepository
 from repositories.document_repository import DocumentRepository
 from repositories.refresh_token_repository import RefreshTokenRepository
+from repositories.upload_session_repository import UploadSessionRepository
+from repositories.usage_repository import UsageRepository
 from repositories.user_repository import UserRepository
 from services.auth_service import AuthService, AuthenticationError
 from services.document_service import DocumentService
+from services.upload_session_service import UploadSessionService
 from services.user_service import UserService
+from storage.blob_store import get_blob_store
+from storage.part_store import get_part_store
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_db():
+async def get_db() -> AsyncIterator[Session]:
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as async_session:
+            # run_db goes through this session's run_sync
+            token = current_async_session.set(async_session)
+            try:
+                yield async_session.sync_session
+            finally:
+                current_async_session.reset(token)
+        return
+
     db: Session = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        await run_in_threadpool(db.close)
 
 
 def get_auth_service(db: Session = Depends(get_db)) -> AuthService:
@@ -26,22 +49,47 @@ def get_auth_service(db: Session = Depends(get_db)) -> AuthService:
         session=db,
         user_repository=UserRepository(db),
         refresh_token_repository=RefreshTokenRepository(db),
+        token_cache=get_access_token_cache(),
+        password_hasher=get_password_hasher(),
     )
 
 
 def get_document_service(db: Session = Depends(get_db)) -> DocumentService:
-    return DocumentService(session=db, document_repository=DocumentRepository(db))
+    return DocumentService(
+        session=db,
+        document_repository=DocumentRepository(db),
+        blob_repository=BlobRepository(db),
+        usage_repository=UsageRepository(db),
+        blob_store=get_blob_store(),
+        document_cache=get_document_cache(),
+    )
+
+
+def get_upload_session_service(
+    db: Session = Depends(get_db),
+    document_service: DocumentService = Depends(get_document_service),
+) -> UploadSessionService:
+    return UploadSessionService(
+        session=db,
+        upload_repository=UploadSessionRepository(db),
+        part_store=get_part_store(),
+        document_service=document_service,
+    )
 
 
 def get_user_service(db: Session = Depends(get_db)) -> UserService:
-    return UserService(session=db, user_repository=UserRepository(db))
+    return UserService(
+        session=db,
+        user_repository=UserRepository(db),
+        password_hasher=get_password_hasher(),
+    )
 
 
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
     auth_service: AuthService = Depends(get_auth_service),
-):
+) -> Principal:
     try:
-        return auth_service.resolve_user_from_token(token)
+        return await run_db(auth_service.resolve_principal_from_token, token)
     except AuthenticationError as exc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(exc)) from exc
@@ -0,0 +1,68 @@
+import argparse
+import json
+import sys
+from typing import Any, Dict
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def _change(before: float, after: float) -> float:
+    if before == 0:
+        return 0.0
+    return (after - before) / before
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="relative slowdown in p50 latency or throughput reported as a regression",
+    )
+    args = parser.parse_args(argv)
+
+    baseline = _load(args.baseline)
+    candidate = _load(args.candidate)
+    print(
+        f"baseline {baseline.get('git_revision')} ({baseline.get('database')})"
+        f" -> candidate {candidate.get('git_revision')} ({candidate.get('database')})"
+    )
+
+    names = [name for name in baseline["results"] if name in candidate["results"]]
+    width = max((len(name) for name in names), default=10)
+    print(f"{'benchmark':<{width}}  {'ops/s':>21}  {'p50 ms':>21}  {'p95 ms':>21}")
+
+    regressions = []
+    for name in names:
+        before, after = baseline["results"][name], candidate["results"][name]
+        throughput = _change(before["ops_per_second"], after["ops_per_second"])
+        p50 = _change(before["p50_ms"], after["p50_ms"])
+        p95 = _change(before["p95_ms"], after["p95_ms"])
+        regressed = throughput < -args.threshold or p50 > args.threshold
+        if regressed:
+            regressions.append(name)
+        print(
+            f"{name:<{width}}"
+            f"  {after['ops_per_second']:>12.1f} {throughput:>+8.1%}"
+            f"  {after['p50_ms']:>12.3f} {p50:>+8.1%}"
+            f"  {after['p95_ms']:>12.3f} {p95:>+8.1%}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+
+    for name in sorted(set(baseline["results"]) ^ set(candidate["results"])):
+        print(f"{name:<{width}}  only in {'baseline' if name in baseline['results'] else 'candidate'}")
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from benchmarks.harness import (
+    BenchmarkResult,
+    configure_environment,
+    print_table,
+    summarize,
+    write_report,
+)
+
+SIZES = {"1k": 1024, "64k": 64 * 1024, "1m": 1024 * 1024}
+PASSWORD = "benchmark-password"
+
+
+async def _drive(
+    name: str,
+    params: Dict[str, object],
+    request: Callable[[int, int], Awaitable[bool]],
+    *,
+    requests: int,
+    concurrency: int,
+) -> BenchmarkResult:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker(slot: int) -> None:
+        nonlocal errors
+        for index in counter:
+            begin = time.perf_counter()
+            ok = await request(slot, index)
+            latencies.append(time.perf_counter() - begin)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(slot) for slot in range(concurrency)))
+    return summarize(
+        name,
+        {**params, "concurrency": concurrency},
+        latencies,
+        time.perf_counter() - started,
+        errors=errors,
+    )
+
+
+async def run(requests: int, concurrencies: List[int], sizes: List[str]) -> List[BenchmarkResult]:
+    import httpx
+
+    from database import engine
+    from migrations import ensure_schema
+
+    ensure_schema(engine)
+    from main import app
+
+    results: List[BenchmarkResult] = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            usernames = [f"bench{index}" for index in range(max(concurrencies))]
+            for username in usernames:
+                await client.post("/users", json={"username": username, "password": PASSWORD})
+            logins = [
+                (
+                    await client.post(
+                        "/auth/login", data={"username": username, "password": PASSWORD}
+                    )
+                ).json()
+                for username in usernames
+            ]
+            headers = {"Authorization": f"Bearer {logins[0]['access_token']}"}
+
+            async def login(slot: int, index: int) -> bool:
+                username = usernames[slot]
+                response = await client.post(
+                    "/auth/login", data={"username": username, "password": PASSWORD}
+                )
+                return response.status_code == 200
+
+            refresh_tokens = {index: login["refresh_token"] for index, login in enumerate(logins)}
+
+            async def refresh(slot: int, index: int) -> bool:
+                # every worker rotates its own user's refresh chain
+                response = await client.post(
+                    "/auth/refresh", json={"refresh_token": refresh_tokens[slot]}
+                )
+                if response.status_code == 200:
+                    refresh_tokens[slot] = response.json()["refresh_token"]
+                return response.status_code == 200
+
+            documents: Dict[str, int] = {}
+            for label in sizes:
+                seed = (f"{label}.bin", os.urandom(SIZES[label]), "application/octet-stream")
+                response = await client.post(
+                    "/documents",
+                    files={"file": seed},
+                    data={"uri": "bench/seed"},
+                    headers=headers,
+                )
+                documents[label] = response.json()["id"]
+
+            async def resolve_token(slot: int, index: int) -> bool:
+                response = await client.get(
+                    f"/documents/{documents[sizes[0]]}/meta", headers=headers
+                )
+                return response.status_code == 200
+
+            async def list_documents(slot: int, index: int) -> bool:
+                response = await client.get("/documents?limit=50", headers=headers)
+                return response.status_code == 200
+
+            for concurrency in concurrencies:
+                scenario = dict(requests=requests, concurrency=concurrency)
+                # bcrypt makes logins two orders of magnitude slower than everything else
+                login_scenario = dict(scenario, requests=max(concurrency, requests // 10))
+                results.append(await _drive("login", {}, login, **login_scenario))
+                results.append(await _drive("refresh", {}, refresh, **scenario))
+                results.append(await _drive("token_resolution", {}, resolve_token, **scenario))
+                results.append(await _drive("list_documents", {}, list_documents, **scenario))
+
+                for label in sizes:
+                    payload = os.urandom(SIZES[label])
+
+                    async def upload(slot: int, index: int, payload=payload, label=label) -> bool:
+                        # vary one byte so every upload is new content rather than a dedup hit
+                        body = index.to_bytes(8, "big") + payload[8:]
+                        response = await client.post(
+                            "/documents",
+                            files={"file": (f"{label}.bin", body, "application/octet-stream")},
+                            data={"uri": "bench/upload"},
+                            headers=headers,
+                        )
+                        return response.status_code == 201
+
+                    async def download(slot: int, index: int, label=label) -> bool:
+                        url = f"/documents/{documents[label]}"
+                        response = await client.get(url, headers=headers)
+                        return response.status_code == 200
+
+                    results.append(await _drive("upload", {"size": label}, upload, **scenario))
+                    results.append(await _drive("download", {"size": label}, download, **scenario))
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="End-to-end API throughput and latency through an in-process ASGI client"
+    )
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite database")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--sizes", nargs="+", choices=sorted(SIZES), default=list(SIZES))
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    configure_environment(args.database_url)
+    results = asyncio.run(run(args.requests, args.concurrency, args.sizes))
+    print_table(results)
+    write_report("e2e", results, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
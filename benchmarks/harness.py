@@ -0,0 +1,149 @@
+# Run from the repository root:
+#   python -m benchmarks.micro --output micro.json
+#   python -m benchmarks.e2e [--database-url postgresql+psycopg2://...] --output e2e.json
+#   python -m benchmarks.compare baseline.json candidate.json
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def configure_environment(database_url: Optional[str] = None) -> str:
+    # must run before anything imports core.config / database
+    workdir = tempfile.mkdtemp(prefix="docs-bench-")
+    os.environ["DATABASE_URL"] = database_url or f"sqlite:///{workdir}/bench.db"
+    os.environ.setdefault("APP_SECRET_KEY", "benchmark-secret-key-benchmark-secret-key")
+    os.environ.setdefault("BLOB_STORAGE_PATH", f"{workdir}/blobs")
+    os.environ.setdefault("UPLOAD_PARTS_PATH", f"{workdir}/upload-parts")
+    # the benchmark drives a few users far past any per-client rate limit
+    os.environ.setdefault("ADMISSION_CONTROL_ENABLED", "false")
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+    return workdir
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    params: Dict[str, Any]
+    count: int
+    total_seconds: float
+    ops_per_second: float
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    errors: int = 0
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        params = ",".join(f"{name}={value}" for name, value in sorted(self.params.items()))
+        return f"{self.name}[{params}]" if params else self.name
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(
+    name: str,
+    params: Dict[str, Any],
+    latencies: List[float],
+    total_seconds: float,
+    *,
+    errors: int = 0,
+    extra: Optional[Dict[str, Any]] = None,
+) -> BenchmarkResult:
+    ordered = sorted(latencies)
+    return BenchmarkResult(
+        name=name,
+        params=params,
+        count=len(ordered),
+        total_seconds=round(total_seconds, 6),
+        ops_per_second=round(len(ordered) / total_seconds, 2) if total_seconds > 0 else 0.0,
+        mean_ms=round(statistics.fmean(ordered) * 1000, 4) if ordered else 0.0,
+        p50_ms=round(_percentile(ordered, 0.50) * 1000, 4),
+        p95_ms=round(_percentile(ordered, 0.95) * 1000, 4),
+        p99_ms=round(_percentile(ordered, 0.99) * 1000, 4),
+        errors=errors,
+        extra=extra or {},
+    )
+
+
+def measure(
+    name: str,
+    fn: Callable[[], Any],
+    *,
+    iterations: int,
+    warmup: int = 10,
+    params: Optional[Dict[str, Any]] = None,
+) -> BenchmarkResult:
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    clock = time.perf_counter
+    started = clock()
+    for _ in range(iterations):
+        begin = clock()
+        fn()
+        latencies.append(clock() - begin)
+    return summarize(name, params or {}, latencies, clock() - started)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(
+    suite: str, results: List[BenchmarkResult], output: Optional[str]
+) -> Dict[str, Any]:
+    report = {
+        "suite": suite,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": os.environ.get("DATABASE_URL", "").split(":", 1)[0],
+        "results": {result.key: asdict(result) for result in results},
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        Path(output).write_text(text + "\n")
+    else:
+        print(text)
+    return report
+
+
+def print_table(results: List[BenchmarkResult]) -> None:
+    width = max((len(result.key) for result in results), default=10)
+    header = f"{'benchmark':<{width}}  {'ops/s':>10}  {'p50 ms':>9}  {'p95 ms':>9}  {'p99 ms':>9}"
+    print(f"{header}  errors", file=sys.stderr)
+    for result in results:
+        print(
+            f"{result.key:<{width}}  {result.ops_per_second:>10.1f}  {result.p50_ms:>9.3f}"
+            f"  {result.p95_ms:>9.3f}  {result.p99_ms:>9.3f}  {result.errors}",
+            file=sys.stderr,
+        )
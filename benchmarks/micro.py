@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import io
+import os
+import sys
+from datetime import datetime, timezone
+from typing import AsyncIterator, List
+
+from benchmarks.harness import (
+    BenchmarkResult,
+    configure_environment,
+    measure,
+    print_table,
+    write_report,
+)
+
+SIZES = {"4k": 4 * 1024, "256k": 256 * 1024, "4m": 4 * 1024 * 1024}
+
+
+async def _chunks(payload: bytes, chunk_size: int) -> AsyncIterator[bytes]:
+    for offset in range(0, len(payload), chunk_size):
+        yield payload[offset : offset + chunk_size]
+
+
+def run(iterations: int) -> List[BenchmarkResult]:
+    # imported lazily so configure_environment() runs before settings are read
+    from core.security import (
+        Principal,
+        create_access_token,
+        create_token_pair,
+        generate_refresh_token_value,
+        hash_refresh_token_value,
+    )
+    from core.token_cache import AccessTokenCache
+    from core.uploads import stream_chunks
+    from services.auth_service import AuthService
+    from services.document_service import decode_cursor, encode_cursor
+    from storage.compression import CompressingWriter
+
+    results = []
+    results.append(
+        measure(
+            "create_token_pair",
+            lambda: create_token_pair("bench-user", user_id=1),
+            iterations=iterations,
+        )
+    )
+
+    auth_service = AuthService(session=None, user_repository=None, refresh_token_repository=None)
+    token = create_access_token("bench-user", user_id=1)
+    results.append(
+        measure(
+            "decode_access_token",
+            lambda: auth_service._decode_access_claims(token),
+            iterations=iterations,
+        )
+    )
+
+    refresh_value = generate_refresh_token_value()
+    results.append(
+        measure(
+            "hash_refresh_token_value",
+            lambda: hash_refresh_token_value(refresh_value),
+            iterations=iterations,
+        )
+    )
+
+    cache = AccessTokenCache(max_entries=10_000, ttl_seconds=60)
+    cache.put(token, Principal(id=1, username="bench-user"), expires_at=2**31)
+    results.append(measure("token_cache_hit", lambda: cache.get(token), iterations=iterations))
+
+    cursor = encode_cursor(datetime.now(timezone.utc), 12345)
+    results.append(measure("decode_cursor", lambda: decode_cursor(cursor), iterations=iterations))
+
+    # the ingest path that replaced base64 encoding: sha256 plus optional compression
+    loop = asyncio.new_event_loop()
+    chunk_size = 1024 * 1024
+    try:
+        for label, size in SIZES.items():
+            payload = os.urandom(size // 2) + b"a" * (size - size // 2)
+            ingest_iterations = max(5, iterations // max(1, size // (64 * 1024)))
+            for encoding in (None, "gzip"):
+
+                def ingest(payload=payload, encoding=encoding) -> None:
+                    sink = io.BytesIO()
+                    writer = CompressingWriter(sink, encoding, 6) if encoding else sink
+                    loop.run_until_complete(
+                        stream_chunks(_chunks(payload, chunk_size), writer, max_bytes=len(payload))
+                    )
+                    if encoding:
+                        writer.finish()
+
+                result = measure(
+                    "ingest_stream",
+                    ingest,
+                    iterations=ingest_iterations,
+                    warmup=2,
+                    params={"size": label, "encoding": encoding or "identity"},
+                )
+                result.extra["mb_per_second"] = round(
+                    size * result.ops_per_second / (1024 * 1024), 2
+                )
+                results.append(result)
+    finally:
+        loop.close()
+
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for token and ingest hot paths")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    configure_environment()
+    results = run(args.iterations)
+    print_table(results)
+    write_report("micro", results, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import argparse
+import json
+import subprocess
+import sys
+from typing import List
+
+from benchmarks.harness import (
+    REPO_ROOT,
+    BenchmarkResult,
+    configure_environment,
+    print_table,
+    summarize,
+    write_report,
+)
+
+# runs in a fresh interpreter so module import cost is measured cold
+PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.create_app()
+created = time.perf_counter()
+
+async def start():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready = asyncio.run(start())
+print(json.dumps({
+    "import_main": imported - started,
+    "create_app": created - imported,
+    "lifespan_startup": ready - created,
+    "total": ready - started,
+}))
+"""
+
+
+def run(runs: int) -> List[BenchmarkResult]:
+    samples = {}
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        timings = json.loads(completed.stdout.strip().splitlines()[-1])
+        for phase, seconds in timings.items():
+            samples.setdefault(phase, []).append(seconds)
+
+    return [
+        summarize("startup", {"phase": phase}, values, sum(values))
+        for phase, values in samples.items()
+    ]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Cold import and startup time of a worker")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    configure_environment()
+    results = run(args.runs)
+    print_table(results)
+    write_report("startup", results, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
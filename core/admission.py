@@ -0,0 +1,283 @@
+import json
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from jose import JWTError, jwt
+
+from core.config import get_settings
+from core.instrumentation import get_metrics_registry
+from core.token_cache import get_access_token_cache
+
+CLASS_AUTH = "auth"
+CLASS_UPLOAD = "upload"
+CLASS_DEFAULT = "default"
+
+# matched before routing, so only method and path are available; everything not
+# listed here shares the default budget
+REQUEST_CLASSES: List[Tuple[str, "re.Pattern[str]", str]] = [
+    ("POST", re.compile(r"^/auth/(login|refresh)$"), CLASS_AUTH),
+    ("POST", re.compile(r"^/users$"), CLASS_AUTH),
+    ("POST", re.compile(r"^/documents(/batch)?$"), CLASS_UPLOAD),
+    ("PUT", re.compile(r"^/uploads/[^/]+/parts/[^/]+$"), CLASS_UPLOAD),
+]
+
+
+def classify(method: str, path: str) -> str:
+    path = path.rstrip("/") or "/"
+    for rule_method, pattern, request_class in REQUEST_CLASSES:
+        if method == rule_method and pattern.match(path):
+            return request_class
+    return CLASS_DEFAULT
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, now: float) -> None:
+        self.tokens = tokens
+        self.updated_at = now
+
+
+class RateLimiter:
+    def __init__(self, *, rate: float, burst: int, max_keys: int) -> None:
+        self._rate = rate
+        self._burst = float(burst)
+        self._max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> float:
+        # returns 0 when admitted, otherwise the seconds until a token is available
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self._burst, now)
+                self._buckets[key] = bucket
+                # an evicted client simply starts again with a full bucket
+                while len(self._buckets) > self._max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket.tokens = min(
+                    self._burst, bucket.tokens + (now - bucket.updated_at) * self._rate
+                )
+                bucket.updated_at = now
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return 0.0
+            return (1 - bucket.tokens) / self._rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class UploadGate:
+    def __init__(self, *, max_concurrent: int, max_inflight_bytes: int) -> None:
+        self._max_concurrent = max_concurrent
+        self._max_inflight_bytes = max_inflight_bytes
+        self._active = 0
+        self._inflight_bytes = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, reserved_bytes: int) -> Optional[str]:
+        with self._lock:
+            if self._active >= self._max_concurrent:
+                return "upload_concurrency"
+            # a single upload larger than the byte budget is still let through on an idle gate
+            if self._active and self._inflight_bytes + reserved_bytes > self._max_inflight_bytes:
+                return "upload_bytes"
+            self._active += 1
+            self._inflight_bytes += reserved_bytes
+            return None
+
+    def add_bytes(self, count: int) -> None:
+        with self._lock:
+            self._inflight_bytes += count
+
+    def release(self, reserved_bytes: int) -> None:
+        with self._lock:
+            self._active -= 1
+            self._inflight_bytes -= reserved_bytes
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "active": self._active,
+                "inflight_bytes": self._inflight_bytes,
+                "max_concurrent": self._max_concurrent,
+                "max_inflight_bytes": self._max_inflight_bytes,
+            }
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        *,
+        limiters: Dict[str, RateLimiter],
+        upload_gate: UploadGate,
+        secret_key: str,
+        jwt_algorithm: str,
+    ) -> None:
+        self.limiters = limiters
+        self.upload_gate = upload_gate
+        self._secret_key = secret_key
+        self._jwt_algorithm = jwt_algorithm
+
+    def client_key(self, scope: Dict[str, Any], request_class: str) -> str:
+        # logins are keyed by address: the caller has no token yet and the
+        # username is in a body we do not want to read before admitting
+        token = _bearer_token(scope) if request_class != CLASS_AUTH else None
+        if token is not None:
+            user = self._token_user(token)
+            if user is not None:
+                return f"user:{user}"
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    def _token_user(self, token: str) -> Optional[str]:
+        cache = get_access_token_cache()
+        if cache is not None:
+            principal = cache.get(token)
+            if principal is not None:
+                return str(principal.id)
+        try:
+            payload = jwt.decode(token, self._secret_key, algorithms=[self._jwt_algorithm])
+        except JWTError:
+            # invalid tokens are rejected later by the route; until then they count
+            # against the caller's address
+            return None
+        user = payload.get("uid") or payload.get("sub")
+        return str(user) if user is not None else None
+
+
+def _bearer_token(scope: Dict[str, Any]) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, credentials = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and credentials:
+                return credentials.strip()
+            return None
+    return None
+
+
+def _content_length(scope: Dict[str, Any]) -> Optional[int]:
+    for name, value in scope.get("headers", []):
+        if name == b"content-length":
+            try:
+                return max(int(value), 0)
+            except ValueError:
+                return None
+    return None
+
+
+class AdmissionMiddleware:
+    def __init__(
+        self, app: Any, *, controller: AdmissionController, unknown_length_bytes: int
+    ) -> None:
+        self.app = app
+        self._controller = controller
+        self._unknown_length_bytes = unknown_length_bytes
+        self._registry = get_metrics_registry()
+        self._registry.counter("http_requests_shed_total", "Requests rejected by admission control")
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        request_class = classify(scope["method"], scope["path"])
+        limiter = self._controller.limiters.get(request_class)
+        if limiter is not None:
+            retry_after = limiter.acquire(self._controller.client_key(scope, request_class))
+            if retry_after:
+                await self._reject(
+                    send, 429, "Rate limit exceeded", retry_after, request_class, "rate_limit"
+                )
+                return
+
+        if request_class != CLASS_UPLOAD:
+            await self.app(scope, receive, send)
+            return
+
+        declared = _content_length(scope)
+        reserved = declared if declared is not None else self._unknown_length_bytes
+        gate = self._controller.upload_gate
+        reason = gate.try_acquire(reserved)
+        if reason is not None:
+            await self._reject(
+                send, 503, "Server is busy with other uploads", 1, request_class, reason
+            )
+            return
+
+        received = 0
+
+        async def counting_receive() -> Dict[str, Any]:
+            nonlocal received, reserved
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                # chunked bodies can outgrow their reservation; account for what
+                # actually arrived so later admissions see it
+                if received > reserved:
+                    gate.add_bytes(received - reserved)
+                    reserved = received
+            return message
+
+        try:
+            await self.app(scope, counting_receive, send)
+        finally:
+            gate.release(reserved)
+
+    async def _reject(
+        self,
+        send: Callable,
+        status_code: int,
+        detail: str,
+        retry_after: float,
+        request_class: str,
+        reason: str,
+    ) -> None:
+        self._registry.inc("http_requests_shed_total", request_class=request_class, reason=reason)
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status_code,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                    (b"retry-after", str(max(1, math.ceil(retry_after))).encode("latin-1")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+@lru_cache
+def get_admission_controller() -> AdmissionController:
+    settings = get_settings()
+    budgets = {
+        CLASS_AUTH: (settings.rate_limit_auth_per_second, settings.rate_limit_auth_burst),
+        CLASS_UPLOAD: (settings.rate_limit_upload_per_second, settings.rate_limit_upload_burst),
+        CLASS_DEFAULT: (settings.rate_limit_default_per_second, settings.rate_limit_default_burst),
+    }
+    return AdmissionController(
+        # a rate of 0 leaves that class unlimited
+        limiters={
+            request_class: RateLimiter(rate=rate, burst=burst, max_keys=settings.rate_limit_max_keys)
+            for request_class, (rate, burst) in budgets.items()
+            if rate > 0
+        },
+        upload_gate=UploadGate(
+            max_concurrent=settings.upload_max_concurrent,
+            max_inflight_bytes=settings.upload_max_inflight_bytes,
+        ),
+        secret_key=settings.secret_key,
+        jwt_algorithm=settings.jwt_algorithm,
+    )
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+import random
+from typing import Any, Callable, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    def __init__(self, name: str, interval_seconds: float, job: Callable[[], Any]) -> None:
+        self.name = name
+        self._interval_seconds = interval_seconds
+        self._job = job
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        # jitter the first run so several workers do not fire in lockstep
+        await asyncio.sleep(random.uniform(0, self._interval_seconds))
+        while True:
+            try:
+                await run_in_threadpool(self._job)
+            except Exception:
+                logger.exception("Background task %s failed", self.name)
+            await asyncio.sleep(self._interval_seconds)
+
+
+class PeriodicTaskGroup:
+    def __init__(self) -> None:
+        self._tasks: List[PeriodicTask] = []
+
+    def add(self, task: PeriodicTask) -> None:
+        self._tasks.append(task)
+
+    def start(self) -> None:
+        for task in self._tasks:
+            task.start()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            await task.stop()
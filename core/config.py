@@ -1,9 +1,9 @@
 import os
 from functools import lru_cache
-from typing import List
+from typing import Annotated, List, Literal, Optional
 
 from pydantic import AliasChoices, Field, field_validator
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -19,10 +19,135 @@ class Settings(BaseSettings):
     )
     jwt_algorithm: str = Field("HS256", validation_alias=AliasChoices("JWT_ALGORITHM", "ALGORITHM"))
     database_url: str = Field(..., validation_alias=AliasChoices("DATABASE_URL", "DB_URL"))
+    database_async: bool = Field(False, validation_alias="DATABASE_ASYNC")
+    async_database_url: Optional[str] = Field(None, validation_alias="ASYNC_DATABASE_URL")
+    database_replica_urls: Annotated[List[str], NoDecode] = Field(
+        default_factory=list, validation_alias="DATABASE_REPLICA_URLS"
+    )
+    replica_health_check_interval_seconds: int = Field(
+        5, gt=0, validation_alias="REPLICA_HEALTH_CHECK_INTERVAL_SECONDS"
+    )
+    replica_max_lag_seconds: float = Field(10.0, ge=0, validation_alias="REPLICA_MAX_LAG_SECONDS")
+    db_pool_size: int = Field(5, ge=1, validation_alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(10, ge=0, validation_alias="DB_MAX_OVERFLOW")
+    db_pool_timeout_seconds: float = Field(30.0, gt=0, validation_alias="DB_POOL_TIMEOUT_SECONDS")
+    db_pool_recycle_seconds: int = Field(1800, validation_alias="DB_POOL_RECYCLE_SECONDS")
+    db_pool_pre_ping: bool = Field(True, validation_alias="DB_POOL_PRE_PING")
     cors_allow_origins: List[str] = Field(
         default_factory=lambda: ["*"],
         validation_alias=AliasChoices("CORS_ALLOW_ORIGINS", "CORS_ALLOWED_ORIGINS"),
     )
+    server_host: str = Field("0.0.0.0", validation_alias="SERVER_HOST")
+    server_port: int = Field(8000, validation_alias="SERVER_PORT")
+    server_workers: int = Field(
+        default_factory=lambda: os.cpu_count() or 1,
+        gt=0,
+        validation_alias="SERVER_WORKERS",
+    )
+    server_keep_alive_seconds: int = Field(5, ge=0, validation_alias="SERVER_KEEP_ALIVE_SECONDS")
+    server_graceful_shutdown_seconds: int = Field(
+        30, ge=0, validation_alias="SERVER_GRACEFUL_SHUTDOWN_SECONDS"
+    )
+    server_forwarded_allow_ips: str = Field("127.0.0.1", validation_alias="FORWARDED_ALLOW_IPS")
+    upload_chunk_size: int = Field(1024 * 1024, gt=0, validation_alias="UPLOAD_CHUNK_SIZE")
+    max_upload_size_bytes: int = Field(
+        1024 * 1024 * 1024,
+        gt=0,
+        validation_alias=AliasChoices("MAX_UPLOAD_SIZE_BYTES", "MAX_UPLOAD_SIZE"),
+    )
+    batch_upload_max_files: int = Field(500, gt=0, validation_alias="BATCH_UPLOAD_MAX_FILES")
+    batch_upload_max_bytes: int = Field(
+        1024 * 1024 * 1024, gt=0, validation_alias="BATCH_UPLOAD_MAX_BYTES"
+    )
+    export_max_documents: int = Field(1000, gt=0, validation_alias="EXPORT_MAX_DOCUMENTS")
+    blob_store_backend: Literal["local"] = Field("local", validation_alias="BLOB_STORE_BACKEND")
+    blob_storage_path: str = Field("./data/blobs", validation_alias="BLOB_STORAGE_PATH")
+    password_hash_workers: int = Field(
+        default_factory=lambda: min(4, os.cpu_count() or 1),
+        gt=0,
+        validation_alias="PASSWORD_HASH_WORKERS",
+    )
+    password_hash_max_pending: int = Field(64, ge=0, validation_alias="PASSWORD_HASH_MAX_PENDING")
+    token_cache_enabled: bool = Field(True, validation_alias="TOKEN_CACHE_ENABLED")
+    token_cache_max_entries: int = Field(10_000, gt=0, validation_alias="TOKEN_CACHE_MAX_ENTRIES")
+    token_cache_ttl_seconds: int = Field(60, gt=0, validation_alias="TOKEN_CACHE_TTL_SECONDS")
+    refresh_token_reaper_enabled: bool = Field(True, validation_alias="REFRESH_TOKEN_REAPER_ENABLED")
+    refresh_token_reaper_interval_seconds: int = Field(
+        300, gt=0, validation_alias="REFRESH_TOKEN_REAPER_INTERVAL_SECONDS"
+    )
+    refresh_token_reaper_batch_size: int = Field(
+        1000, gt=0, validation_alias="REFRESH_TOKEN_REAPER_BATCH_SIZE"
+    )
+    admission_control_enabled: bool = Field(True, validation_alias="ADMISSION_CONTROL_ENABLED")
+    rate_limit_default_per_second: float = Field(
+        50.0, ge=0, validation_alias="RATE_LIMIT_DEFAULT_PER_SECOND"
+    )
+    rate_limit_default_burst: int = Field(100, gt=0, validation_alias="RATE_LIMIT_DEFAULT_BURST")
+    rate_limit_auth_per_second: float = Field(1.0, ge=0, validation_alias="RATE_LIMIT_AUTH_PER_SECOND")
+    rate_limit_auth_burst: int = Field(10, gt=0, validation_alias="RATE_LIMIT_AUTH_BURST")
+    rate_limit_upload_per_second: float = Field(
+        5.0, ge=0, validation_alias="RATE_LIMIT_UPLOAD_PER_SECOND"
+    )
+    rate_limit_upload_burst: int = Field(20, gt=0, validation_alias="RATE_LIMIT_UPLOAD_BURST")
+    rate_limit_max_keys: int = Field(100_000, gt=0, validation_alias="RATE_LIMIT_MAX_KEYS")
+    upload_max_concurrent: int = Field(32, gt=0, validation_alias="UPLOAD_MAX_CONCURRENT")
+    upload_max_inflight_bytes: int = Field(
+        512 * 1024 * 1024, gt=0, validation_alias="UPLOAD_MAX_INFLIGHT_BYTES"
+    )
+    # 0 leaves a quota unlimited; usage counts each document's full size, even when
+    # its content is deduplicated against another upload
+    user_quota_max_documents: int = Field(0, ge=0, validation_alias="USER_QUOTA_MAX_DOCUMENTS")
+    user_quota_max_bytes: int = Field(0, ge=0, validation_alias="USER_QUOTA_MAX_BYTES")
+    upload_parts_path: str = Field("./data/upload-parts", validation_alias="UPLOAD_PARTS_PATH")
+    upload_session_ttl_seconds: int = Field(
+        24 * 60 * 60, gt=0, validation_alias="UPLOAD_SESSION_TTL_SECONDS"
+    )
+    upload_max_parts: int = Field(10_000, gt=0, validation_alias="UPLOAD_MAX_PARTS")
+    upload_session_reaper_interval_seconds: int = Field(
+        600, gt=0, validation_alias="UPLOAD_SESSION_REAPER_INTERVAL_SECONDS"
+    )
+    upload_session_reaper_batch_size: int = Field(
+        100, gt=0, validation_alias="UPLOAD_SESSION_REAPER_BATCH_SIZE"
+    )
+    blob_gc_grace_seconds: int = Field(3600, ge=0, validation_alias="BLOB_GC_GRACE_SECONDS")
+    blob_scrub_enabled: bool = Field(False, validation_alias="BLOB_SCRUB_ENABLED")
+    blob_scrub_interval_seconds: int = Field(5, gt=0, validation_alias="BLOB_SCRUB_INTERVAL_SECONDS")
+    blob_scrub_batch_size: int = Field(100, gt=0, validation_alias="BLOB_SCRUB_BATCH_SIZE")
+    # one worker holds the scrub lease at a time, so this is the total; 0 removes the limit
+    blob_scrub_bytes_per_second: int = Field(
+        8 * 1024 * 1024, ge=0, validation_alias="BLOB_SCRUB_BYTES_PER_SECOND"
+    )
+    download_verify_checksum: bool = Field(False, validation_alias="DOWNLOAD_VERIFY_CHECKSUM")
+    document_cache_control: str = Field("private, no-cache", validation_alias="DOCUMENT_CACHE_CONTROL")
+    document_cache_enabled: bool = Field(False, validation_alias="DOCUMENT_CACHE_ENABLED")
+    document_cache_max_bytes: int = Field(
+        64 * 1024 * 1024, gt=0, validation_alias="DOCUMENT_CACHE_MAX_BYTES"
+    )
+    document_cache_max_entry_bytes: int = Field(
+        256 * 1024, ge=0, validation_alias="DOCUMENT_CACHE_MAX_ENTRY_BYTES"
+    )
+    document_cache_ttl_seconds: int = Field(300, gt=0, validation_alias="DOCUMENT_CACHE_TTL_SECONDS")
+    metrics_enabled: bool = Field(True, validation_alias="METRICS_ENABLED")
+    # when set, /metrics requires "Authorization: Bearer <token>"
+    metrics_token: Optional[str] = Field(None, validation_alias="METRICS_TOKEN")
+    slow_request_threshold_ms: int = Field(0, ge=0, validation_alias="SLOW_REQUEST_THRESHOLD_MS")
+    compression_enabled: bool = Field(False, validation_alias="COMPRESSION_ENABLED")
+    compression_algorithm: Literal["gzip", "zstd"] = Field("gzip", validation_alias="COMPRESSION_ALGORITHM")
+    compression_level: int = Field(6, validation_alias="COMPRESSION_LEVEL")
+    compression_min_size_bytes: int = Field(1024, ge=0, validation_alias="COMPRESSION_MIN_SIZE_BYTES")
+    compression_mime_types: Annotated[List[str], NoDecode] = Field(
+        default_factory=lambda: [
+            "text/*",
+            "application/json",
+            "application/*+json",
+            "application/x-ndjson",
+            "application/xml",
+            "application/*+xml",
+            "application/javascript",
+            "application/x-yaml",
+        ],
+        validation_alias="COMPRESSION_MIME_TYPES",
+    )
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True, extra="ignore")
 
@@ -45,6 +170,20 @@ class Settings(BaseSettings):
             return list(value)
         raise ValueError("Invalid format for CORS_ALLOW_ORIGINS")
 
+    @field_validator("database_replica_urls", mode="before")
+    @classmethod
+    def parse_replica_urls(cls, value):
+        if isinstance(value, str):
+            return [item.strip() for item in value.split(",") if item.strip()]
+        return value
+
+    @field_validator("compression_mime_types", mode="before")
+    @classmethod
+    def parse_compression_mime_types(cls, value):
+        if isinstance(value, str):
+            return [item.strip().lower() for item in value.split(",") if item.strip()]
+        return value
+
 
 @lru_cache
 def get_settings() -> Settings:
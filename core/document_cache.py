@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from core.config import get_settings
+
+# rough per-entry bookkeeping cost charged against the byte budget
+ENTRY_OVERHEAD_BYTES = 512
+
+
+@dataclass(frozen=True)
+class CachedBlob:
+    encoding: Optional[str]
+    stored_size_bytes: Optional[int]
+
+
+@dataclass(frozen=True)
+class CachedDocument:
+    id: int
+    filename: str
+    mime_type: str
+    uri: str
+    created_at: datetime
+    size_bytes: int
+    blob_key: str
+    owner_id: Optional[int]
+    blob: Optional[CachedBlob]
+
+    @classmethod
+    def from_model(cls, document: Any) -> "CachedDocument":
+        blob = document.blob
+        return cls(
+            id=document.id,
+            filename=document.filename,
+            mime_type=document.mime_type,
+            uri=document.uri,
+            created_at=document.created_at,
+            size_bytes=document.size_bytes,
+            blob_key=document.blob_key,
+            owner_id=document.owner_id,
+            blob=CachedBlob(blob.encoding, blob.stored_size_bytes) if blob is not None else None,
+        )
+
+
+class ByteBudgetLRU:
+    def __init__(self, *, max_bytes: int, max_entry_bytes: int, ttl_seconds: float) -> None:
+        self._max_bytes = max_bytes
+        self._max_entry_bytes = max_entry_bytes
+        self._ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._bypassed = 0
+
+    @property
+    def max_entry_bytes(self) -> int:
+        return self._max_entry_bytes
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= time.monotonic():
+                del self._entries[key]
+                self._size -= entry[1]
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, weight: int) -> bool:
+        weight += ENTRY_OVERHEAD_BYTES
+        with self._lock:
+            if weight > self._max_entry_bytes + ENTRY_OVERHEAD_BYTES or weight > self._max_bytes:
+                self._bypassed += 1
+                return False
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (value, weight, time.monotonic() + self._ttl_seconds)
+            self._size += weight
+            while self._size > self._max_bytes:
+                _, (_, evicted_weight, _) = self._entries.popitem(last=False)
+                self._size -= evicted_weight
+                self._evictions += 1
+            return True
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry[1]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self._max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "bypassed": self._bypassed,
+            }
+
+
+# documents are immutable, so entries only need to go away on delete; the TTL
+# bounds how long other workers keep serving a document deleted elsewhere.
+# Metadata is keyed by document id and small blob bodies by content hash, so a
+# content entry can never go stale and is left to the LRU and TTL to expire.
+class DocumentCache:
+    def __init__(self, *, max_bytes: int, max_entry_bytes: int, ttl_seconds: float) -> None:
+        self._lru = ByteBudgetLRU(
+            max_bytes=max_bytes,
+            max_entry_bytes=max_entry_bytes,
+            ttl_seconds=ttl_seconds,
+        )
+
+    def get_document(self, document_id: int) -> Optional[CachedDocument]:
+        return self._lru.get(("document", document_id))
+
+    def put_document(self, document: Any) -> CachedDocument:
+        snapshot = CachedDocument.from_model(document)
+        self._lru.put(("document", snapshot.id), snapshot, 0)
+        return snapshot
+
+    def invalidate_document(self, document_id: int) -> None:
+        self._lru.invalidate(("document", document_id))
+
+    def accepts_content(self, stored_size: int) -> bool:
+        return stored_size <= self._lru.max_entry_bytes
+
+    def get_content(self, blob_key: str) -> Optional[bytes]:
+        return self._lru.get(("content", blob_key))
+
+    def put_content(self, blob_key: str, content: bytes) -> None:
+        self._lru.put(("content", blob_key), content, len(content))
+
+    def stats(self) -> Dict[str, int]:
+        return self._lru.stats()
+
+
+@lru_cache
+def get_document_cache() -> Optional[DocumentCache]:
+    settings = get_settings()
+    if not settings.document_cache_enabled:
+        return None
+    return DocumentCache(
+        max_bytes=settings.document_cache_max_bytes,
+        max_entry_bytes=settings.document_cache_max_entry_bytes,
+        ttl_seconds=settings.document_cache_ttl_seconds,
+    )
@@ -0,0 +1,114 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Iterator, Mapping, Optional, Tuple
+
+
+class RangeNotSatisfiableError(Exception):
+    pass
+
+
+def representation_etag(content_hash: str, encoding: Optional[str] = None) -> str:
+    # the stored bytes never change, so the content hash is a strong validator;
+    # encoded representations get their own tag as required for strong ETags
+    return f'"{content_hash}-{encoding}"' if encoding else f'"{content_hash}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def format_http_date(value: datetime) -> str:
+    return format_datetime(_as_utc(value), usegmt=True)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison function
+    opaque = etag.removeprefix("W/")
+    candidates = (candidate.strip().removeprefix("W/") for candidate in if_none_match.split(","))
+    return opaque in candidates
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        return parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_not_modified(
+    request_headers: Mapping[str, str],
+    *,
+    etag: str,
+    last_modified: Optional[datetime],
+) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    since = _parse_http_date(if_modified_since)
+    if since is None:
+        return False
+    return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+
+
+def if_range_matches(
+    request_headers: Mapping[str, str],
+    *,
+    etag: str,
+    last_modified: Optional[datetime],
+) -> bool:
+    if_range = request_headers.get("if-range")
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith(('"', "W/")):
+        # If-Range uses the strong comparison function
+        return not etag.startswith("W/") and if_range == etag
+    since = _parse_http_date(if_range)
+    if since is None or last_modified is None:
+        return False
+    return _as_utc(last_modified).replace(microsecond=0) == _as_utc(since)
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    # a single byte range as inclusive offsets; None means the header is ignored and
+    # the full representation is sent, which is also how multiple ranges are answered
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, separator, last = (part.strip() for part in spec.partition("-"))
+    if not separator or not (first or last):
+        return None
+    if not all(part.isdigit() for part in (first, last) if part):
+        return None
+
+    if not first:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiableError(f"bytes */{size}")
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiableError(f"bytes */{size}")
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def iter_byte_range(chunks: Iterable[bytes], start: int, end: int) -> Iterator[bytes]:
+    # stops pulling from the source once the range is complete
+    offset = 0
+    for chunk in chunks:
+        chunk_end = offset + len(chunk)
+        if chunk_end > start:
+            yield chunk[max(start - offset, 0) : end + 1 - offset]
+        offset = chunk_end
+        if offset > end:
+            break
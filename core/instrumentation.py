@@ -0,0 +1,211 @@
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.metrics import MetricsRegistry
+
+logger = logging.getLogger("app.slow_requests")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+SIZE_BUCKETS = (
+    256, 1024, 16 * 1024, 256 * 1024, 1024 * 1024, 16 * 1024 * 1024, 256 * 1024 * 1024,
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+QUERY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0, 5.0)
+MAX_RECORDED_QUERIES = 50
+
+
+@dataclass
+class RequestStats:
+    query_count: int = 0
+    query_seconds: float = 0.0
+    queries: List[Tuple[str, float]] = field(default_factory=list)
+    security_seconds: Dict[str, float] = field(default_factory=dict)
+
+    def record_query(self, statement: str, duration: float) -> None:
+        self.query_count += 1
+        self.query_seconds += duration
+        if len(self.queries) < MAX_RECORDED_QUERIES:
+            self.queries.append((statement, duration))
+
+    def record_security(self, operation: str, duration: float) -> None:
+        self.security_seconds[operation] = self.security_seconds.get(operation, 0.0) + duration
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+@lru_cache
+def get_metrics_registry() -> MetricsRegistry:
+    registry = MetricsRegistry()
+    registry.counter("http_requests_total", "HTTP requests by method, route and status code")
+    registry.histogram("http_request_duration_seconds", "HTTP request latency")
+    registry.counter("http_request_bytes_total", "Request body bytes received")
+    registry.counter("http_response_bytes_total", "Response body bytes sent")
+    registry.histogram(
+        "http_request_db_queries", "Database queries per request", QUERY_COUNT_BUCKETS
+    )
+    registry.histogram("http_request_db_seconds", "Database time per request", QUERY_BUCKETS)
+    registry.histogram("http_response_size_bytes", "Response body size", SIZE_BUCKETS)
+    registry.counter("http_slow_requests_total", "Requests slower than the slow-request threshold")
+    registry.histogram("db_query_duration_seconds", "Database statement latency", QUERY_BUCKETS)
+    registry.histogram("security_operation_duration_seconds", "Hashing and token operation latency")
+    registry.counter(
+        "blob_download_checksum_failures_total", "Downloads aborted because content failed verification"
+    )
+    return registry
+
+
+def _statement_kind(statement: str) -> str:
+    head = statement.lstrip().split(None, 1)
+    return head[0].upper() if head else "UNKNOWN"
+
+
+def instrument_engine(engine: Engine) -> None:
+    registry = get_metrics_registry()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_started"].pop()
+        registry.observe(
+            "db_query_duration_seconds", duration, statement=_statement_kind(statement)
+        )
+        stats = _current_request.get()
+        if stats is not None:
+            stats.record_query(statement, duration)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        started = connection.info.get("query_started") if connection is not None else None
+        if started:
+            started.pop()
+
+
+def timed(operation: str) -> Callable[[F], F]:
+    def decorator(fn: F) -> F:
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - started
+                get_metrics_registry().observe(
+                    "security_operation_duration_seconds", duration, operation=operation
+                )
+                stats = _current_request.get()
+                if stats is not None:
+                    stats.record_security(operation, duration)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def _route_template(scope: Dict[str, Any]) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    # unmatched paths are folded together to keep label cardinality bounded
+    return path if path is not None else "unmatched"
+
+
+class InstrumentationMiddleware:
+    def __init__(self, app: Any, *, slow_request_seconds: float = 0.0) -> None:
+        self.app = app
+        self._slow_request_seconds = slow_request_seconds
+        self._registry = get_metrics_registry()
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        status_code = 500
+        bytes_in = 0
+        bytes_out = 0
+        declared_length: Optional[int] = None
+
+        async def counting_receive() -> Dict[str, Any]:
+            nonlocal bytes_in
+            message = await receive()
+            if message["type"] == "http.request":
+                bytes_in += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message: Dict[str, Any]) -> None:
+            nonlocal status_code, bytes_out, declared_length
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-length":
+                        declared_length = int(value)
+            elif message["type"] == "http.response.body":
+                bytes_out += len(message.get("body", b""))
+            elif message["type"] == "http.response.pathsend" and declared_length is not None:
+                # file bodies handed to the server are never seen by the app
+                bytes_out += declared_length
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            duration = time.perf_counter() - started
+            _current_request.reset(token)
+            self._record(scope, stats, status_code, duration, bytes_in, bytes_out)
+
+    def _record(
+        self,
+        scope: Dict[str, Any],
+        stats: RequestStats,
+        status_code: int,
+        duration: float,
+        bytes_in: int,
+        bytes_out: int,
+    ) -> None:
+        method = scope["method"]
+        route = _route_template(scope)
+        registry = self._registry
+        registry.inc("http_requests_total", method=method, route=route, status=str(status_code))
+        registry.observe("http_request_duration_seconds", duration, method=method, route=route)
+        registry.inc("http_request_bytes_total", bytes_in, method=method, route=route)
+        registry.inc("http_response_bytes_total", bytes_out, method=method, route=route)
+        registry.observe("http_response_size_bytes", bytes_out, method=method, route=route)
+        registry.observe("http_request_db_queries", stats.query_count, method=method, route=route)
+        registry.observe("http_request_db_seconds", stats.query_seconds, method=method, route=route)
+
+        if self._slow_request_seconds and duration >= self._slow_request_seconds:
+            registry.inc("http_slow_requests_total", method=method, route=route)
+            slowest = sorted(stats.queries, key=lambda query: query[1], reverse=True)[:5]
+            security_ms = {
+                name: round(seconds * 1000, 1) for name, seconds in stats.security_seconds.items()
+            }
+            logger.warning(
+                "slow request %s %s status=%s duration_ms=%.1f db_queries=%s db_ms=%.1f "
+                "security_ms=%s slowest_queries=%s",
+                method,
+                scope.get("path"),
+                status_code,
+                duration * 1000,
+                stats.query_count,
+                stats.query_seconds * 1000,
+                security_ms,
+                [
+                    (" ".join(statement.split())[:120], round(seconds * 1000, 2))
+                    for statement, seconds in slowest
+                ],
+            )
@@ -0,0 +1,146 @@
+import bisect
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self._buckets: List[float] = sorted(buckets)
+        self._counts = [0] * (len(self._buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative = 0
+        buckets: Dict[str, int] = {}
+        for bound, bucket_count in zip(self._buckets + [float("inf")], counts):
+            cumulative += bucket_count
+            buckets["+Inf" if bound == float("inf") else repr(bound)] = cumulative
+        return {"count": count, "sum": total, "buckets": buckets}
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_family(
+    name: str, kind: str, help_text: str, samples: Iterable[Tuple[Labels, float]]
+) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return lines
+
+
+def format_gauge(name: str, help_text: str, samples: Iterable[Tuple[Labels, float]]) -> List[str]:
+    return _format_family(name, "gauge", help_text, samples)
+
+
+def format_counter(name: str, help_text: str, samples: Iterable[Tuple[Labels, float]]) -> List[str]:
+    # monotonically increasing totals; Prometheus expects the _total suffix
+    return _format_family(name, "counter", help_text, samples)
+
+
+def format_histogram(
+    name: str, help_text: str, samples: Iterable[Tuple[Labels, Dict[str, object]]]
+) -> List[str]:
+    # samples are Histogram.snapshot() results
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, snapshot in samples:
+        lines.extend(_histogram_lines(name, labels, snapshot))
+    return lines
+
+
+def _histogram_lines(name: str, labels: Labels, snapshot: Dict[str, object]) -> List[str]:
+    lines = []
+    for bound, count in snapshot["buckets"].items():
+        bucket_labels = _format_labels(labels, f'le="{bound}"')
+        lines.append(f"{name}_bucket{bucket_labels} {count}")
+    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(snapshot['sum'])}")
+    lines.append(f"{name}_count{_format_labels(labels)} {snapshot['count']}")
+    return lines
+
+
+# counters and histograms keyed by label values, rendered in the Prometheus text format
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._families: Dict[str, Tuple[str, str, Sequence[float]]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+
+    def counter(self, name: str, help_text: str) -> None:
+        with self._lock:
+            self._families.setdefault(name, ("counter", help_text, ()))
+            self._counters.setdefault(name, {})
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        with self._lock:
+            self._families.setdefault(name, ("histogram", help_text, tuple(buckets)))
+            self._histograms.setdefault(name, {})
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self._families[name][2])
+        histogram.observe(value)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            families = dict(self._families)
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+
+        lines: List[str] = []
+        for name, (kind, help_text, _) in sorted(families.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for labels, value in sorted(counters[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            for labels, histogram in sorted(histograms[name].items()):
+                lines.extend(_histogram_lines(name, labels, histogram.snapshot()))
+        return lines
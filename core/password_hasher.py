@@ -0,0 +1,106 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable
+
+from core.config import get_settings
+from core.security import hash_password, verify_password
+
+
+class PasswordHasherBusyError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class PasswordHasherStats:
+    workers: int
+    max_pending: int
+    in_flight: int
+    queued: int
+    completed: int
+    rejected: int
+    queue_wait_seconds_total: float
+
+
+# bcrypt releases the GIL, so a small dedicated thread pool caps hashing CPU
+# without tying up the request threadpool or the event loop
+class PasswordHasher:
+    def __init__(self, *, workers: int, max_pending: int) -> None:
+        self._workers = workers
+        self._max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._queue_wait_total = 0.0
+
+    async def hash_async(self, raw_password: str) -> str:
+        return await asyncio.wrap_future(self._submit(hash_password, raw_password))
+
+    async def verify_async(self, raw_password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(
+            self._submit(verify_password, raw_password, hashed_password)
+        )
+
+    def stats(self) -> PasswordHasherStats:
+        with self._lock:
+            return PasswordHasherStats(
+                workers=self._workers,
+                max_pending=self._max_pending,
+                in_flight=self._in_flight,
+                queued=self._in_flight - self._running,
+                completed=self._completed,
+                rejected=self._rejected,
+                queue_wait_seconds_total=self._queue_wait_total,
+            )
+
+    def shutdown(self) -> None:
+        # lets queued and running hashes finish so no login is cut off mid-request
+        self._executor.shutdown(wait=True)
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PasswordHasherBusyError("Too many concurrent password operations")
+
+        with self._lock:
+            self._in_flight += 1
+        submitted_at = time.perf_counter()
+
+        def run() -> Any:
+            with self._lock:
+                self._running += 1
+                self._queue_wait_total += time.perf_counter() - submitted_at
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        # carry the caller's context so per-request timings see the hashing work
+        future = self._executor.submit(contextvars.copy_context().run, run)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+        self._slots.release()
+
+
+@lru_cache
+def get_password_hasher() -> PasswordHasher:
+    settings = get_settings()
+    return PasswordHasher(
+        workers=settings.password_hash_workers,
+        max_pending=settings.password_hash_max_pending,
+    )
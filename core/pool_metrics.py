@@ -0,0 +1,109 @@
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from core.metrics import Histogram
+
+CHECKOUT_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+class PoolMetrics:
+    def __init__(self) -> None:
+        self.checkout_wait = Histogram(CHECKOUT_WAIT_BUCKETS)
+        self._lock = threading.Lock()
+        self._connected_at: Dict[int, float] = {}
+        self._counters = {
+            "checkouts": 0,
+            "checkout_timeouts": 0,
+            "overflow_checkouts": 0,
+            "connections_opened": 0,
+            "connections_closed": 0,
+            "connections_invalidated": 0,
+        }
+
+    def increment(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def attach(self, pool: Pool) -> None:
+        pool.metrics = self
+
+        @event.listens_for(pool, "connect")
+        def on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+            with self._lock:
+                self._connected_at[id(dbapi_connection)] = time.monotonic()
+                self._counters["connections_opened"] += 1
+
+        @event.listens_for(pool, "close")
+        def on_close(dbapi_connection: Any, connection_record: Any) -> None:
+            with self._lock:
+                self._connected_at.pop(id(dbapi_connection), None)
+                self._counters["connections_closed"] += 1
+
+        @event.listens_for(pool, "invalidate")
+        def on_invalidate(dbapi_connection: Any, connection_record: Any, exception: Any) -> None:
+            self.increment("connections_invalidated")
+
+    def snapshot(self, pool: Pool) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            ages = [now - opened for opened in self._connected_at.values()]
+            counters = dict(self._counters)
+        data: Dict[str, Any] = {
+            "status": pool.status(),
+            "counters": counters,
+            "checkout_wait_seconds": self.checkout_wait.snapshot(),
+            "connection_age_seconds": {
+                "count": len(ages),
+                "max": max(ages, default=0.0),
+                "avg": sum(ages) / len(ages) if ages else 0.0,
+            },
+        }
+        if isinstance(pool, QueuePool):
+            data.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+            )
+        return data
+
+
+class _InstrumentedPoolMixin:
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        metrics = getattr(self, "metrics", None)
+        if metrics is None:
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            metrics.increment("checkout_timeouts")
+            raise
+        finally:
+            metrics.checkout_wait.observe(time.perf_counter() - started)
+        metrics.increment("checkouts")
+        if self.overflow() > 0 and self.checkedout() > self.size():
+            metrics.increment("overflow_checkouts")
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        metrics = getattr(self, "metrics", None)
+        if metrics is not None:
+            pool.metrics = metrics
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
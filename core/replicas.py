@@ -0,0 +1,174 @@
+import itertools
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+REPLICA_READS = "replica_reads"
+LAST_REPLICA = "last_replica"
+WROTE = "wrote"
+
+# seconds behind the primary; a replica that has replayed everything it received
+# reports 0 even when the primary has been idle for a while
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+
+
+class Replica:
+    def __init__(self, name: str, engine: Engine, probe_engine: Engine) -> None:
+        self.name = name
+        # engine serves session reads; probe_engine is always sync so health checks
+        # can run from the background thread in async mode too
+        self.engine = engine
+        self.probe_engine = probe_engine
+        self.healthy = True
+        self.lag_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+
+class ReplicaSet:
+    def __init__(self, replicas: List[Replica], *, max_lag_seconds: float) -> None:
+        self._replicas = replicas
+        self._max_lag_seconds = max_lag_seconds
+        self._cursor = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def replicas(self) -> List[Replica]:
+        return list(self._replicas)
+
+    def choose(self) -> Optional[Replica]:
+        healthy = [replica for replica in self._replicas if replica.healthy]
+        if not healthy:
+            return None
+        with self._lock:
+            position = next(self._cursor)
+        return healthy[position % len(healthy)]
+
+    def mark_unavailable(self, replica: Replica, error: BaseException) -> None:
+        if replica.healthy:
+            logger.warning("Replica %s unavailable, reading from primary: %s", replica.name, error)
+        replica.healthy = False
+        replica.last_error = str(error)
+
+    def check(self) -> None:
+        for replica in self._replicas:
+            try:
+                lag = self._measure_lag(replica.probe_engine)
+            except Exception as exc:  # noqa: BLE001 any failure takes the replica out
+                self.mark_unavailable(replica, exc)
+                continue
+            replica.lag_seconds = lag
+            healthy = lag <= self._max_lag_seconds
+            if healthy != replica.healthy:
+                logger.warning(
+                    "Replica %s is %s (lag %.1fs)",
+                    replica.name,
+                    "back in rotation" if healthy else "lagging",
+                    lag,
+                )
+            replica.healthy = healthy
+            replica.last_error = None if healthy else f"lag {lag:.1f}s"
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": replica.name,
+                "healthy": replica.healthy,
+                "lag_seconds": replica.lag_seconds,
+                "last_error": replica.last_error,
+            }
+            for replica in self._replicas
+        ]
+
+    @staticmethod
+    def _measure_lag(engine: Engine) -> float:
+        with engine.connect() as connection:
+            if engine.dialect.name == "postgresql":
+                return float(connection.execute(POSTGRES_LAG_QUERY).scalar() or 0)
+            connection.execute(text("SELECT 1"))
+            return 0.0
+
+
+class RoutingSession(Session):
+    def __init__(self, *args: Any, replicas: Optional[ReplicaSet] = None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if clause is not None and getattr(clause, "is_dml", False):
+            self.info[WROTE] = True
+        elif (
+            self.replicas is not None
+            and self.info.get(REPLICA_READS)
+            and not self.info.get(WROTE)
+            and not self._flushing
+            and getattr(clause, "is_select", False)
+        ):
+            replica = self.replicas.choose()
+            if replica is not None:
+                self.info[LAST_REPLICA] = replica
+                return replica.engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+    def flush(self, objects=None) -> None:
+        if self._is_clean():
+            return
+        # once this session has written, every later read sees the primary
+        self.info[WROTE] = True
+        super().flush(objects)
+
+
+@contextmanager
+def replica_reads(session: Session) -> Iterator[None]:
+    session.info[REPLICA_READS] = session.info.get(REPLICA_READS, 0) + 1
+    try:
+        yield
+    finally:
+        session.info[REPLICA_READS] -= 1
+
+
+def read_from_replica(
+    session: Session,
+    fn: Callable[..., T],
+    *args: Any,
+    fallback_if: Callable[[T], bool] = lambda result: result is None,
+    **kwargs: Any,
+) -> T:
+    # rows missing on the replica may simply not have replicated yet, so those
+    # reads are repeated on the primary; this is what makes a document readable
+    # right after its upload
+    replicas = getattr(session, "replicas", None)
+    if replicas is None or session.info.get(WROTE):
+        return fn(*args, **kwargs)
+
+    session.info.pop(LAST_REPLICA, None)
+    try:
+        with replica_reads(session):
+            result = fn(*args, **kwargs)
+    except (OperationalError, PoolTimeoutError) as exc:
+        replica = session.info.get(LAST_REPLICA)
+        if replica is None:
+            raise
+        replicas.mark_unavailable(replica, exc)
+        session.rollback()
+        return fn(*args, **kwargs)
+
+    if session.info.get(LAST_REPLICA) is not None and fallback_if(result):
+        return fn(*args, **kwargs)
+    return result
@@ -2,12 +2,13 @@ import hashlib
 import secrets
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from jose import jwt
 from passlib.context import CryptContext
 
 from core.config import get_settings
+from core.instrumentation import timed
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -19,23 +20,39 @@ class TokenPair:
     token_type: str = "bearer"
 
 
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    username: str
+
+
+@timed("hash_password")
 def hash_password(raw_password: str) -> str:
     return pwd_context.hash(raw_password)
 
 
+@timed("verify_password")
 def verify_password(raw_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(raw_password, hashed_password)
 
 
-def _build_access_payload(subject: str, *, expires_delta: timedelta) -> Dict[str, Any]:
+def _build_access_payload(
+    subject: str,
+    *,
+    expires_delta: timedelta,
+    user_id: Optional[int] = None,
+) -> Dict[str, Any]:
     now = datetime.now(timezone.utc)
     expire_at = now + expires_delta
-    return {
+    payload: Dict[str, Any] = {
         "sub": subject,
         "token_type": "access",
         "iat": int(now.timestamp()),
         "exp": int(expire_at.timestamp()),
     }
+    if user_id is not None:
+        payload["uid"] = user_id
+    return payload
 
 
 def _encode_token(payload: Dict[str, Any]) -> str:
@@ -43,10 +60,10 @@ def _encode_token(payload: Dict[str, Any]) -> str:
     return jwt.encode(payload, settings.secret_key, algorithm=settings.jwt_algorithm)
 
 
-def create_access_token(subject: str) -> str:
+def create_access_token(subject: str, user_id: Optional[int] = None) -> str:
     settings = get_settings()
     expires = timedelta(minutes=settings.access_token_exp_minutes)
-    payload = _build_access_payload(subject, expires_delta=expires)
+    payload = _build_access_payload(subject, expires_delta=expires, user_id=user_id)
     return _encode_token(payload)
 
 
@@ -63,7 +80,8 @@ def get_refresh_token_expiry() -> datetime:
     return datetime.now(timezone.utc) + timedelta(minutes=settings.refresh_token_exp_minutes)
 
 
-def create_token_pair(subject: str) -> TokenPair:
-    access_token = create_access_token(subject)
+@timed("create_token_pair")
+def create_token_pair(subject: str, user_id: Optional[int] = None) -> TokenPair:
+    access_token = create_access_token(subject, user_id=user_id)
     refresh_token = generate_refresh_token_value()
     return TokenPair(access_token=access_token, refresh_token=refresh_token)
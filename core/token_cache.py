@@ -0,0 +1,60 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from core.config import get_settings
+from core.security import Principal
+
+
+class AccessTokenCache:
+    # entries are not checked against revocations made by other workers, so the
+    # TTL bounds how long a revoked token keeps working in a process that cached it
+    def __init__(self, *, max_entries: int, ttl_seconds: int) -> None:
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[Principal, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Principal]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            principal, valid_until = entry
+            if valid_until <= now:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return principal
+
+    def put(self, token: str, principal: Principal, expires_at: float) -> None:
+        # never cache past the token's own exp claim
+        valid_until = min(expires_at, time.time() + self._ttl_seconds)
+        with self._lock:
+            self._entries[token] = (principal, valid_until)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for token in [t for t, (p, _) in self._entries.items() if p.id == user_id]:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+@lru_cache
+def get_access_token_cache() -> Optional[AccessTokenCache]:
+    settings = get_settings()
+    if not settings.token_cache_enabled:
+        return None
+    return AccessTokenCache(
+        max_entries=settings.token_cache_max_entries,
+        ttl_seconds=settings.token_cache_ttl_seconds,
+    )
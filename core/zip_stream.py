@@ -0,0 +1,61 @@
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, List
+
+
+@dataclass(frozen=True)
+class ZipEntry:
+    name: str
+    modified: datetime
+    open_chunks: Callable[[], Iterator[bytes]]
+    compress: bool = False
+
+
+class _ChunkSink:
+    # write-only, unseekable target: zipfile falls back to data descriptors and
+    # never needs to rewind, so entries can be flushed as soon as they are written
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+            self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _zip_info(entry: ZipEntry) -> zipfile.ZipInfo:
+    date_time = max(entry.modified.timetuple()[:6], (1980, 1, 1, 0, 0, 0))
+    info = zipfile.ZipInfo(entry.name, date_time=date_time)
+    info.compress_type = zipfile.ZIP_DEFLATED if entry.compress else zipfile.ZIP_STORED
+    info.external_attr = 0o644 << 16
+    return info
+
+
+def iter_zip(entries: Iterable[ZipEntry]) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as archive:
+        for entry in entries:
+            with archive.open(_zip_info(entry), mode="w", force_zip64=True) as target:
+                for chunk in entry.open_chunks():
+                    target.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
@@ -1,17 +1,156 @@
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import NullPool, Pool
+from starlette.concurrency import run_in_threadpool
+
+from core.config import Settings, get_settings
+from core.instrumentation import instrument_engine
+from core.pool_metrics import (
+    InstrumentedAsyncAdaptedQueuePool,
+    InstrumentedQueuePool,
+    PoolMetrics,
+)
+from core.replicas import Replica, ReplicaSet, RoutingSession
+
+T = TypeVar("T")
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
-from core.config import get_settings
+
+def to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {parsed.get_backend_name()!r}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def pool_options(settings: Settings, url: str, *, use_async: bool) -> Dict[str, Any]:
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # in-memory SQLite needs its single shared connection
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncAdaptedQueuePool if use_async else InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
 
 
 settings = get_settings()
 
 engine = create_engine(
     settings.database_url,
-    pool_pre_ping=True,
     future=True,
+    **pool_options(settings, settings.database_url, use_async=False),
 )
+pool_metrics = PoolMetrics()
+pool_metrics.attach(engine.pool)
+instrument_engine(engine)
+
+replica_set: Optional[ReplicaSet] = None
+replica_pool_metrics: Dict[str, Tuple[Pool, PoolMetrics]] = {}
+
+
+def _build_replicas(use_async: bool) -> Optional[ReplicaSet]:
+    replicas: List[Replica] = []
+    for index, url in enumerate(settings.database_replica_urls, start=1):
+        name = f"replica_{index}"
+        if use_async:
+            async_url = to_async_url(url)
+            session_engine = create_async_engine(
+                async_url, **pool_options(settings, async_url, use_async=True)
+            ).sync_engine
+            probe_engine = create_engine(url, poolclass=NullPool)
+        else:
+            session_engine = create_engine(
+                url, future=True, **pool_options(settings, url, use_async=False)
+            )
+            probe_engine = session_engine
+        metrics = PoolMetrics()
+        metrics.attach(session_engine.pool)
+        instrument_engine(session_engine)
+        replica_pool_metrics[name] = (session_engine.pool, metrics)
+        replicas.append(Replica(name, session_engine, probe_engine))
+    if not replicas:
+        return None
+    return ReplicaSet(replicas, max_lag_seconds=settings.replica_max_lag_seconds)
 
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+if settings.database_replica_urls:
+    replica_set = _build_replicas(settings.database_async)
+
+# write paths return the rows they just flushed; keeping them loaded after commit
+# avoids a SELECT per object to read back values the INSERT already produced.
+# In async mode this sync factory only serves background jobs, which stay on the primary
+SessionLocal = sessionmaker(
+    bind=engine,
+    class_=RoutingSession,
+    replicas=None if settings.database_async else replica_set,
+    autoflush=False,
+    autocommit=False,
+    expire_on_commit=False,
+    future=True,
+)
+
+async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+async_pool_metrics: Optional[PoolMetrics] = None
+# the AsyncSession of the current request in async mode; set by auth.get_db
+current_async_session: ContextVar[Optional[AsyncSession]] = ContextVar(
+    "current_async_session", default=None
+)
+
+if settings.database_async:
+    async_url = settings.async_database_url or to_async_url(settings.database_url)
+    async_engine = create_async_engine(
+        async_url,
+        **pool_options(settings, async_url, use_async=True),
+    )
+    async_pool_metrics = PoolMetrics()
+    async_pool_metrics.attach(async_engine.sync_engine.pool)
+    instrument_engine(async_engine.sync_engine)
+    # also required here: objects are read after commit outside the greenlet
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        sync_session_class=RoutingSession,
+        replicas=replica_set,
+        autoflush=False,
+        expire_on_commit=False,
+    )
 
 Base = declarative_base()
+
+
+def pools() -> Dict[str, Tuple[Pool, PoolMetrics]]:
+    entries = {"primary": (engine.pool, pool_metrics)}
+    if async_engine is not None and async_pool_metrics is not None:
+        entries["primary_async"] = (async_engine.sync_engine.pool, async_pool_metrics)
+    entries.update(replica_pool_metrics)
+    return entries
+
+
+async def run_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    # repositories and services are written against the sync Session API; in
+    # async mode they run through the request's AsyncSession.run_sync, which
+    # hands them its sync_session, otherwise on the threadpool
+    async_session = current_async_session.get()
+    if async_session is not None:
+        return await async_session.run_sync(lambda _sync_session: fn(*args, **kwargs))
+    return await run_in_threadpool(fn, *args, **kwargs)
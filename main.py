@@ -1,34 +1,151 @@
+import re
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
 from api.routes.auth import router as auth_router
 from api.routes.documents import router as documents_router
+from api.routes.metrics import router as metrics_router
+from api.routes.uploads import router as uploads_router
 from api.routes.users import router as users_router
-from core.config import get_settings
-from database import Base, engine
+from core.admission import AdmissionMiddleware, get_admission_controller
+from core.background import PeriodicTaskGroup, PeriodicTask
+from core.config import Settings, get_settings
+from core.instrumentation import InstrumentationMiddleware
+from core.password_hasher import get_password_hasher
+from core.uploads import (
+    MULTIPART_OVERHEAD_BYTES,
+    MULTIPART_OVERHEAD_PER_FILE_BYTES,
+    BodyLimit,
+    RequestBodyLimitMiddleware,
+)
+from database import SessionLocal, replica_set
 import models  # noqa: F401 ensures metadata is loaded
+from services.blob_scrubber import BlobScrubber
+from services.refresh_token_reaper import RefreshTokenReaper
+from services.upload_session_reaper import UploadSessionReaper
+from storage.blob_store import get_blob_store
+from storage.part_store import get_part_store
 
 
-Base.metadata.create_all(bind=engine)
+def build_background_tasks(settings: Settings) -> PeriodicTaskGroup:
+    tasks = PeriodicTaskGroup()
+    if settings.refresh_token_reaper_enabled:
+        reaper = RefreshTokenReaper(
+            SessionLocal,
+            batch_size=settings.refresh_token_reaper_batch_size,
+        )
+        tasks.add(
+            PeriodicTask(
+                "refresh-token-reaper",
+                settings.refresh_token_reaper_interval_seconds,
+                reaper.run_once,
+            )
+        )
+    if replica_set is not None:
+        tasks.add(
+            PeriodicTask(
+                "replica-health",
+                settings.replica_health_check_interval_seconds,
+                replica_set.check,
+            )
+        )
+    upload_reaper = UploadSessionReaper(
+        SessionLocal,
+        get_part_store(),
+        batch_size=settings.upload_session_reaper_batch_size,
+    )
+    tasks.add(
+        PeriodicTask(
+            "upload-session-reaper",
+            settings.upload_session_reaper_interval_seconds,
+            upload_reaper.run_once,
+        )
+    )
+    if settings.blob_scrub_enabled:
+        scrubber = BlobScrubber(
+            SessionLocal,
+            get_blob_store(),
+            batch_size=settings.blob_scrub_batch_size,
+            bytes_per_second=settings.blob_scrub_bytes_per_second,
+            chunk_size=settings.upload_chunk_size,
+        )
+        tasks.add(
+            PeriodicTask("blob-scrubber", settings.blob_scrub_interval_seconds, scrubber.run_once)
+        )
+    return tasks
 
-settings = get_settings()
 
-app = FastAPI(title=settings.app_name)
+def upload_body_limits(settings: Settings) -> List[BodyLimit]:
+    single = settings.max_upload_size_bytes + MULTIPART_OVERHEAD_BYTES
+    batch = (
+        settings.batch_upload_max_bytes
+        + MULTIPART_OVERHEAD_BYTES
+        + settings.batch_upload_max_files * MULTIPART_OVERHEAD_PER_FILE_BYTES
+    )
+    return [
+        ("POST", re.compile(r"^/documents$"), single),
+        ("POST", re.compile(r"^/documents/batch$"), batch),
+        # part bodies are raw bytes, not multipart
+        ("PUT", re.compile(r"^/uploads/[^/]+/parts/[^/]+$"), settings.max_upload_size_bytes),
+    ]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.cors_allow_origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-
-@app.get("/health", tags=["health"])
 def health_check():
     return {"status": "ok"}
 
 
-app.include_router(auth_router)
-app.include_router(documents_router)
-app.include_router(users_router)
+# the schema is managed by `python manage.py migrate`; building the app never
+# touches the database, so any number of workers can start concurrently
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    settings = settings or get_settings()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        tasks = build_background_tasks(settings)
+        tasks.start()
+        try:
+            yield
+        finally:
+            await tasks.stop()
+            await run_in_threadpool(get_password_hasher().shutdown)
+            # a later app in the same process (tests, reloads) gets a fresh pool
+            get_password_hasher.cache_clear()
+
+    app = FastAPI(title=settings.app_name, lifespan=lifespan)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_allow_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(RequestBodyLimitMiddleware, limits=upload_body_limits(settings))
+    if settings.admission_control_enabled:
+        # sheds load before any body is read or dependency runs
+        app.add_middleware(
+            AdmissionMiddleware,
+            controller=get_admission_controller(),
+            unknown_length_bytes=settings.upload_chunk_size,
+        )
+    if settings.metrics_enabled:
+        # added last so it wraps everything, including CORS preflights
+        app.add_middleware(
+            InstrumentationMiddleware,
+            slow_request_seconds=settings.slow_request_threshold_ms / 1000,
+        )
+
+    app.add_api_route("/health", health_check, methods=["GET"], tags=["health"])
+    app.include_router(auth_router)
+    app.include_router(documents_router)
+    app.include_router(metrics_router)
+    app.include_router(uploads_router)
+    app.include_router(users_router)
+    return app
+
+
+app = create_app()
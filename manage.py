@@ -0,0 +1,217 @@
+import argparse
+import logging
+import sys
+
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from database import SessionLocal, engine
+from migrations import (
+    assign_legacy_owner,
+    backfill_document_blobs,
+    count_unowned_documents,
+    drop_legacy_document_columns,
+    ensure_schema,
+    legacy_document_columns,
+    rebuild_blob_refs,
+    rebuild_user_usage,
+)
+from repositories.blob_repository import BlobRepository
+from services.blob_scrubber import BlobScrubber
+from services.blob_service import BlobService
+from storage.blob_store import get_blob_store
+
+
+def migrate(args: argparse.Namespace) -> int:
+    for change in ensure_schema(engine):
+        print(change)
+    # the new columns are added nullable next to the NOT NULL legacy ones, and
+    # neither the app nor the readers handle that half-migrated shape; finish it here
+    if legacy_document_columns(engine):
+        _move_legacy_documents(args.batch_size)
+    # documents from before ownership existed are invisible through the API
+    # until someone owns them; do not report success while any are left
+    unowned = count_unowned_documents(engine)
+    if unowned and not args.allow_unowned:
+        print(
+            f"{unowned} documents have no owner and cannot be read through the API. "
+            "Assign them with `manage.py assign-owner USERNAME [--uri-prefix PREFIX]` "
+            "and run migrate again, or pass --allow-unowned to accept that.",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+def backfill_blobs(args: argparse.Namespace) -> int:
+    ensure_schema(engine)
+    _move_legacy_documents(args.batch_size)
+    return 0
+
+
+def _move_legacy_documents(batch_size: int) -> None:
+    moved = backfill_document_blobs(engine, get_blob_store(), batch_size=batch_size)
+    print(f"moved {moved} documents to blob storage")
+    for column in drop_legacy_document_columns(engine):
+        print(f"dropped documents.{column}")
+    print(f"registered {rebuild_blob_refs(engine)} blobs")
+
+
+def rebuild_refs(args: argparse.Namespace) -> int:
+    print(f"registered {rebuild_blob_refs(engine)} blobs")
+    return 0
+
+
+def rebuild_usage(args: argparse.Namespace) -> int:
+    print(f"recounted usage for {rebuild_user_usage(engine)} users")
+    return 0
+
+
+def assign_owner(args: argparse.Namespace) -> int:
+    try:
+        assigned = assign_legacy_owner(engine, args.username, uri_prefix=args.uri_prefix)
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    print(f"assigned {assigned} documents to {args.username}")
+    print(f"recounted usage for {rebuild_user_usage(engine)} users")
+    return 0
+
+
+def gc_blobs(args: argparse.Namespace) -> int:
+    settings = get_settings()
+    grace = args.grace_seconds if args.grace_seconds is not None else settings.blob_gc_grace_seconds
+    with Session(engine) as session:
+        service = BlobService(session, BlobRepository(session), get_blob_store())
+        collected = service.collect_garbage(grace_seconds=grace, batch_size=args.batch_size)
+        print(f"collected {collected} unreferenced blobs")
+        if args.orphans:
+            swept = service.sweep_orphans(grace_seconds=grace, batch_size=args.batch_size)
+            print(f"swept {swept} orphaned files")
+    return 0
+
+
+def scrub(args: argparse.Namespace) -> int:
+    settings = get_settings()
+    bandwidth = args.bytes_per_second
+    # a cursor of its own, so a manual pass neither skips nor repeats background work
+    scrubber = BlobScrubber(
+        SessionLocal,
+        get_blob_store(),
+        batch_size=args.batch_size,
+        bytes_per_second=settings.blob_scrub_bytes_per_second if bandwidth is None else bandwidth,
+        chunk_size=settings.upload_chunk_size,
+        cursor_name="manual",
+    )
+    checked = 0
+    while True:
+        count = scrubber.run_once()
+        if not count:
+            break
+        checked += count
+    print(f"checked {checked} blobs; see the log and blobs.corrupt_at for failures")
+    return 0
+
+
+def serve(args: argparse.Namespace) -> int:
+    import uvicorn
+
+    settings = get_settings()
+    workers = args.workers or settings.server_workers
+    # the supervisor only forks; each worker builds its own app (and engine) through
+    # the factory. Send SIGHUP to the supervisor to replace workers one by one
+    uvicorn.run(
+        "main:create_app",
+        factory=True,
+        host=args.host or settings.server_host,
+        port=args.port or settings.server_port,
+        workers=None if args.reload else workers,
+        reload=args.reload,
+        timeout_keep_alive=settings.server_keep_alive_seconds,
+        timeout_graceful_shutdown=settings.server_graceful_shutdown_seconds,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.server_forwarded_allow_ips,
+    )
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Document storage API management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser(
+        "migrate",
+        help="create missing tables, columns and indexes and move legacy document bytes to blobs",
+    )
+    migrate_parser.add_argument("--batch-size", type=int, default=50)
+    migrate_parser.add_argument(
+        "--allow-unowned",
+        action="store_true",
+        help="succeed even though documents without an owner remain",
+    )
+    migrate_parser.set_defaults(handler=migrate)
+
+    backfill_parser = commands.add_parser(
+        "backfill-blobs", help="move legacy in-database document bytes to the blob store"
+    )
+    backfill_parser.add_argument("--batch-size", type=int, default=50)
+    backfill_parser.set_defaults(handler=backfill_blobs)
+
+    refs_parser = commands.add_parser(
+        "rebuild-blob-refs", help="recount blob references from the documents table"
+    )
+    refs_parser.set_defaults(handler=rebuild_refs)
+
+    usage_parser = commands.add_parser(
+        "rebuild-usage", help="recount per-user document and byte usage from the documents table"
+    )
+    usage_parser.set_defaults(handler=rebuild_usage)
+
+    owner_parser = commands.add_parser(
+        "assign-owner", help="give documents uploaded before ownership existed to a user"
+    )
+    owner_parser.add_argument("username")
+    owner_parser.add_argument(
+        "--uri-prefix", default=None, help="only documents whose uri starts with this"
+    )
+    owner_parser.set_defaults(handler=assign_owner)
+
+    gc_parser = commands.add_parser("gc-blobs", help="delete blobs that are no longer referenced")
+    gc_parser.add_argument("--batch-size", type=int, default=100)
+    gc_parser.add_argument("--grace-seconds", type=int, default=None)
+    gc_parser.add_argument(
+        "--orphans",
+        action="store_true",
+        help="also remove stored files that have no blob row (e.g. from failed uploads)",
+    )
+    gc_parser.set_defaults(handler=gc_blobs)
+
+    scrub_parser = commands.add_parser(
+        "scrub", help="re-verify stored blobs against their checksums, resuming where it stopped"
+    )
+    scrub_parser.add_argument("--batch-size", type=int, default=100)
+    scrub_parser.add_argument(
+        "--bytes-per-second", type=int, default=None, help="read bandwidth limit, 0 for none"
+    )
+    scrub_parser.set_defaults(handler=scrub)
+
+    serve_parser = commands.add_parser("serve", help="run the API with multiple worker processes")
+    serve_parser.add_argument("--host", default=None)
+    serve_parser.add_argument("--port", type=int, default=None)
+    serve_parser.add_argument("--workers", type=int, default=None)
+    serve_parser.add_argument(
+        "--reload", action="store_true", help="single process that restarts on code changes"
+    )
+    serve_parser.set_defaults(handler=serve)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import DateTime, and_, delete, func, insert, inspect, literal, select, text, update
+from sqlalchemy.engine import Engine
+
+from database import Base
+from models import Blob, Document, User, UserUsage
+from storage.blob_store import BlobStore
+
+logger = logging.getLogger(__name__)
+
+LEGACY_DOCUMENT_COLUMNS = ("base64_content", "file_bytes")
+
+
+def ensure_schema(engine: Engine) -> List[str]:
+    # create_all only creates missing tables, so columns and indexes added to
+    # existing tables are applied here; new columns are added as nullable
+    Base.metadata.create_all(bind=engine)
+    preparer = engine.dialect.identifier_preparer
+    applied: List[str] = []
+
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        for table in Base.metadata.sorted_tables:
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {preparer.format_table(table)} "
+                        f"ADD COLUMN {preparer.format_column(column)} {column_type}"
+                    )
+                )
+                applied.append(f"add column {table.name}.{column.name}")
+
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                index.create(connection)
+                applied.append(f"create index {index.name}")
+
+    return applied
+
+
+def legacy_document_columns(engine: Engine) -> List[str]:
+    columns = {column["name"] for column in inspect(engine).get_columns("documents")}
+    return [name for name in LEGACY_DOCUMENT_COLUMNS if name in columns]
+
+
+def backfill_document_blobs(engine: Engine, blob_store: BlobStore, *, batch_size: int = 50) -> int:
+    if "file_bytes" not in legacy_document_columns(engine):
+        return 0
+
+    moved = 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                text(
+                    "SELECT id, file_bytes FROM documents "
+                    "WHERE blob_key IS NULL ORDER BY id LIMIT :limit"
+                ),
+                {"limit": batch_size},
+            ).all()
+            if not rows:
+                break
+
+            for document_id, file_bytes in rows:
+                payload = bytes(file_bytes or b"")
+                key = hashlib.sha256(payload).hexdigest()
+                staged = blob_store.stage()
+                staged.file.write(payload)
+                blob_store.commit(staged, key)
+                connection.execute(
+                    text("UPDATE documents SET blob_key = :key, size_bytes = :size WHERE id = :id"),
+                    {"key": key, "size": len(payload), "id": document_id},
+                )
+            moved += len(rows)
+            logger.info("Moved %s documents to blob storage", moved)
+
+    return moved
+
+
+def drop_legacy_document_columns(engine: Engine) -> List[str]:
+    legacy = legacy_document_columns(engine)
+    with engine.begin() as connection:
+        for name in legacy:
+            connection.execute(text(f"ALTER TABLE documents DROP COLUMN {name}"))
+        if engine.dialect.name == "postgresql":
+            connection.execute(text("ALTER TABLE documents ALTER COLUMN blob_key SET NOT NULL"))
+            connection.execute(text("ALTER TABLE documents ALTER COLUMN size_bytes SET NOT NULL"))
+    return legacy
+
+
+def rebuild_blob_refs(engine: Engine) -> int:
+    now = datetime.now(timezone.utc)
+    documents = Document.__table__
+    blobs = Blob.__table__
+    reference_count = (
+        select(func.count())
+        .where(documents.c.blob_key == blobs.c.key)
+        .scalar_subquery()
+    )
+
+    with engine.begin() as connection:
+        missing = (
+            select(
+                documents.c.blob_key,
+                func.max(documents.c.size_bytes),
+                func.count(),
+                literal(now, DateTime(timezone=True)),
+            )
+            .where(documents.c.blob_key.is_not(None))
+            .where(documents.c.blob_key.not_in(select(blobs.c.key)))
+            .group_by(documents.c.blob_key)
+        )
+        inserted = connection.execute(
+            insert(blobs).from_select(["key", "size_bytes", "ref_count", "created_at"], missing)
+        ).rowcount
+        connection.execute(update(blobs).values(ref_count=reference_count))
+        connection.execute(
+            update(blobs)
+            .where(and_(blobs.c.ref_count <= 0, blobs.c.released_at.is_(None)))
+            .values(released_at=now)
+        )
+    return inserted
+
+
+def rebuild_user_usage(engine: Engine) -> int:
+    # recomputes the counters from scratch; run it with uploads paused, or the
+    # documents inserted while it runs are counted twice or not at all
+    documents = Document.__table__
+    totals = (
+        select(
+            documents.c.owner_id,
+            func.count(),
+            func.coalesce(func.sum(documents.c.size_bytes), 0),
+        )
+        .where(documents.c.owner_id.is_not(None))
+        .group_by(documents.c.owner_id)
+    )
+    with engine.begin() as connection:
+        connection.execute(delete(UserUsage))
+        return connection.execute(
+            insert(UserUsage).from_select(["user_id", "document_count", "total_bytes"], totals)
+        ).rowcount
+
+
+def count_unowned_documents(engine: Engine) -> int:
+    documents = Document.__table__
+    with engine.connect() as connection:
+        return connection.execute(
+            select(func.count()).select_from(documents).where(documents.c.owner_id.is_(None))
+        ).scalar_one()
+
+
+def assign_legacy_owner(engine: Engine, username: str, *, uri_prefix: Optional[str] = None) -> int:
+    # legacy rows carry no trace of who uploaded them, so the operator decides;
+    # uri_prefix lets one pass per user split them up
+    documents = Document.__table__
+    with engine.begin() as connection:
+        user_id = connection.execute(
+            select(User.__table__.c.id).where(User.__table__.c.username == username)
+        ).scalar()
+        if user_id is None:
+            raise ValueError(f"Unknown user {username!r}")
+        query = update(documents).where(documents.c.owner_id.is_(None))
+        if uri_prefix is not None:
+            query = query.where(documents.c.uri.startswith(uri_prefix, autoescape=True))
+        return connection.execute(query.values(owner_id=user_id)).rowcount
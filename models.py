@@ -1,10 +1,49 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, LargeBinary, String
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    PrimaryKeyConstraint,
+    String,
+)
 from sqlalchemy.orm import relationship
 
 from database import Base
 
+
+class Blob(Base):
+    __tablename__ = "blobs"
+
+    key = Column(String(64), primary_key=True)
+    size_bytes = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    encoding = Column(String(16), nullable=True)
+    stored_size_bytes = Column(BigInteger, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    released_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    # set by the scrubber; the key itself is the SHA-256 checksum it verifies against
+    verified_at = Column(DateTime(timezone=True), nullable=True)
+    corrupt_at = Column(DateTime(timezone=True), nullable=True, index=True)
+
+
+# position of the background scrubber in its pass over blob keys, shared by all workers
+class ScrubCursor(Base):
+    __tablename__ = "scrub_cursors"
+
+    name = Column(String(32), primary_key=True)
+    position = Column(String(64), nullable=False, default="")
+    pass_started_at = Column(DateTime(timezone=True), nullable=True)
+    # only the process holding the lease scrubs, so the bandwidth limit is global
+    lease_owner = Column(String(64), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+
+
 class Document(Base):
     __tablename__ = "documents"
 
@@ -12,10 +51,29 @@ class Document(Base):
     filename = Column(String, nullable=False)
     mime_type = Column(String, nullable=False)
     uri = Column(String, nullable=False)
-    base64_content = Column(String, nullable=False)
-    file_bytes = Column(LargeBinary, nullable=False)
+    blob_key = Column(String(64), ForeignKey("blobs.key"), nullable=False, index=True)
+    size_bytes = Column(BigInteger, nullable=False)
+    # documents uploaded before ownership was recorded have no owner and are not
+    # reachable through the API until `manage.py assign-owner` gives them one
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
+    blob = relationship("Blob")
+
+    __table_args__ = (
+        Index("ix_documents_created_at_id", "created_at", "id"),
+        Index("ix_documents_owner_id_created_at_id", "owner_id", "created_at", "id"),
+        Index(
+            "ix_documents_owner_id_mime_type_created_at_id",
+            "owner_id",
+            "mime_type",
+            "created_at",
+            "id",
+        ),
+        Index("ix_documents_mime_type_created_at_id", "mime_type", "created_at", "id"),
+        Index("ix_documents_uri_prefix", "uri", postgresql_ops={"uri": "varchar_pattern_ops"}),
+    )
+
 
 class User(Base):
     __tablename__ = "users"
@@ -23,6 +81,8 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, nullable=False)
     password_hash = Column(String, nullable=False)
+    # access tokens issued before this are rejected by every worker
+    tokens_revoked_at = Column(DateTime(timezone=True), nullable=True)
     refresh_tokens = relationship(
         "RefreshToken",
         back_populates="user",
@@ -30,14 +90,59 @@ class User(Base):
     )
 
 
+# maintained alongside every document insert and delete so quota checks read one row
+class UserUsage(Base):
+    __tablename__ = "user_usage"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    document_count = Column(BigInteger, nullable=False, default=0)
+    total_bytes = Column(BigInteger, nullable=False, default=0)
+
+
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
 
     id = Column(Integer, primary_key=True, index=True)
     token_hash = Column(String, unique=True, nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    expires_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
     revoked = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
 
     user = relationship("User", back_populates="refresh_tokens")
+
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    filename = Column(String, nullable=False)
+    mime_type = Column(String, nullable=False)
+    uri = Column(String, nullable=False)
+    status = Column(String(16), nullable=False, default="open")
+    # running size of the stored parts, so limits apply while parts arrive
+    received_bytes = Column(BigInteger, nullable=True, default=0)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    parts = relationship(
+        "UploadPart",
+        back_populates="upload",
+        cascade="all, delete-orphan",
+        order_by="UploadPart.part_number",
+    )
+
+
+class UploadPart(Base):
+    __tablename__ = "upload_parts"
+
+    upload_id = Column(String(32), ForeignKey("upload_sessions.id", ondelete="CASCADE"), nullable=False)
+    part_number = Column(Integer, nullable=False)
+    size_bytes = Column(BigInteger, nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    upload = relationship("UploadSession", back_populates="parts")
+
+    __table_args__ = (PrimaryKeyConstraint("upload_id", "part_number"),)
@@ -0,0 +1,199 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Blob, ScrubCursor
+
+
+class BlobRepository:
+    def __init__(self, session: Session) -> None:
+        self._session = session
+
+    def acquire(
+        self,
+        key: str,
+        size_bytes: int,
+        *,
+        encoding: Optional[str] = None,
+        stored_size_bytes: Optional[int] = None,
+        count: int = 1,
+    ) -> None:
+        if self._increment(key, count):
+            return
+        try:
+            with self._session.begin_nested():
+                self._session.add(
+                    Blob(
+                        key=key,
+                        size_bytes=size_bytes,
+                        ref_count=count,
+                        encoding=encoding,
+                        stored_size_bytes=stored_size_bytes,
+                    )
+                )
+        except IntegrityError:
+            # a concurrent upload of the same content inserted the row first
+            self._increment(key, count)
+
+    def acquire_many(self, blobs: List[Blob]) -> None:
+        # blobs carry the number of references to take in ref_count
+        counts: Dict[str, int] = {blob.key: blob.ref_count for blob in blobs}
+        existing = set(self.existing_keys(list(counts)))
+        incremented = set()
+        if existing:
+            rows = self._session.execute(
+                update(Blob)
+                .where(Blob.key.in_(existing))
+                .values(
+                    ref_count=Blob.ref_count
+                    + case({key: counts[key] for key in existing}, value=Blob.key, else_=0),
+                    released_at=None,
+                )
+                .returning(Blob.key)
+                .execution_options(synchronize_session=False)
+            )
+            incremented = {row.key for row in rows}
+
+        # rows removed by garbage collection in the meantime are inserted again
+        missing = [blob for blob in blobs if blob.key not in incremented]
+        if not missing:
+            return
+        try:
+            with self._session.begin_nested():
+                self._session.execute(
+                    insert(Blob),
+                    [
+                        {
+                            "key": blob.key,
+                            "size_bytes": blob.size_bytes,
+                            "ref_count": blob.ref_count,
+                            "encoding": blob.encoding,
+                            "stored_size_bytes": blob.stored_size_bytes,
+                        }
+                        for blob in missing
+                    ],
+                )
+        except IntegrityError:
+            for blob in missing:
+                self.acquire(
+                    blob.key,
+                    blob.size_bytes,
+                    encoding=blob.encoding,
+                    stored_size_bytes=blob.stored_size_bytes,
+                    count=blob.ref_count,
+                )
+
+    def release(self, key: str) -> None:
+        self._session.query(Blob).filter(Blob.key == key).update(
+            {
+                Blob.ref_count: Blob.ref_count - 1,
+                Blob.released_at: case(
+                    (Blob.ref_count <= 1, datetime.now(timezone.utc)),
+                    else_=Blob.released_at,
+                ),
+            },
+            synchronize_session=False,
+        )
+
+    def lock_collectable(self, released_before: datetime, limit: int) -> List[str]:
+        rows = (
+            self._session.query(Blob.key)
+            .filter(Blob.ref_count <= 0, Blob.released_at <= released_before)
+            .order_by(Blob.released_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        return [row.key for row in rows]
+
+    def existing_keys(self, keys: List[str]) -> List[str]:
+        rows = self._session.query(Blob.key).filter(Blob.key.in_(keys)).all()
+        return [row.key for row in rows]
+
+    def delete(self, key: str) -> None:
+        self._session.query(Blob).filter(Blob.key == key, Blob.ref_count <= 0).delete(
+            synchronize_session=False
+        )
+
+    def scrub_cursor(self, name: str) -> ScrubCursor:
+        cursor = self._session.get(ScrubCursor, name, populate_existing=True)
+        if cursor is not None:
+            return cursor
+        try:
+            with self._session.begin_nested():
+                cursor = ScrubCursor(name=name, position="")
+                self._session.add(cursor)
+        except IntegrityError:
+            cursor = self._session.get(ScrubCursor, name, populate_existing=True)
+        return cursor
+
+    def acquire_scrub_lease(self, name: str, owner: str, now: datetime, expires_at: datetime) -> bool:
+        # taken over only once the holder stopped renewing it
+        updated = self._session.execute(
+            update(ScrubCursor)
+            .where(
+                ScrubCursor.name == name,
+                or_(
+                    ScrubCursor.lease_owner.is_(None),
+                    ScrubCursor.lease_owner == owner,
+                    ScrubCursor.lease_expires_at <= now,
+                ),
+            )
+            .values(lease_owner=owner, lease_expires_at=expires_at)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        return updated > 0
+
+    def advance_scrub_cursor(
+        self,
+        name: str,
+        expected: str,
+        position: str,
+        *,
+        pass_started_at: Optional[datetime] = None,
+    ) -> bool:
+        # compare-and-set, so concurrent workers never claim the same batch
+        values = {"position": position, "updated_at": datetime.now(timezone.utc)}
+        if pass_started_at is not None:
+            values["pass_started_at"] = pass_started_at
+        updated = self._session.execute(
+            update(ScrubCursor)
+            .where(ScrubCursor.name == name, ScrubCursor.position == expected)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        return updated > 0
+
+    def scrub_batch(self, after_key: str, limit: int) -> List[Blob]:
+        return (
+            self._session.query(Blob)
+            .filter(Blob.key > after_key, Blob.ref_count > 0)
+            .order_by(Blob.key)
+            .limit(limit)
+            .all()
+        )
+
+    def mark_verified(self, keys: List[str], verified_at: datetime) -> None:
+        self._session.query(Blob).filter(Blob.key.in_(keys)).update(
+            {Blob.verified_at: verified_at, Blob.corrupt_at: None},
+            synchronize_session=False,
+        )
+
+    def mark_corrupt(self, keys: List[str], detected_at: datetime) -> None:
+        self._session.query(Blob).filter(Blob.key.in_(keys)).update(
+            {Blob.corrupt_at: detected_at}, synchronize_session=False
+        )
+
+    def _increment(self, key: str, count: int = 1) -> bool:
+        updated = (
+            self._session.query(Blob)
+            .filter(Blob.key == key)
+            .update(
+                {Blob.ref_count: Blob.ref_count + count, Blob.released_at: None},
+                synchronize_session=False,
+            )
+        )
+        return updated > 0
@@ -1,6 +1,8 @@
-from typing import Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, tuple_
+from sqlalchemy.orm import Session, joinedload
 
 from models import Document
 
@@ -13,5 +15,48 @@ class DocumentRepository:
         self._session.add(document)
         return document
 
-    def get_by_id(self, document_id: int) -> Optional[Document]:
-        return self._session.query(Document).filter(Document.id == document_id).first()
+    def add_many(self, rows: List[Dict[str, Any]]) -> List[Document]:
+        # one multi-row INSERT ... RETURNING instead of a flush per document
+        result = self._session.scalars(insert(Document).returning(Document), rows)
+        return list(result)
+
+    def delete(self, document: Document) -> None:
+        self._session.delete(document)
+
+    def get_by_id(self, document_id: int, owner_id: int) -> Optional[Document]:
+        return (
+            self._session.query(Document)
+            .options(joinedload(Document.blob))
+            .filter(Document.id == document_id, Document.owner_id == owner_id)
+            .first()
+        )
+
+    def get_many(self, document_ids: List[int], owner_id: int) -> List[Document]:
+        return (
+            self._session.query(Document)
+            .options(joinedload(Document.blob))
+            .filter(Document.id.in_(document_ids), Document.owner_id == owner_id)
+            .all()
+        )
+
+    def list_page(
+        self,
+        *,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+        uri_prefix: Optional[str] = None,
+        owner_id: int,
+        mime_type: Optional[str] = None,
+    ) -> List[Document]:
+        query = self._session.query(Document).filter(Document.owner_id == owner_id)
+        if uri_prefix:
+            query = query.filter(Document.uri.startswith(uri_prefix, autoescape=True))
+        if mime_type:
+            query = query.filter(Document.mime_type == mime_type)
+        if after is not None:
+            query = query.filter(tuple_(Document.created_at, Document.id) < tuple_(*after))
+        return (
+            query.order_by(Document.created_at.desc(), Document.id.desc())
+            .limit(limit)
+            .all()
+        )
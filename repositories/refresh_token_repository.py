@@ -1,32 +1,53 @@
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Optional, Tuple
 
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session
 
-from models import RefreshToken
+from models import RefreshToken, User
 
 
 class RefreshTokenRepository:
     def __init__(self, session: Session) -> None:
         self._session = session
 
-    def create(self, token: RefreshToken) -> RefreshToken:
-        self._session.add(token)
-        return token
+    def insert(self, *, token_hash: str, user_id: int, expires_at: datetime) -> None:
+        # plain INSERT: nothing reads the new row back, so skip the ORM unit of work
+        self._session.execute(
+            insert(RefreshToken).values(
+                token_hash=token_hash,
+                user_id=user_id,
+                expires_at=expires_at,
+                revoked=False,
+                created_at=datetime.now(timezone.utc),
+            )
+        )
 
-    def get_by_hash(self, token_hash: str) -> Optional[RefreshToken]:
-        return (
-            self._session.query(RefreshToken)
-            .filter(
+    def consume(self, token_hash: str) -> Optional[Tuple[int, str]]:
+        # revoking and reading the owner in one conditional statement makes the token
+        # single-use: of two concurrent refreshes only one UPDATE matches the row.
+        # The username comes from a correlated subquery because SQLite's RETURNING
+        # cannot reference UPDATE ... FROM tables.
+        username = (
+            select(User.username)
+            .where(User.id == RefreshToken.user_id)
+            .scalar_subquery()
+            .label("username")
+        )
+        row = self._session.execute(
+            update(RefreshToken)
+            .where(
                 RefreshToken.token_hash == token_hash,
                 RefreshToken.revoked.is_(False),
                 RefreshToken.expires_at > datetime.now(timezone.utc),
             )
-            .first()
-        )
-
-    def revoke(self, token: RefreshToken) -> None:
-        token.revoked = True
+            .values(revoked=True)
+            .returning(RefreshToken.user_id, username)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if row is None or row.username is None:
+            return None
+        return row.user_id, row.username
 
     def revoke_all_for_user(self, user_id: int) -> int:
         query = (
@@ -36,9 +57,14 @@ class RefreshTokenRepository:
         updated = query.update({RefreshToken.revoked: True})
         return updated
 
-    def delete_expired(self) -> int:
-        query = self._session.query(RefreshToken).filter(
-            RefreshToken.expires_at <= datetime.now(timezone.utc)
+    def delete_expired(self, limit: int) -> int:
+        expired_ids = (
+            self._session.query(RefreshToken.id)
+            .filter(RefreshToken.expires_at <= datetime.now(timezone.utc))
+            .order_by(RefreshToken.expires_at)
+            .limit(limit)
+            .scalar_subquery()
         )
+        query = self._session.query(RefreshToken).filter(RefreshToken.id.in_(expired_ids))
         deleted = query.delete(synchronize_session=False)
         return deleted
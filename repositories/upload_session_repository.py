@@ -0,0 +1,80 @@
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy.orm import Session, selectinload
+
+from models import UploadPart, UploadSession
+
+
+class UploadSessionRepository:
+    def __init__(self, session: Session) -> None:
+        self._session = session
+
+    def add(self, upload: UploadSession) -> UploadSession:
+        self._session.add(upload)
+        return upload
+
+    def get_by_id(self, upload_id: str) -> Optional[UploadSession]:
+        return (
+            self._session.query(UploadSession)
+            .options(selectinload(UploadSession.parts))
+            .filter(UploadSession.id == upload_id)
+            .first()
+        )
+
+    def lock(self, upload_id: str) -> Optional[UploadSession]:
+        return (
+            self._session.query(UploadSession)
+            .filter(UploadSession.id == upload_id)
+            .populate_existing()
+            .with_for_update()
+            .first()
+        )
+
+    def part_size(self, upload_id: str, part_number: int) -> Optional[int]:
+        return (
+            self._session.query(UploadPart.size_bytes)
+            .filter(UploadPart.upload_id == upload_id, UploadPart.part_number == part_number)
+            .scalar()
+        )
+
+    def save_part(self, part: UploadPart) -> UploadPart:
+        return self._session.merge(part)
+
+    def transition(
+        self,
+        upload_id: str,
+        from_status: str,
+        to_status: str,
+        *,
+        expires_at: Optional[datetime] = None,
+    ) -> bool:
+        values = {UploadSession.status: to_status}
+        if expires_at is not None:
+            values[UploadSession.expires_at] = expires_at
+        updated = (
+            self._session.query(UploadSession)
+            .filter(UploadSession.id == upload_id, UploadSession.status == from_status)
+            .update(values, synchronize_session=False)
+        )
+        return updated > 0
+
+    def delete_by_ids(self, upload_ids: List[str]) -> int:
+        self._session.query(UploadPart).filter(UploadPart.upload_id.in_(upload_ids)).delete(
+            synchronize_session=False
+        )
+        return (
+            self._session.query(UploadSession)
+            .filter(UploadSession.id.in_(upload_ids))
+            .delete(synchronize_session=False)
+        )
+
+    def list_expired_ids(self, now: datetime, limit: int) -> List[str]:
+        rows = (
+            self._session.query(UploadSession.id)
+            .filter(UploadSession.expires_at <= now)
+            .order_by(UploadSession.expires_at)
+            .limit(limit)
+            .all()
+        )
+        return [row.id for row in rows]
@@ -0,0 +1,73 @@
+from typing import Optional
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import UserUsage
+
+
+class UsageRepository:
+    def __init__(self, session: Session) -> None:
+        self._session = session
+
+    def get(self, user_id: int) -> Optional[UserUsage]:
+        # always re-read: the counters are changed by UPDATE statements behind the identity map
+        return self._session.get(UserUsage, user_id, populate_existing=True)
+
+    def reserve(
+        self,
+        user_id: int,
+        documents: int,
+        size_bytes: int,
+        *,
+        max_documents: int = 0,
+        max_bytes: int = 0,
+    ) -> bool:
+        # the quota check and the increment are one conditional UPDATE, so
+        # concurrent uploads cannot both pass a check and overshoot together
+        if self._add(user_id, documents, size_bytes, max_documents, max_bytes):
+            return True
+        if self.get(user_id) is not None:
+            return False
+        try:
+            with self._session.begin_nested():
+                self._session.add(UserUsage(user_id=user_id, document_count=0, total_bytes=0))
+        except IntegrityError:
+            # a concurrent upload by the same user created the row first
+            pass
+        return self._add(user_id, documents, size_bytes, max_documents, max_bytes)
+
+    def release(self, user_id: int, documents: int, size_bytes: int) -> None:
+        self._session.execute(
+            update(UserUsage)
+            .where(UserUsage.user_id == user_id)
+            .values(
+                document_count=UserUsage.document_count - documents,
+                total_bytes=UserUsage.total_bytes - size_bytes,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def _add(
+        self,
+        user_id: int,
+        documents: int,
+        size_bytes: int,
+        max_documents: int,
+        max_bytes: int,
+    ) -> bool:
+        statement = (
+            update(UserUsage)
+            .where(UserUsage.user_id == user_id)
+            .values(
+                document_count=UserUsage.document_count + documents,
+                total_bytes=UserUsage.total_bytes + size_bytes,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if max_documents:
+            statement = statement.where(UserUsage.document_count + documents <= max_documents)
+        if max_bytes:
+            statement = statement.where(UserUsage.total_bytes + size_bytes <= max_bytes)
+        return self._session.execute(statement).rowcount > 0
@@ -1,4 +1,5 @@
-from typing import Optional
+from datetime import datetime
+from typing import Optional, Tuple
 
 from sqlalchemy.orm import Session
 
@@ -12,6 +13,19 @@ class UserRepository:
     def get_by_username(self, username: str) -> Optional[User]:
         return self._session.query(User).filter(User.username == username).first()
 
+    def get_token_state(self, user_id: int) -> Optional[Tuple[int, Optional[datetime]]]:
+        # None means no such user; a NULL revocation time comes back as (id, None)
+        return (
+            self._session.query(User.id, User.tokens_revoked_at)
+            .filter(User.id == user_id)
+            .one_or_none()
+        )
+
+    def revoke_tokens(self, user_id: int, revoked_at: datetime) -> None:
+        self._session.query(User).filter(User.id == user_id).update(
+            {User.tokens_revoked_at: revoked_at}, synchronize_session=False
+        )
+
     def add(self, user: User) -> User:
         self._session.add(user)
         return user
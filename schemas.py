@@ -1,11 +1,11 @@
 from datetime import datetime
+from typing import List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class ORMModel(BaseModel):
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class DocumentOut(ORMModel):
@@ -16,6 +16,42 @@ class DocumentOut(ORMModel):
     created_at: datetime
 
 
+class DocumentMetaOut(DocumentOut):
+    size_bytes: int
+
+
+class DocumentPage(BaseModel):
+    items: List[DocumentMetaOut]
+    next_cursor: Optional[str] = None
+
+
+class DocumentExportRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    uri: str
+    mime_type: str = "application/octet-stream"
+
+
+class UploadPartOut(ORMModel):
+    part_number: int
+    size_bytes: int
+    sha256: str
+
+
+class UploadSessionOut(ORMModel):
+    id: str
+    filename: str
+    mime_type: str
+    uri: str
+    status: str
+    created_at: datetime
+    expires_at: datetime
+    parts: List[UploadPartOut] = []
+
+
 class TokenResponse(BaseModel):
     access_token: str
     refresh_token: str
@@ -36,3 +72,10 @@ class UserCreate(BaseModel):
 class UserOut(ORMModel):
     id: int
     username: str
+
+
+class UsageOut(BaseModel):
+    document_count: int
+    total_bytes: int
+    max_documents: Optional[int] = None
+    max_bytes: Optional[int] = None
@@ -1,18 +1,24 @@
 from dataclasses import dataclass
-from typing import Tuple
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
 
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
 from core.config import get_settings
+from core.instrumentation import timed
+from core.password_hasher import PasswordHasher, get_password_hasher
+from core.replicas import read_from_replica
 from core.security import (
+    Principal,
     TokenPair,
     create_token_pair,
     get_refresh_token_expiry,
     hash_refresh_token_value,
-    verify_password,
 )
-from models import RefreshToken, User
+from core.token_cache import AccessTokenCache
+from database import run_db
+from models import User
 from repositories.refresh_token_repository import RefreshTokenRepository
 from repositories.user_repository import UserRepository
 
@@ -25,9 +31,13 @@ class RefreshTokenError(Exception):
     pass
 
 
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
 @dataclass(frozen=True)
 class AuthResult:
-    user: User
+    user: Principal
     tokens: TokenPair
 
 
@@ -37,40 +47,84 @@ class AuthService:
         session: Session,
         user_repository: UserRepository,
         refresh_token_repository: RefreshTokenRepository,
+        token_cache: Optional[AccessTokenCache] = None,
+        password_hasher: Optional[PasswordHasher] = None,
     ) -> None:
         self._session = session
         self._users = user_repository
         self._refresh_tokens = refresh_token_repository
+        self._token_cache = token_cache
+        self._password_hasher = password_hasher or get_password_hasher()
         self._settings = get_settings()
 
-    def authenticate(self, username: str, password: str) -> AuthResult:
-        user = self._users.get_by_username(username)
-        if not user or not verify_password(password, user.password_hash):
+    async def authenticate(self, username: str, password: str) -> AuthResult:
+        user = await run_db(self._find_user, username)
+        if not user or not await self._password_hasher.verify_async(password, user.password_hash):
             raise AuthenticationError("Invalid credentials")
 
-        self._refresh_tokens.delete_expired()
-        tokens = self._issue_new_tokens(user)
-        self._session.commit()
+        return await run_db(self._complete_login, user)
 
-        return AuthResult(user=user, tokens=tokens)
+    def _complete_login(self, user: User) -> AuthResult:
+        principal = Principal(id=user.id, username=user.username)
+        tokens = self._issue_new_tokens(principal)
+        self._session.commit()
+        return AuthResult(user=principal, tokens=tokens)
 
     def refresh(self, refresh_token: str) -> AuthResult:
-        self._refresh_tokens.delete_expired()
-        token_hash = hash_refresh_token_value(refresh_token)
-        stored_token = self._refresh_tokens.get_by_hash(token_hash)
-        if not stored_token or stored_token.revoked:
+        owner = self._refresh_tokens.consume(hash_refresh_token_value(refresh_token))
+        if owner is None:
+            self._session.rollback()
             raise RefreshTokenError("Invalid refresh token")
 
-        stored_token.revoked = True
-        user = stored_token.user
-        if user is None:
-            raise RefreshTokenError("Refresh token has no associated user")
-
-        tokens = self._issue_new_tokens(user)
+        principal = Principal(id=owner[0], username=owner[1])
+        tokens = self._issue_new_tokens(principal)
         self._session.commit()
-        return AuthResult(user=user, tokens=tokens)
+        return AuthResult(user=principal, tokens=tokens)
 
-    def decode_access_token(self, token: str) -> Tuple[str, str]:
+    def revoke_user_sessions(self, user_id: int) -> int:
+        revoked = self._refresh_tokens.revoke_all_for_user(user_id)
+        self._users.revoke_tokens(user_id, datetime.now(timezone.utc))
+        self._session.commit()
+        if self._token_cache is not None:
+            self._token_cache.invalidate_user(user_id)
+        return revoked
+
+    def resolve_principal_from_token(self, token: str) -> Principal:
+        if self._token_cache is not None:
+            cached = self._token_cache.get(token)
+            if cached is not None:
+                return cached
+
+        payload = self._decode_access_claims(token)
+        user_id = payload.get("uid")
+        if isinstance(user_id, int):
+            principal = Principal(id=user_id, username=payload["sub"])
+            # read from the primary so a logout or deletion in any worker is seen on the next miss
+            state = self._users.get_token_state(user_id)
+            if state is None:
+                raise AuthenticationError("User not found")
+            revoked_at = state.tokens_revoked_at
+        else:
+            # tokens issued before uid was embedded still need the lookup
+            user = self._find_user(payload["sub"])
+            if not user:
+                raise AuthenticationError("User not found")
+            principal = Principal(id=user.id, username=user.username)
+            revoked_at = user.tokens_revoked_at
+
+        if revoked_at is not None and payload.get("iat", 0) < int(_as_utc(revoked_at).timestamp()):
+            # iat has one-second resolution, so only tokens from earlier seconds are rejected
+            raise AuthenticationError("Access token has been revoked")
+        if self._token_cache is not None:
+            self._token_cache.put(token, principal, payload.get("exp", 0))
+        return principal
+
+    def _find_user(self, username: str) -> Optional[User]:
+        # a user created moments ago may not be on the replica yet; misses retry on the primary
+        return read_from_replica(self._session, self._users.get_by_username, username)
+
+    @timed("decode_access_token")
+    def _decode_access_claims(self, token: str) -> Dict[str, Any]:
         try:
             payload = jwt.decode(
                 token,
@@ -80,32 +134,16 @@ class AuthService:
         except JWTError as exc:
             raise AuthenticationError("Invalid access token") from exc
 
-        token_type = payload.get("token_type")
-        subject = payload.get("sub")
-        if token_type != "access" or not subject:
+        if payload.get("token_type") != "access" or not payload.get("sub"):
             raise AuthenticationError("Invalid token payload")
 
-        return subject, token_type
-
-    def resolve_user_from_token(self, token: str) -> User:
-        subject, _ = self.decode_access_token(token)
-        user = self._users.get_by_username(subject)
-        if not user:
-            raise AuthenticationError("User not found")
-        return user
+        return payload
 
-    def _issue_new_tokens(self, user: User) -> TokenPair:
-        tokens = create_token_pair(user.username)
-        self._persist_refresh_token(tokens.refresh_token, user)
-        return tokens
-
-    def _persist_refresh_token(self, raw_refresh_token: str, user: User) -> None:
-        refresh_entity = RefreshToken(
-            token_hash=hash_refresh_token_value(raw_refresh_token),
-            user_id=user.id,
+    def _issue_new_tokens(self, principal: Principal) -> TokenPair:
+        tokens = create_token_pair(principal.username, user_id=principal.id)
+        self._refresh_tokens.insert(
+            token_hash=hash_refresh_token_value(tokens.refresh_token),
+            user_id=principal.id,
             expires_at=get_refresh_token_expiry(),
-            revoked=False,
         )
-        self._refresh_tokens.create(refresh_entity)
-        # session flush ensures id assigned before commit when needed elsewhere
-        self._session.flush()
+        return tokens
@@ -0,0 +1,170 @@
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from core.instrumentation import get_metrics_registry
+from models import Blob
+from repositories.blob_repository import BlobRepository
+from storage.blob_store import BlobNotFoundError, BlobStore
+from storage.integrity import ContentDigest, Throttle
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CURSOR = "background"
+# a run reads at most this many seconds' worth of the bandwidth budget, which
+# keeps any single run (and so a shutdown waiting on it) short
+RUN_SECONDS = 10
+# renewed on every claim and while a run reads, so it only lapses when the holding
+# process stops scrubbing; a single blob can take longer to read than this
+LEASE_SECONDS = 60
+
+
+class ScrubLeaseLostError(Exception):
+    pass
+
+
+class BlobScrubber:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        blob_store: BlobStore,
+        *,
+        batch_size: int,
+        bytes_per_second: int,
+        chunk_size: int,
+        cursor_name: str = DEFAULT_CURSOR,
+    ) -> None:
+        self._session_factory = session_factory
+        self._blobs = blob_store
+        self._batch_size = batch_size
+        self._bytes_per_second = bytes_per_second
+        self._chunk_size = chunk_size
+        self._cursor_name = cursor_name
+        self._owner = f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lease_renewed_at = 0.0
+        self._registry = get_metrics_registry()
+        self._registry.counter("blob_scrub_blobs_total", "Blobs checked by the scrubber by result")
+        self._registry.counter("blob_scrub_bytes_total", "Stored bytes read by the scrubber")
+
+    def run_once(self) -> int:
+        batch = self._claim_batch()
+        if not batch:
+            return 0
+
+        throttle = Throttle(self._bytes_per_second)
+        verified: List[str] = []
+        corrupt: List[str] = []
+        for blob in batch:
+            try:
+                problem = self._verify(blob, throttle)
+            except ScrubLeaseLostError:
+                # whoever took over scrubs from the cursor on; the rest of this batch
+                # waits for the next pass
+                logger.warning("Lost the %r scrub lease mid-batch", self._cursor_name)
+                break
+            self._registry.inc("blob_scrub_blobs_total", result=problem or "ok")
+            if problem is None:
+                verified.append(blob.key)
+            else:
+                corrupt.append(blob.key)
+                logger.error("Blob %s failed verification: %s", blob.key, problem)
+
+        now = datetime.now(timezone.utc)
+        with self._session_factory() as session:
+            repository = BlobRepository(session)
+            if verified:
+                repository.mark_verified(verified, now)
+            if corrupt:
+                repository.mark_corrupt(corrupt, now)
+            session.commit()
+        return len(verified) + len(corrupt)
+
+    def _claim_batch(self) -> List[Blob]:
+        with self._session_factory() as session:
+            repository = BlobRepository(session)
+            cursor = repository.scrub_cursor(self._cursor_name)
+            now = datetime.now(timezone.utc)
+            if not self._acquire_lease(repository, now):
+                # another worker is scrubbing with this cursor
+                session.rollback()
+                return []
+            position = cursor.position
+            batch = repository.scrub_batch(position, self._batch_size)
+            if not batch:
+                # wrap around; the next claim starts a new pass
+                if position and repository.advance_scrub_cursor(self._cursor_name, position, ""):
+                    logger.info(
+                        "Scrub pass %r started at %s is complete",
+                        self._cursor_name,
+                        cursor.pass_started_at,
+                    )
+                session.commit()
+                return []
+
+            batch = self._within_budget(batch)
+            claimed = repository.advance_scrub_cursor(
+                self._cursor_name,
+                position,
+                batch[-1].key,
+                pass_started_at=datetime.now(timezone.utc) if not position else None,
+            )
+            session.commit()
+        # another worker moved the cursor first and is scrubbing this range
+        return batch if claimed else []
+
+    def _acquire_lease(self, repository: BlobRepository, now: datetime) -> bool:
+        acquired = repository.acquire_scrub_lease(
+            self._cursor_name, self._owner, now, now + timedelta(seconds=LEASE_SECONDS)
+        )
+        if acquired:
+            self._lease_renewed_at = time.monotonic()
+        return acquired
+
+    def _keep_lease(self) -> None:
+        if time.monotonic() - self._lease_renewed_at < LEASE_SECONDS / 3:
+            return
+        with self._session_factory() as session:
+            if not self._acquire_lease(BlobRepository(session), datetime.now(timezone.utc)):
+                session.rollback()
+                raise ScrubLeaseLostError(self._cursor_name)
+            session.commit()
+
+    def _within_budget(self, batch: List[Blob]) -> List[Blob]:
+        if self._bytes_per_second <= 0:
+            return batch
+        budget = self._bytes_per_second * RUN_SECONDS
+        selected: List[Blob] = []
+        for blob in batch:
+            stored = blob.stored_size_bytes if blob.stored_size_bytes is not None else blob.size_bytes
+            # the first blob is always taken so oversized blobs still get checked
+            if selected and stored > budget:
+                break
+            selected.append(blob)
+            budget -= stored
+        return selected
+
+    def _verify(self, blob: Blob, throttle: Throttle) -> Optional[str]:
+        digest = ContentDigest(blob.encoding)
+        try:
+            for chunk in self._blobs.iter_chunks(blob.key, self._chunk_size):
+                digest.update(chunk)
+                self._registry.inc("blob_scrub_bytes_total", len(chunk))
+                throttle.consume(len(chunk))
+                self._keep_lease()
+            actual = digest.hexdigest()
+        except ScrubLeaseLostError:
+            raise
+        except BlobNotFoundError:
+            return "missing"
+        except Exception as exc:  # noqa: BLE001 undecodable content is corruption too
+            logger.warning("Blob %s could not be decoded: %s", blob.key, exc)
+            return "unreadable"
+        if actual != blob.key or digest.size != blob.size_bytes:
+            return "mismatch"
+        return None
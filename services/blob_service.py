@@ -0,0 +1,65 @@
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy.orm import Session
+
+from repositories.blob_repository import BlobRepository
+from storage.blob_store import BlobStore
+
+logger = logging.getLogger(__name__)
+
+
+class BlobService:
+    def __init__(
+        self,
+        session: Session,
+        blob_repository: BlobRepository,
+        blob_store: BlobStore,
+    ) -> None:
+        self._session = session
+        self._blobs = blob_repository
+        self._store = blob_store
+
+    def collect_garbage(self, *, grace_seconds: int, batch_size: int) -> int:
+        released_before = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+        collected = 0
+        while True:
+            # rows stay locked until commit, so a concurrent upload re-acquiring
+            # the same key waits and then recreates both the row and the file
+            keys = self._blobs.lock_collectable(released_before, batch_size)
+            if not keys:
+                self._session.commit()
+                break
+            for key in keys:
+                self._store.delete(key)
+                self._blobs.delete(key)
+            self._session.commit()
+            collected += len(keys)
+            logger.info("Collected %s unreferenced blobs", collected)
+        return collected
+
+    def sweep_orphans(self, *, grace_seconds: int, batch_size: int) -> int:
+        cutoff = time.time() - grace_seconds
+        swept = self._store.purge_staging(cutoff)
+        batch: List[str] = []
+        for key, modified_at in self._store.iter_keys():
+            if modified_at >= cutoff:
+                continue
+            batch.append(key)
+            if len(batch) >= batch_size:
+                swept += self._delete_unknown(batch)
+                batch = []
+        if batch:
+            swept += self._delete_unknown(batch)
+        return swept
+
+    def _delete_unknown(self, keys: List[str]) -> int:
+        known = set(self._blobs.existing_keys(keys))
+        self._session.rollback()
+        deleted = 0
+        for key in keys:
+            if key not in known and self._store.delete(key):
+                deleted += 1
+        return deleted
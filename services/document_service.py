@@ -1,38 +1,544 @@
 import base64
-from typing import Optional
+import binascii
+import logging
+import posixpath
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
 
 from fastapi import UploadFile
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from models import Document
+from core.config import get_settings
+from core.document_cache import CachedDocument, DocumentCache
+from core.instrumentation import get_metrics_registry
+from core.replicas import read_from_replica
+from core.zip_stream import ZipEntry, iter_zip
+from core.uploads import (
+    UploadTooLargeError,
+    ensure_within_limit,
+    iter_upload,
+    stream_chunks,
+)
+from database import run_db
+from models import Blob, Document, UserUsage
+from repositories.blob_repository import BlobRepository
 from repositories.document_repository import DocumentRepository
+from repositories.usage_repository import UsageRepository
+from storage.blob_store import BlobNotFoundError, BlobStore, StagedBlob
+from storage.compression import (
+    CompressingWriter,
+    iter_decompressed,
+    resolve_encoding,
+    should_compress,
+)
+from storage.integrity import ChecksumMismatchError, ContentDigest, iter_verified
+
+logger = logging.getLogger(__name__)
 
 
 class DocumentNotFoundError(Exception):
     pass
 
 
+class DocumentTooLargeError(Exception):
+    pass
+
+
+class InvalidCursorError(Exception):
+    pass
+
+
+class InvalidBatchError(Exception):
+    pass
+
+
+class QuotaExceededError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class IngestedBlob:
+    staged: StagedBlob
+    key: str
+    size: int
+    encoding: Optional[str]
+    stored_size: int
+
+
+@dataclass(frozen=True)
+class DocumentPage:
+    items: List[Document]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(created_at: datetime, document_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{document_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, document_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(document_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursorError("Invalid pagination cursor") from exc
+
+
 class DocumentService:
-    def __init__(self, session: Session, document_repository: DocumentRepository) -> None:
+    def __init__(
+        self,
+        session: Session,
+        document_repository: DocumentRepository,
+        blob_repository: BlobRepository,
+        usage_repository: UsageRepository,
+        blob_store: BlobStore,
+        document_cache: Optional[DocumentCache] = None,
+    ) -> None:
         self._session = session
         self._documents = document_repository
+        self._blob_refs = blob_repository
+        self._usage = usage_repository
+        self._blobs = blob_store
+        self._cache = document_cache
+        self._settings = get_settings()
 
-    async def save_upload(self, file: UploadFile, uri: str) -> Document:
-        file_bytes = await file.read()
-        document = Document(
+    async def save_upload(self, file: UploadFile, uri: str, owner_id: int) -> Document:
+        return await self.save_stream(
+            iter_upload(file, self._settings.upload_chunk_size),
             filename=file.filename,
             mime_type=file.content_type or "application/octet-stream",
             uri=uri,
-            base64_content=base64.b64encode(file_bytes).decode("utf-8"),
-            file_bytes=file_bytes,
+            owner_id=owner_id,
+            declared_size=file.size,
+        )
+
+    async def save_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        *,
+        filename: str,
+        mime_type: str,
+        uri: str,
+        owner_id: int,
+        declared_size: Optional[int] = None,
+    ) -> Document:
+        await run_db(self._check_quota, owner_id, 1, declared_size or 0)
+        blob = await self._ingest(chunks, mime_type, declared_size)
+        try:
+            await run_db(self._acquire_upload, blob, owner_id)
+            # the transaction stays open while the file is published: the blob row
+            # lock keeps garbage collection from reclaiming the key in between
+            try:
+                await run_in_threadpool(self._blobs.commit, blob.staged, blob.key)
+                return await run_db(
+                    self._register_upload,
+                    blob,
+                    filename=filename,
+                    mime_type=mime_type,
+                    uri=uri,
+                    owner_id=owner_id,
+                )
+            except BaseException:
+                await run_db(self._session.rollback)
+                raise
+        except BaseException:
+            self._blobs.discard(blob.staged)
+            raise
+
+    async def save_batch(
+        self, files: List[UploadFile], uris: List[str], owner_id: int
+    ) -> List[Document]:
+        if not files:
+            raise InvalidBatchError("No files were uploaded")
+        if len(files) > self._settings.batch_upload_max_files:
+            raise InvalidBatchError(
+                f"A batch may contain at most {self._settings.batch_upload_max_files} files"
+            )
+        if len(uris) == 1:
+            uris = uris * len(files)
+        if len(uris) != len(files):
+            raise InvalidBatchError("Provide one uri for the whole batch or one per file")
+
+        await run_db(
+            self._check_quota, owner_id, len(files), sum(file.size or 0 for file in files)
+        )
+        blobs: List[IngestedBlob] = []
+        try:
+            for file in files:
+                blobs.append(
+                    await self._ingest(
+                        iter_upload(file, self._settings.upload_chunk_size),
+                        file.content_type or "application/octet-stream",
+                        file.size,
+                    )
+                )
+            await run_db(self._acquire_batch, blobs, owner_id)
+            try:
+                await run_in_threadpool(self._publish, blobs)
+                return await run_db(self._register_batch, blobs, files, uris, owner_id)
+            except BaseException:
+                await run_db(self._session.rollback)
+                raise
+        except BaseException:
+            for blob in blobs:
+                self._blobs.discard(blob.staged)
+            raise
+
+    def _acquire_batch(self, blobs: List[IngestedBlob], owner_id: int) -> None:
+        self._reserve_usage(owner_id, len(blobs), sum(blob.size for blob in blobs))
+        references: Dict[str, Blob] = {}
+        for blob in blobs:
+            if blob.key in references:
+                references[blob.key].ref_count += 1
+            else:
+                references[blob.key] = Blob(
+                    key=blob.key,
+                    size_bytes=blob.size,
+                    ref_count=1,
+                    encoding=blob.encoding,
+                    stored_size_bytes=blob.stored_size,
+                )
+        self._blob_refs.acquire_many(list(references.values()))
+
+    def _publish(self, blobs: List[IngestedBlob]) -> None:
+        for blob in blobs:
+            self._blobs.commit(blob.staged, blob.key)
+
+    def _register_batch(
+        self,
+        blobs: List[IngestedBlob],
+        files: List[UploadFile],
+        uris: List[str],
+        owner_id: int,
+    ) -> List[Document]:
+        documents = self._documents.add_many(
+            [
+                {
+                    "filename": file.filename,
+                    "mime_type": file.content_type or "application/octet-stream",
+                    "uri": uri,
+                    "blob_key": blob.key,
+                    "size_bytes": blob.size,
+                    "owner_id": owner_id,
+                }
+                for blob, file, uri in zip(blobs, files, uris)
+            ]
+        )
+        self._session.commit()
+        return documents
+
+    async def _ingest(
+        self,
+        chunks: AsyncIterator[bytes],
+        mime_type: str,
+        declared_size: Optional[int],
+    ) -> IngestedBlob:
+        try:
+            ensure_within_limit(declared_size, self._settings.max_upload_size_bytes)
+        except UploadTooLargeError as exc:
+            raise DocumentTooLargeError(str(exc)) from exc
+
+        encoding = self._storage_encoding(mime_type, declared_size)
+        staged = self._blobs.stage()
+        writer = (
+            CompressingWriter(staged.file, encoding, self._settings.compression_level)
+            if encoding
+            else None
+        )
+        try:
+            result = await stream_chunks(
+                chunks,
+                writer or staged.file,
+                max_bytes=self._settings.max_upload_size_bytes,
+            )
+            if writer is not None:
+                await run_in_threadpool(writer.finish)
+            stored_size = staged.file.tell()
+            await run_in_threadpool(staged.close)
+        except UploadTooLargeError as exc:
+            self._blobs.discard(staged)
+            raise DocumentTooLargeError(str(exc)) from exc
+        except BaseException:
+            self._blobs.discard(staged)
+            raise
+
+        return IngestedBlob(
+            staged=staged,
+            key=result.sha256,
+            size=result.size,
+            encoding=encoding,
+            stored_size=stored_size,
+        )
+
+    def _storage_encoding(self, mime_type: str, declared_size: Optional[int]) -> Optional[str]:
+        if not self._settings.compression_enabled:
+            return None
+        if not should_compress(
+            mime_type,
+            declared_size,
+            mime_patterns=self._settings.compression_mime_types,
+            min_size_bytes=self._settings.compression_min_size_bytes,
+        ):
+            return None
+        return resolve_encoding(self._settings.compression_algorithm)
+
+    def _acquire_upload(self, blob: IngestedBlob, owner_id: int) -> None:
+        self._reserve_usage(owner_id, 1, blob.size)
+        # take the reference before publishing the file so garbage collection
+        # cannot reclaim a blob that this upload is about to point at
+        self._blob_refs.acquire(
+            blob.key,
+            blob.size,
+            encoding=blob.encoding,
+            stored_size_bytes=blob.stored_size,
+        )
+
+    def _register_upload(
+        self,
+        blob: IngestedBlob,
+        *,
+        filename: str,
+        mime_type: str,
+        uri: str,
+        owner_id: int,
+    ) -> Document:
+        document = Document(
+            filename=filename,
+            mime_type=mime_type,
+            uri=uri,
+            blob_key=blob.key,
+            size_bytes=blob.size,
+            owner_id=owner_id,
         )
         self._documents.add(document)
         self._session.commit()
-        self._session.refresh(document)
         return document
 
-    def get_document(self, document_id: int) -> Document:
-        document: Optional[Document] = self._documents.get_by_id(document_id)
+    def get_usage(self, user_id: int) -> Optional[UserUsage]:
+        return self._usage.get(user_id)
+
+    def remaining_quota_bytes(self, owner_id: int) -> Optional[int]:
+        max_bytes = self._settings.user_quota_max_bytes
+        if not max_bytes:
+            return None
+        usage = self._usage.get(owner_id)
+        return max_bytes - (usage.total_bytes if usage is not None else 0)
+
+    def _check_quota(self, owner_id: int, documents: int, size_bytes: int) -> None:
+        # early rejection from the usage row alone, before any bytes are stored;
+        # _reserve_usage makes the binding decision once the real size is known
+        max_documents = self._settings.user_quota_max_documents
+        max_bytes = self._settings.user_quota_max_bytes
+        if not max_documents and not max_bytes:
+            return
+        usage = self._usage.get(owner_id)
+        if usage is None:
+            usage = UserUsage(user_id=owner_id, document_count=0, total_bytes=0)
+        self._raise_if_over_quota(
+            usage.document_count + documents, usage.total_bytes + size_bytes
+        )
+
+    def _reserve_usage(self, owner_id: int, documents: int, size_bytes: int) -> None:
+        if self._usage.reserve(
+            owner_id,
+            documents,
+            size_bytes,
+            max_documents=self._settings.user_quota_max_documents,
+            max_bytes=self._settings.user_quota_max_bytes,
+        ):
+            return
+        usage = self._usage.get(owner_id)
+        self._raise_if_over_quota(
+            usage.document_count + documents, usage.total_bytes + size_bytes
+        )
+        raise QuotaExceededError("Storage quota exceeded")
+
+    def _raise_if_over_quota(self, document_count: int, total_bytes: int) -> None:
+        max_documents = self._settings.user_quota_max_documents
+        max_bytes = self._settings.user_quota_max_bytes
+        if max_documents and document_count > max_documents:
+            raise QuotaExceededError(f"Document quota of {max_documents} documents exceeded")
+        if max_bytes and total_bytes > max_bytes:
+            raise QuotaExceededError(f"Storage quota of {max_bytes} bytes exceeded")
+
+    async def fetch_document(
+        self, document_id: int, owner_id: int
+    ) -> Union[Document, CachedDocument]:
+        if self._cache is not None:
+            cached = self._cache.get_document(document_id)
+            # other users' documents are reported exactly like missing ones
+            if cached is not None and cached.owner_id == owner_id:
+                return cached
+        return await run_db(self.get_document, document_id, owner_id)
+
+    def get_document(self, document_id: int, owner_id: int) -> Document:
+        document: Optional[Document] = read_from_replica(
+            self._session, self._documents.get_by_id, document_id, owner_id
+        )
         if not document:
             raise DocumentNotFoundError(f"Document id={document_id} not found")
+        if self._cache is not None:
+            self._cache.put_document(document)
         return document
+
+    def delete_document(self, document_id: int, owner_id: int) -> None:
+        document = self._documents.get_by_id(document_id, owner_id)
+        if not document:
+            raise DocumentNotFoundError(f"Document id={document_id} not found")
+        self._blob_refs.release(document.blob_key)
+        self._usage.release(owner_id, 1, document.size_bytes)
+        self._documents.delete(document)
+        self._session.commit()
+        if self._cache is not None:
+            self._cache.invalidate_document(document_id)
+
+    def list_documents(
+        self,
+        *,
+        owner_id: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        uri_prefix: Optional[str] = None,
+        mime_type: Optional[str] = None,
+    ) -> DocumentPage:
+        after = decode_cursor(cursor) if cursor else None
+        # one extra row tells us whether another page exists
+        # listings tolerate replication lag, so an empty page is not retried
+        rows = read_from_replica(
+            self._session,
+            self._documents.list_page,
+            limit=limit + 1,
+            after=after,
+            uri_prefix=uri_prefix,
+            mime_type=mime_type,
+            owner_id=owner_id,
+            fallback_if=lambda rows: False,
+        )
+        items = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+        return DocumentPage(items=items, next_cursor=next_cursor)
+
+    async def get_documents(self, document_ids: List[int], owner_id: int) -> List[Document]:
+        documents = await run_db(self._load_documents, document_ids, owner_id)
+        await run_in_threadpool(self._ensure_content, documents)
+        return documents
+
+    def _load_documents(self, document_ids: List[int], owner_id: int) -> List[Document]:
+        unique_ids = list(dict.fromkeys(document_ids))
+        if len(unique_ids) > self._settings.export_max_documents:
+            raise InvalidBatchError(
+                f"An export may contain at most {self._settings.export_max_documents} documents"
+            )
+        rows = read_from_replica(
+            self._session,
+            self._documents.get_many,
+            unique_ids,
+            owner_id,
+            fallback_if=lambda rows: len(rows) < len(unique_ids),
+        )
+        documents = {document.id: document for document in rows}
+        missing = [document_id for document_id in unique_ids if document_id not in documents]
+        if missing:
+            raise DocumentNotFoundError(f"Documents {missing[:20]} not found")
+        return [documents[document_id] for document_id in unique_ids]
+
+    def _ensure_content(self, documents: List[Document]) -> None:
+        for document in documents:
+            if not self._blobs.exists(document.blob_key):
+                raise DocumentNotFoundError(f"Content for document id={document.id} is missing")
+
+    def export_archive(self, documents: List[Document]) -> Iterator[bytes]:
+        entries = [
+            ZipEntry(
+                name=self._archive_name(document),
+                modified=document.created_at,
+                open_chunks=lambda document=document: self.open_content(document),
+                compress=should_compress(
+                    document.mime_type,
+                    document.size_bytes,
+                    mime_patterns=self._settings.compression_mime_types,
+                    min_size_bytes=self._settings.compression_min_size_bytes,
+                ),
+            )
+            for document in documents
+        ]
+        return iter_zip(entries)
+
+    def _archive_name(self, document: Document) -> str:
+        # ids keep names unique and basename keeps entries inside the archive root
+        filename = posixpath.basename(document.filename.replace("\\", "/")) or "document"
+        return f"{document.id}-{filename}"
+
+    def content_path(self, document: Document) -> Optional[Path]:
+        path = self._blobs.local_path(document.blob_key)
+        if path is None and not self._blobs.exists(document.blob_key):
+            raise DocumentNotFoundError(f"Content for document id={document.id} is missing")
+        return path
+
+    async def small_content(self, document: Union[Document, CachedDocument]) -> Optional[bytes]:
+        # stored (possibly compressed) bytes of documents small enough to keep in memory
+        if self._cache is None:
+            return None
+        stored_size = document.size_bytes
+        if document.blob is not None and document.blob.stored_size_bytes is not None:
+            stored_size = document.blob.stored_size_bytes
+        if not self._cache.accepts_content(stored_size):
+            return None
+        content = self._cache.get_content(document.blob_key)
+        if content is None:
+            content = await run_in_threadpool(
+                self._read_stored, document.blob_key, self.content_encoding(document)
+            )
+            if content is None:
+                return None
+            self._cache.put_content(document.blob_key, content)
+        return content
+
+    def _read_stored(self, blob_key: str, encoding: Optional[str] = None) -> Optional[bytes]:
+        try:
+            with self._blobs.open(blob_key) as handle:
+                content = handle.read()
+        except BlobNotFoundError:
+            return None
+        if self._settings.download_verify_checksum:
+            digest = ContentDigest(encoding)
+            digest.update(content)
+            if digest.hexdigest() != blob_key:
+                # left uncached; the streamed fallback reports the failure
+                return None
+        return content
+
+    def content_encoding(self, document: Document) -> Optional[str]:
+        return document.blob.encoding if document.blob is not None else None
+
+    def open_content(self, document: Document, *, decode: bool = True) -> Iterator[bytes]:
+        if not self._blobs.exists(document.blob_key):
+            raise DocumentNotFoundError(f"Content for document id={document.id} is missing")
+        chunks = self._blobs.iter_chunks(document.blob_key, self._settings.upload_chunk_size)
+        encoding = self.content_encoding(document)
+        if decode and encoding:
+            chunks = iter_decompressed(chunks, encoding)
+            encoding = None
+        if self._settings.download_verify_checksum:
+            return self._verified(chunks, document, encoding)
+        return chunks
+
+    def _verified(
+        self,
+        chunks: Iterator[bytes],
+        document: Union[Document, CachedDocument],
+        encoding: Optional[str],
+    ) -> Iterator[bytes]:
+        try:
+            yield from iter_verified(chunks, document.blob_key, encoding=encoding)
+        except ChecksumMismatchError as exc:
+            get_metrics_registry().inc("blob_download_checksum_failures_total")
+            logger.error("Aborted download of document id=%s: %s", document.id, exc)
+            raise
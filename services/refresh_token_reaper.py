@@ -0,0 +1,29 @@
+import logging
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+from repositories.refresh_token_repository import RefreshTokenRepository
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshTokenReaper:
+    def __init__(self, session_factory: Callable[[], Session], *, batch_size: int) -> None:
+        self._session_factory = session_factory
+        self._batch_size = batch_size
+
+    def run_once(self) -> int:
+        deleted = 0
+        with self._session_factory() as session:
+            repository = RefreshTokenRepository(session)
+            while True:
+                # short transactions keep row locks away from login/refresh traffic
+                batch = repository.delete_expired(limit=self._batch_size)
+                session.commit()
+                deleted += batch
+                if batch < self._batch_size:
+                    break
+        if deleted:
+            logger.info("Deleted %s expired refresh tokens", deleted)
+        return deleted
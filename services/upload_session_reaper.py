@@ -0,0 +1,44 @@
+import logging
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+from repositories.upload_session_repository import UploadSessionRepository
+from storage.part_store import LocalPartStore
+
+logger = logging.getLogger(__name__)
+
+
+class UploadSessionReaper:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        part_store: LocalPartStore,
+        *,
+        batch_size: int,
+    ) -> None:
+        self._session_factory = session_factory
+        self._part_store = part_store
+        self._batch_size = batch_size
+
+    def run_once(self) -> int:
+        now = datetime.now(timezone.utc)
+        removed = 0
+        with self._session_factory() as session:
+            repository = UploadSessionRepository(session)
+            while True:
+                expired = repository.list_expired_ids(now, limit=self._batch_size)
+                if not expired:
+                    break
+                repository.delete_by_ids(expired)
+                session.commit()
+                # rows go first so a concurrent part upload cannot resurrect the session
+                for upload_id in expired:
+                    self._part_store.delete_upload(upload_id)
+                removed += len(expired)
+                if len(expired) < self._batch_size:
+                    break
+        if removed:
+            logger.info("Removed %s expired upload sessions", removed)
+        return removed
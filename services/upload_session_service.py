@@ -0,0 +1,263 @@
+import uuid
+from contextlib import aclosing
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, List
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from core.config import get_settings
+from core.uploads import UploadTooLargeError, stream_chunks
+from database import run_db
+from models import Document, UploadPart, UploadSession
+from repositories.upload_session_repository import UploadSessionRepository
+from services.document_service import (
+    DocumentService,
+    DocumentTooLargeError,
+    QuotaExceededError,
+)
+from storage.part_store import LocalPartStore
+
+STATUS_OPEN = "open"
+STATUS_COMPLETING = "completing"
+
+
+class UploadSessionNotFoundError(Exception):
+    pass
+
+
+class UploadSessionStateError(Exception):
+    pass
+
+
+class InvalidUploadPartError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class CompletionPlan:
+    filename: str
+    mime_type: str
+    uri: str
+    part_numbers: List[int]
+    total_size: int
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+class UploadSessionService:
+    def __init__(
+        self,
+        session: Session,
+        upload_repository: UploadSessionRepository,
+        part_store: LocalPartStore,
+        document_service: DocumentService,
+    ) -> None:
+        self._session = session
+        self._uploads = upload_repository
+        self._parts = part_store
+        self._documents = document_service
+        self._settings = get_settings()
+
+    def create_upload(self, *, user_id: int, filename: str, mime_type: str, uri: str) -> UploadSession:
+        now = datetime.now(timezone.utc)
+        upload = UploadSession(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            filename=filename,
+            mime_type=mime_type,
+            uri=uri,
+            status=STATUS_OPEN,
+            received_bytes=0,
+            created_at=now,
+            expires_at=now + timedelta(seconds=self._settings.upload_session_ttl_seconds),
+        )
+        self._uploads.add(upload)
+        self._session.commit()
+        return upload
+
+    def get_upload(self, upload_id: str, user_id: int) -> UploadSession:
+        upload = self._uploads.get_by_id(upload_id)
+        if (
+            upload is None
+            or upload.user_id != user_id
+            or _as_utc(upload.expires_at) <= datetime.now(timezone.utc)
+        ):
+            raise UploadSessionNotFoundError(f"Upload {upload_id} not found")
+        return upload
+
+    async def upload_part(
+        self,
+        upload_id: str,
+        user_id: int,
+        part_number: int,
+        chunks: AsyncIterator[bytes],
+    ) -> UploadPart:
+        if not 1 <= part_number <= self._settings.upload_max_parts:
+            raise InvalidUploadPartError(
+                f"Part number must be between 1 and {self._settings.upload_max_parts}"
+            )
+        upload = await run_db(self.get_upload, upload_id, user_id)
+        if upload.status != STATUS_OPEN:
+            raise UploadSessionStateError(f"Upload {upload_id} is no longer accepting parts")
+
+        # early cut-off only; _reserve_part makes the binding check under the row lock
+        replaced = sum(part.size_bytes for part in upload.parts if part.part_number == part_number)
+        max_bytes = self._settings.max_upload_size_bytes - (upload.received_bytes or 0) + replaced
+        staged = self._parts.stage(upload_id)
+        try:
+            try:
+                result = await stream_chunks(chunks, staged.file, max_bytes=max(max_bytes, 0))
+            except UploadTooLargeError as exc:
+                raise DocumentTooLargeError(
+                    f"Upload exceeds the maximum size of "
+                    f"{self._settings.max_upload_size_bytes} bytes"
+                ) from exc
+
+            part = UploadPart(
+                upload_id=upload_id,
+                part_number=part_number,
+                size_bytes=result.size,
+                sha256=result.sha256,
+                created_at=datetime.now(timezone.utc),
+            )
+            await run_db(self._reserve_part, part, user_id)
+            # the session row stays locked until the part is recorded, so the
+            # upload cannot be completed or reaped while the file is replaced
+            try:
+                await run_in_threadpool(self._parts.commit, staged, upload_id, part_number)
+                return await run_db(self._record_part, part)
+            except BaseException:
+                await run_db(self._session.rollback)
+                raise
+        except UploadSessionNotFoundError:
+            self._parts.discard(staged)
+            await run_in_threadpool(self._parts.delete_upload, upload_id)
+            raise
+        except BaseException:
+            self._parts.discard(staged)
+            raise
+
+    def _reserve_part(self, part: UploadPart, user_id: int) -> None:
+        try:
+            upload = self._uploads.lock(part.upload_id)
+            if upload is None:
+                raise UploadSessionNotFoundError(f"Upload {part.upload_id} not found")
+            if upload.status != STATUS_OPEN:
+                raise UploadSessionStateError(
+                    f"Upload {part.upload_id} is no longer accepting parts"
+                )
+
+            replaced = self._uploads.part_size(part.upload_id, part.part_number) or 0
+            total = (upload.received_bytes or 0) - replaced + part.size_bytes
+            max_bytes = self._settings.max_upload_size_bytes
+            if total > max_bytes:
+                raise DocumentTooLargeError(f"Upload exceeds the maximum size of {max_bytes} bytes")
+            remaining = self._documents.remaining_quota_bytes(user_id)
+            if remaining is not None and total > remaining:
+                raise QuotaExceededError(
+                    f"Storage quota of {self._settings.user_quota_max_bytes} bytes exceeded"
+                )
+            upload.received_bytes = total
+        except BaseException:
+            self._session.rollback()
+            raise
+
+    def _record_part(self, part: UploadPart) -> UploadPart:
+        try:
+            part = self._uploads.save_part(part)
+            self._session.commit()
+        except IntegrityError as exc:
+            # the session was aborted or reaped while the part was streaming in
+            self._session.rollback()
+            raise UploadSessionNotFoundError(f"Upload {part.upload_id} not found") from exc
+        return part
+
+    async def complete(self, upload_id: str, user_id: int) -> Document:
+        plan = await run_db(self._claim_for_completion, upload_id, user_id)
+        try:
+            # closed on failure too, so the part file being read is not left open
+            async with aclosing(self._iter_parts(upload_id, plan.part_numbers)) as parts:
+                document = await self._documents.save_stream(
+                    parts,
+                    filename=plan.filename,
+                    mime_type=plan.mime_type,
+                    uri=plan.uri,
+                    owner_id=user_id,
+                    declared_size=plan.total_size,
+                )
+        except BaseException:
+            await run_db(self._release_claim, upload_id)
+            raise
+
+        await self._delete_uploads([upload_id])
+        return document
+
+    def _claim_for_completion(self, upload_id: str, user_id: int) -> CompletionPlan:
+        upload = self.get_upload(upload_id, user_id)
+        part_numbers = [part.part_number for part in upload.parts]
+        if not part_numbers:
+            raise InvalidUploadPartError("Upload has no parts")
+        if part_numbers != list(range(1, len(part_numbers) + 1)):
+            missing = sorted(set(range(1, part_numbers[-1] + 1)) - set(part_numbers))
+            raise InvalidUploadPartError(f"Upload is missing parts {missing[:20]}")
+
+        total_size = sum(part.size_bytes for part in upload.parts)
+        # keep the reaper away while the parts are being assembled
+        extended = datetime.now(timezone.utc) + timedelta(
+            seconds=self._settings.upload_session_ttl_seconds
+        )
+        if not self._uploads.transition(
+            upload_id, STATUS_OPEN, STATUS_COMPLETING, expires_at=extended
+        ):
+            self._session.rollback()
+            raise UploadSessionStateError(f"Upload {upload_id} is already being completed")
+        self._session.commit()
+
+        return CompletionPlan(
+            filename=upload.filename,
+            mime_type=upload.mime_type,
+            uri=upload.uri,
+            part_numbers=part_numbers,
+            total_size=total_size,
+        )
+
+    def _release_claim(self, upload_id: str) -> None:
+        self._session.rollback()
+        self._uploads.transition(upload_id, STATUS_COMPLETING, STATUS_OPEN)
+        self._session.commit()
+
+    async def _iter_parts(self, upload_id: str, part_numbers: List[int]) -> AsyncIterator[bytes]:
+        for part_number in part_numbers:
+            chunks = self._parts.iter_chunks(
+                upload_id, part_number, self._settings.upload_chunk_size
+            )
+            try:
+                while True:
+                    chunk = await run_in_threadpool(next, chunks, None)
+                    if chunk is None:
+                        break
+                    yield chunk
+            finally:
+                chunks.close()
+
+    async def abort(self, upload_id: str, user_id: int) -> None:
+        upload = await run_db(self.get_upload, upload_id, user_id)
+        if upload.status != STATUS_OPEN:
+            raise UploadSessionStateError(f"Upload {upload_id} is being completed")
+        await self._delete_uploads([upload_id])
+
+    async def _delete_uploads(self, upload_ids: List[str]) -> None:
+        # rows go first so a concurrent part upload cannot resurrect the session
+        await run_db(self._delete_rows, upload_ids)
+        for upload_id in upload_ids:
+            await run_in_threadpool(self._parts.delete_upload, upload_id)
+
+    def _delete_rows(self, upload_ids: List[str]) -> None:
+        self._uploads.delete_by_ids(upload_ids)
+        self._session.commit()
+
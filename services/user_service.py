@@ -1,6 +1,10 @@
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from core.security import hash_password
+from core.password_hasher import PasswordHasher, get_password_hasher
+from database import run_db
 from models import User
 from repositories.user_repository import UserRepository
 
@@ -10,17 +14,30 @@ class UserAlreadyExistsError(Exception):
 
 
 class UserService:
-    def __init__(self, session: Session, user_repository: UserRepository) -> None:
+    def __init__(
+        self,
+        session: Session,
+        user_repository: UserRepository,
+        password_hasher: Optional[PasswordHasher] = None,
+    ) -> None:
         self._session = session
         self._users = user_repository
+        self._password_hasher = password_hasher or get_password_hasher()
 
-    def create_user(self, username: str, password: str) -> User:
-        existing = self._users.get_by_username(username)
+    async def create_user(self, username: str, password: str) -> User:
+        existing = await run_db(self._users.get_by_username, username)
         if existing:
             raise UserAlreadyExistsError("Username is already in use")
 
-        user = User(username=username, password_hash=hash_password(password))
+        password_hash = await self._password_hasher.hash_async(password)
+        return await run_db(self._insert_user, username, password_hash)
+
+    def _insert_user(self, username: str, password_hash: str) -> User:
+        user = User(username=username, password_hash=password_hash)
         self._users.add(user)
-        self._session.commit()
-        self._session.refresh(user)
+        try:
+            self._session.commit()
+        except IntegrityError as exc:
+            self._session.rollback()
+            raise UserAlreadyExistsError("Username is already in use") from exc
         return user
@@ -0,0 +1,149 @@
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from core.config import get_settings
+
+
+class BlobNotFoundError(Exception):
+    pass
+
+
+class StagedBlob:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.file: BinaryIO = open(path, "wb")
+
+    def close(self) -> None:
+        if not self.file.closed:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+
+
+class BlobStore(ABC):
+    @abstractmethod
+    def stage(self) -> StagedBlob:
+        ...
+
+    @abstractmethod
+    def commit(self, staged: StagedBlob, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def discard(self, staged: StagedBlob) -> None:
+        ...
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def iter_keys(self) -> Iterator[Tuple[str, float]]:
+        ...
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return None
+
+    def purge_staging(self, older_than: float) -> int:
+        return 0
+
+    def iter_chunks(self, key: str, chunk_size: int) -> Iterator[bytes]:
+        with self.open(key) as handle:
+            while True:
+                chunk = handle.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+
+# content-addressed: blobs live at <root>/<key[0:2]>/<key[2:4]>/<key>
+class LocalBlobStore(BlobStore):
+    def __init__(self, root: Path) -> None:
+        self._root = root
+        self._staging = root / "tmp"
+        self._staging.mkdir(parents=True, exist_ok=True)
+
+    def _path_for(self, key: str) -> Path:
+        if len(key) < 4 or not key.isalnum():
+            raise ValueError(f"Invalid blob key {key!r}")
+        return self._root / key[0:2] / key[2:4] / key
+
+    def stage(self) -> StagedBlob:
+        fd, name = tempfile.mkstemp(dir=self._staging, suffix=".partial")
+        os.close(fd)
+        return StagedBlob(Path(name))
+
+    def commit(self, staged: StagedBlob, key: str) -> bool:
+        staged.close()
+        target = self._path_for(key)
+        if target.exists():
+            # identical content is already stored under this key; touching it keeps
+            # the orphan sweep from reclaiming it before the new reference commits
+            staged.path.unlink(missing_ok=True)
+            os.utime(target)
+            return False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(staged.path, target)
+        return True
+
+    def discard(self, staged: StagedBlob) -> None:
+        if not staged.file.closed:
+            staged.file.close()
+        staged.path.unlink(missing_ok=True)
+
+    def open(self, key: str) -> BinaryIO:
+        try:
+            return open(self._path_for(key), "rb")
+        except FileNotFoundError as exc:
+            raise BlobNotFoundError(f"Blob {key} not found") from exc
+
+    def exists(self, key: str) -> bool:
+        return self._path_for(key).is_file()
+
+    def delete(self, key: str) -> bool:
+        try:
+            self._path_for(key).unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+    def iter_keys(self) -> Iterator[Tuple[str, float]]:
+        for first in sorted(self._root.iterdir()):
+            if first == self._staging or not first.is_dir():
+                continue
+            for second in sorted(first.iterdir()):
+                for entry in os.scandir(second):
+                    if entry.is_file():
+                        yield entry.name, entry.stat().st_mtime
+
+    def local_path(self, key: str) -> Optional[Path]:
+        path = self._path_for(key)
+        return path if path.is_file() else None
+
+    def purge_staging(self, older_than: float) -> int:
+        purged = 0
+        for entry in os.scandir(self._staging):
+            if entry.is_file() and entry.stat().st_mtime < older_than:
+                Path(entry.path).unlink(missing_ok=True)
+                purged += 1
+        return purged
+
+
+@lru_cache
+def get_blob_store() -> BlobStore:
+    settings = get_settings()
+    if settings.blob_store_backend == "local":
+        return LocalBlobStore(Path(settings.blob_storage_path))
+    raise ValueError(f"Unsupported blob store backend {settings.blob_store_backend!r}")
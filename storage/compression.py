@@ -0,0 +1,111 @@
+import fnmatch
+import logging
+import zlib
+from typing import BinaryIO, Iterable, Iterator, Optional, Sequence
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def available_encodings() -> Sequence[str]:
+    return ("gzip", "zstd") if zstandard is not None else ("gzip",)
+
+
+def resolve_encoding(preferred: str) -> str:
+    if preferred in available_encodings():
+        return preferred
+    logger.warning("Compression %r is unavailable, falling back to gzip", preferred)
+    return "gzip"
+
+
+def should_compress(
+    mime_type: str,
+    declared_size: Optional[int],
+    *,
+    mime_patterns: Sequence[str],
+    min_size_bytes: int,
+) -> bool:
+    if declared_size is not None and declared_size < min_size_bytes:
+        return False
+    base_type = mime_type.split(";", 1)[0].strip().lower()
+    return any(fnmatch.fnmatchcase(base_type, pattern) for pattern in mime_patterns)
+
+
+class CompressingWriter:
+    def __init__(self, sink: BinaryIO, encoding: str, level: int) -> None:
+        self._sink = sink
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+        elif encoding == "zstd" and zstandard is not None:
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            raise ValueError(f"Unsupported content encoding {encoding!r}")
+        self.encoding = encoding
+
+    def write(self, chunk: bytes) -> int:
+        compressed = self._compressor.compress(chunk)
+        if compressed:
+            self._sink.write(compressed)
+        return len(chunk)
+
+    def finish(self) -> None:
+        tail = self._compressor.flush()
+        if tail:
+            self._sink.write(tail)
+
+
+class Decompressor:
+    def __init__(self, encoding: str) -> None:
+        if encoding == "gzip":
+            self._decompressor = zlib.decompressobj(GZIP_WBITS)
+        elif encoding == "zstd" and zstandard is not None:
+            self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+        else:
+            raise ValueError(f"Unsupported content encoding {encoding!r}")
+        self.encoding = encoding
+
+    def decompress(self, chunk: bytes) -> bytes:
+        return self._decompressor.decompress(chunk)
+
+    def finish(self) -> bytes:
+        return self._decompressor.flush() if self.encoding == "gzip" else b""
+
+
+def iter_decompressed(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    decompressor = Decompressor(encoding)
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    tail = decompressor.finish()
+    if tail:
+        yield tail
+
+
+def accepts_encoding(accept_encoding: Optional[str], encoding: str) -> bool:
+    if not accept_encoding:
+        return False
+    names = {encoding, "x-gzip"} if encoding == "gzip" else {encoding}
+    wildcard = False
+    for item in accept_encoding.split(","):
+        token, _, params = item.strip().partition(";")
+        token = token.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if token in names:
+            return quality > 0
+        if token == "*":
+            wildcard = quality > 0
+    return wildcard
@@ -0,0 +1,72 @@
+import hashlib
+import time
+from typing import Iterable, Iterator, Optional
+
+from storage.compression import Decompressor
+
+
+class ChecksumMismatchError(Exception):
+    pass
+
+
+class ContentDigest:
+    # blob keys are the SHA-256 of the uncompressed content, so stored bytes are
+    # decompressed on the side while the stored chunks pass through untouched
+    def __init__(self, encoding: Optional[str] = None) -> None:
+        self._digest = hashlib.sha256()
+        self._decompressor = Decompressor(encoding) if encoding else None
+        self.size = 0
+
+    def update(self, stored_chunk: bytes) -> None:
+        if self._decompressor is not None:
+            stored_chunk = self._decompressor.decompress(stored_chunk)
+        self._hash(stored_chunk)
+
+    def hexdigest(self) -> str:
+        if self._decompressor is not None:
+            self._hash(self._decompressor.finish())
+            self._decompressor = None
+        return self._digest.hexdigest()
+
+    def _hash(self, data: bytes) -> None:
+        self._digest.update(data)
+        self.size += len(data)
+
+
+def iter_verified(
+    chunks: Iterable[bytes],
+    expected_sha256: str,
+    *,
+    encoding: Optional[str] = None,
+) -> Iterator[bytes]:
+    # the last chunk is held back until the digest matches, so a corrupt blob
+    # ends in a truncated response instead of a complete-looking one
+    digest = ContentDigest(encoding)
+    held: Optional[bytes] = None
+    for chunk in chunks:
+        digest.update(chunk)
+        if held is not None:
+            yield held
+        held = chunk
+    actual = digest.hexdigest()
+    if actual != expected_sha256:
+        raise ChecksumMismatchError(
+            f"Blob {expected_sha256} failed verification (content hashes to {actual})"
+        )
+    if held is not None:
+        yield held
+
+
+class Throttle:
+    def __init__(self, bytes_per_second: int) -> None:
+        self._bytes_per_second = bytes_per_second
+        self._started = time.monotonic()
+        self._consumed = 0
+
+    def consume(self, count: int) -> None:
+        if self._bytes_per_second <= 0:
+            return
+        self._consumed += count
+        ahead = self._consumed / self._bytes_per_second - (time.monotonic() - self._started)
+        if ahead > 0:
+            time.sleep(ahead)
@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator
+
+from core.config import get_settings
+from storage.blob_store import StagedBlob
+
+
+# parts of resumable uploads live at <root>/<upload_id>/<part_number>.part
+class LocalPartStore:
+    def __init__(self, root: Path) -> None:
+        self._root = root
+        self._root.mkdir(parents=True, exist_ok=True)
+
+    def _upload_dir(self, upload_id: str) -> Path:
+        if not upload_id.isalnum():
+            raise ValueError(f"Invalid upload id {upload_id!r}")
+        return self._root / upload_id
+
+    def _part_path(self, upload_id: str, part_number: int) -> Path:
+        return self._upload_dir(upload_id) / f"{part_number:05d}.part"
+
+    def stage(self, upload_id: str) -> StagedBlob:
+        directory = self._upload_dir(upload_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(dir=directory, suffix=".partial")
+        os.close(fd)
+        return StagedBlob(Path(name))
+
+    def commit(self, staged: StagedBlob, upload_id: str, part_number: int) -> None:
+        staged.close()
+        # re-sending a part replaces the earlier attempt atomically
+        os.replace(staged.path, self._part_path(upload_id, part_number))
+
+    def discard(self, staged: StagedBlob) -> None:
+        if not staged.file.closed:
+            staged.file.close()
+        staged.path.unlink(missing_ok=True)
+
+    def iter_chunks(self, upload_id: str, part_number: int, chunk_size: int) -> Iterator[bytes]:
+        with open(self._part_path(upload_id, part_number), "rb") as handle:
+            while True:
+                chunk = handle.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def delete_upload(self, upload_id: str) -> None:
+        shutil.rmtree(self._upload_dir(upload_id), ignore_errors=True)
+
+
+@lru_cache
+def get_part_store() -> LocalPartStore:
+    return LocalPartStore(Path(get_settings().upload_parts_path))
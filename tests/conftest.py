@@ -0,0 +1,68 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# must run before anything imports core.config / database; the suite never
+# touches the database configured in the environment
+WORKDIR = tempfile.mkdtemp(prefix="docs-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/app.db"
+os.environ["DATABASE_ASYNC"] = "false"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["APP_SECRET_KEY"] = "test-secret-key-test-secret-key-test-secret"
+os.environ["BLOB_STORAGE_PATH"] = f"{WORKDIR}/blobs"
+os.environ["UPLOAD_PARTS_PATH"] = f"{WORKDIR}/upload-parts"
+os.environ["ADMISSION_CONTROL_ENABLED"] = "false"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema() -> None:
+    from database import engine
+    from migrations import ensure_schema
+
+    ensure_schema(engine)
+
+
+@pytest.fixture
+def session_factory():
+    from database import SessionLocal
+
+    return SessionLocal
+
+
+@pytest.fixture
+def user_id(session_factory) -> int:
+    from models import User
+
+    with session_factory() as session:
+        user = User(username=f"user-{uuid.uuid4().hex[:12]}", password_hash="unused")
+        session.add(user)
+        session.commit()
+        return user.id
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    from main import create_app
+
+    with TestClient(create_app()) as client:
+        yield client
+
+
+@pytest.fixture
+def make_user(session_factory):
+    from core.security import create_access_token
+    from models import User
+
+    def make():
+        with session_factory() as session:
+            user = User(username=f"user-{uuid.uuid4().hex[:12]}", password_hash="unused")
+            session.add(user)
+            session.commit()
+            token = create_access_token(user.username, user_id=user.id)
+            return user, {"Authorization": f"Bearer {token}"}
+
+    return make
@@ -0,0 +1,62 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from core.security import create_access_token
+from core.token_cache import AccessTokenCache
+from models import User
+from repositories.refresh_token_repository import RefreshTokenRepository
+from repositories.user_repository import UserRepository
+from services.auth_service import AuthenticationError, AuthService
+
+
+def _resolve(session_factory, token, cache=None):
+    with session_factory() as session:
+        service = AuthService(
+            session, UserRepository(session), RefreshTokenRepository(session), token_cache=cache
+        )
+        return service.resolve_principal_from_token(token)
+
+
+def _create_user(session_factory):
+    with session_factory() as session:
+        user = User(username=f"user-{uuid.uuid4().hex[:12]}", password_hash="unused")
+        session.add(user)
+        session.commit()
+        return user.id, user.username
+
+
+def test_access_token_resolves_to_its_user(session_factory):
+    user_id, username = _create_user(session_factory)
+    token = create_access_token(username, user_id=user_id)
+
+    principal = _resolve(session_factory, token)
+
+    assert (principal.id, principal.username) == (user_id, username)
+
+
+def test_access_token_of_a_deleted_user_is_rejected(session_factory):
+    user_id, username = _create_user(session_factory)
+    token = create_access_token(username, user_id=user_id)
+    with session_factory() as session:
+        session.delete(session.get(User, user_id))
+        session.commit()
+
+    cache = AccessTokenCache(max_entries=10, ttl_seconds=60)
+    with pytest.raises(AuthenticationError):
+        _resolve(session_factory, token, cache)
+    assert cache.get(token) is None
+
+
+def test_access_token_issued_before_a_revocation_is_rejected(session_factory):
+    user_id, username = _create_user(session_factory)
+    token = create_access_token(username, user_id=user_id)
+    with session_factory() as session:
+        UserRepository(session).revoke_tokens(
+            user_id, datetime.now(timezone.utc) + timedelta(seconds=1)
+        )
+        session.commit()
+
+    with pytest.raises(AuthenticationError):
+        _resolve(session_factory, token)
@@ -0,0 +1,123 @@
+import asyncio
+
+import httpx
+
+from core.admission import (
+    CLASS_AUTH,
+    CLASS_DEFAULT,
+    CLASS_UPLOAD,
+    AdmissionController,
+    AdmissionMiddleware,
+    RateLimiter,
+    UploadGate,
+)
+from core.config import get_settings
+from core.security import create_access_token
+
+
+def _admitted_app(*, limiters, max_concurrent=8, max_inflight_bytes=1 << 20, upload_started=None):
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        while (await receive()).get("more_body"):
+            pass
+        if scope["method"] == "PUT" and upload_started is not None:
+            upload_started.set()
+            await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    settings = get_settings()
+    controller = AdmissionController(
+        limiters=limiters,
+        upload_gate=UploadGate(
+            max_concurrent=max_concurrent, max_inflight_bytes=max_inflight_bytes
+        ),
+        secret_key=settings.secret_key,
+        jwt_algorithm=settings.jwt_algorithm,
+    )
+    middleware = AdmissionMiddleware(app, controller=controller, unknown_length_bytes=1024)
+    return middleware, controller, release
+
+
+def _client(app, address="10.0.0.1"):
+    transport = httpx.ASGITransport(app=app, client=(address, 1234))
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+def _bearer(user_id):
+    return {"Authorization": f"Bearer {create_access_token(f'user-{user_id}', user_id=user_id)}"}
+
+
+def test_requests_over_the_burst_get_429_with_retry_after():
+    limiters = {CLASS_AUTH: RateLimiter(rate=0.5, burst=2, max_keys=100)}
+    app, _, _ = _admitted_app(limiters=limiters)
+
+    async def scenario():
+        async with _client(app) as client:
+            return [await client.post("/auth/login") for _ in range(3)]
+
+    responses = asyncio.run(scenario())
+
+    assert [response.status_code for response in responses] == [200, 200, 429]
+    assert int(responses[2].headers["retry-after"]) >= 1
+    assert responses[2].json() == {"detail": "Rate limit exceeded"}
+
+
+def test_clients_have_separate_budgets():
+    limiters = {CLASS_DEFAULT: RateLimiter(rate=0.1, burst=1, max_keys=100)}
+    app, _, _ = _admitted_app(limiters=limiters)
+
+    async def scenario():
+        async with _client(app) as client, _client(app, "10.0.0.2") as neighbour:
+            return [
+                (await client.get("/documents", headers=_bearer(1))).status_code,
+                (await client.get("/documents", headers=_bearer(1))).status_code,
+                # another user behind the same address
+                (await client.get("/documents", headers=_bearer(2))).status_code,
+                (await client.get("/documents")).status_code,
+                (await neighbour.get("/documents")).status_code,
+                (await client.get("/documents")).status_code,
+            ]
+
+    assert asyncio.run(scenario()) == [200, 429, 200, 200, 200, 429]
+
+
+def test_unlimited_classes_are_not_rate_limited():
+    limiters = {CLASS_AUTH: RateLimiter(rate=0.1, burst=1, max_keys=100)}
+    app, _, _ = _admitted_app(limiters=limiters)
+
+    async def scenario():
+        async with _client(app) as client:
+            return [(await client.get("/health")).status_code for _ in range(5)]
+
+    assert asyncio.run(scenario()) == [200] * 5
+
+
+def test_uploads_beyond_the_concurrency_limit_get_503():
+    async def scenario():
+        upload_started = asyncio.Event()
+        app, controller, release = _admitted_app(
+            limiters={CLASS_UPLOAD: RateLimiter(rate=100, burst=100, max_keys=100)},
+            max_concurrent=1,
+            upload_started=upload_started,
+        )
+        async with _client(app) as client:
+            first = asyncio.create_task(
+                client.put("/uploads/abc/parts/1", content=b"x" * 100, headers=_bearer(1))
+            )
+            await upload_started.wait()
+            assert controller.upload_gate.stats()["active"] == 1
+            rejected = await client.put("/uploads/abc/parts/2", content=b"y", headers=_bearer(1))
+            release.set()
+            admitted = await first
+            after = await client.put("/uploads/abc/parts/2", content=b"y", headers=_bearer(1))
+        return rejected, admitted, after, controller.upload_gate.stats()
+
+    rejected, admitted, after, stats = asyncio.run(scenario())
+
+    assert rejected.status_code == 503
+    assert rejected.headers["retry-after"] == "1"
+    assert admitted.status_code == 200
+    assert after.status_code == 200
+    assert (stats["active"], stats["inflight_bytes"]) == (0, 0)
@@ -0,0 +1,94 @@
+import hashlib
+import io
+import os
+import zipfile
+
+from models import Blob
+
+
+def _ref_count(session_factory, content):
+    with session_factory() as session:
+        return session.get(Blob, hashlib.sha256(content).hexdigest()).ref_count
+
+
+def _upload_batch(client, headers, files, uris):
+    return client.post(
+        "/documents/batch",
+        files=[("files", (name, content, mime_type)) for name, content, mime_type in files],
+        data={"uri": uris},
+        headers=headers,
+    )
+
+
+def test_batch_upload_registers_every_file(client, make_user, session_factory):
+    _, headers = make_user()
+    shared, unique = os.urandom(500), os.urandom(300)
+    files = [
+        ("a.bin", shared, "application/octet-stream"),
+        ("b.bin", unique, "application/octet-stream"),
+        ("copy-of-a.bin", shared, "application/octet-stream"),
+    ]
+
+    response = _upload_batch(client, headers, files, ["s3://a", "s3://b", "s3://c"])
+
+    assert response.status_code == 201, response.text
+    documents = response.json()
+    assert [document["filename"] for document in documents] == ["a.bin", "b.bin", "copy-of-a.bin"]
+    assert [document["uri"] for document in documents] == ["s3://a", "s3://b", "s3://c"]
+    for document, (_, content, _) in zip(documents, files):
+        assert client.get(f"/documents/{document['id']}", headers=headers).content == content
+    # identical files in one batch take one reference each on a single blob
+    assert _ref_count(session_factory, shared) == 2
+    assert _ref_count(session_factory, unique) == 1
+
+
+def test_batch_upload_adds_references_to_existing_blobs(client, make_user, session_factory):
+    _, headers = make_user()
+    content = os.urandom(200)
+    files = [("one.bin", content, "application/octet-stream")]
+    assert _upload_batch(client, headers, files, ["s3://x"]).status_code == 201
+
+    response = _upload_batch(client, headers, files * 2, ["s3://x"])
+
+    assert response.status_code == 201, response.text
+    assert _ref_count(session_factory, content) == 3
+
+
+def test_batch_upload_rejects_mismatched_uris(client, make_user):
+    _, headers = make_user()
+    files = [(f"{name}.txt", name.encode(), "text/plain") for name in ("a", "b", "c")]
+
+    response = _upload_batch(client, headers, files, ["s3://a", "s3://b"])
+
+    assert response.status_code == 400
+    assert client.get("/documents", headers=headers).json()["items"] == []
+
+
+def test_export_streams_a_zip_of_the_requested_documents(client, make_user):
+    _, headers = make_user()
+    files = [
+        ("notes.txt", b"plain text " * 200, "text/plain"),
+        ("../../escape.bin", os.urandom(1000), "application/octet-stream"),
+    ]
+    documents = _upload_batch(client, headers, files, ["s3://export"]).json()
+    ids = [document["id"] for document in documents]
+
+    response = client.post("/documents/export", json={"ids": ids}, headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.testzip() is None
+    assert archive.namelist() == [f"{ids[0]}-notes.txt", f"{ids[1]}-escape.bin"]
+    assert archive.read(f"{ids[0]}-notes.txt") == files[0][1]
+    assert archive.read(f"{ids[1]}-escape.bin") == files[1][1]
+
+
+def test_export_of_an_unknown_document_is_not_found(client, make_user):
+    _, headers = make_user()
+    uploaded = _upload_batch(client, headers, [("a.txt", b"a", "text/plain")], ["s3://a"])
+    existing = uploaded.json()[0]["id"]
+
+    response = client.post("/documents/export", json={"ids": [existing, 10**9]}, headers=headers)
+
+    assert response.status_code == 404
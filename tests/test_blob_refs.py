@@ -0,0 +1,100 @@
+import hashlib
+import os
+
+from models import Blob, Document
+from repositories.blob_repository import BlobRepository
+from services.blob_service import BlobService
+from storage.blob_store import get_blob_store
+
+
+def _upload(client, headers, content):
+    response = client.post(
+        "/documents",
+        files={"file": ("doc.bin", content, "application/octet-stream")},
+        data={"uri": "s3://bucket/doc"},
+        headers=headers,
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def _blob(session_factory, key):
+    with session_factory() as session:
+        return session.get(Blob, key)
+
+
+def _collect_garbage(session_factory):
+    with session_factory() as session:
+        service = BlobService(session, BlobRepository(session), get_blob_store())
+        return service.collect_garbage(grace_seconds=0, batch_size=100)
+
+
+def test_identical_uploads_share_one_blob(client, make_user, session_factory):
+    _, alice = make_user()
+    _, bob = make_user()
+    content = os.urandom(1000)
+    key = hashlib.sha256(content).hexdigest()
+
+    first = _upload(client, alice, content)
+    second = _upload(client, bob, content)
+
+    assert _blob(session_factory, key).ref_count == 2
+    with session_factory() as session:
+        keys = {session.get(Document, document_id).blob_key for document_id in (first, second)}
+    assert keys == {key}
+    assert get_blob_store().exists(key)
+
+
+def test_blob_is_collected_only_after_its_last_reference_is_released(
+    client, make_user, session_factory
+):
+    _, headers = make_user()
+    content = os.urandom(1000)
+    key = hashlib.sha256(content).hexdigest()
+    first = _upload(client, headers, content)
+    second = _upload(client, headers, content)
+
+    assert client.delete(f"/documents/{first}", headers=headers).status_code == 204
+    _collect_garbage(session_factory)
+    blob = _blob(session_factory, key)
+    assert (blob.ref_count, blob.released_at) == (1, None)
+    assert client.get(f"/documents/{second}", headers=headers).content == content
+
+    assert client.delete(f"/documents/{second}", headers=headers).status_code == 204
+    blob = _blob(session_factory, key)
+    assert blob.ref_count == 0
+    assert blob.released_at is not None
+
+    assert _collect_garbage(session_factory) >= 1
+    assert _blob(session_factory, key) is None
+    assert not get_blob_store().exists(key)
+
+
+def test_released_blob_is_reused_by_a_new_upload(client, make_user, session_factory):
+    _, headers = make_user()
+    content = os.urandom(1000)
+    key = hashlib.sha256(content).hexdigest()
+    document_id = _upload(client, headers, content)
+    assert client.delete(f"/documents/{document_id}", headers=headers).status_code == 204
+
+    document_id = _upload(client, headers, content)
+
+    blob = _blob(session_factory, key)
+    assert (blob.ref_count, blob.released_at) == (1, None)
+    _collect_garbage(session_factory)
+    assert client.get(f"/documents/{document_id}", headers=headers).content == content
+
+
+def test_collected_blob_is_recreated_by_a_later_upload(client, make_user, session_factory):
+    _, headers = make_user()
+    content = os.urandom(1000)
+    key = hashlib.sha256(content).hexdigest()
+    document_id = _upload(client, headers, content)
+    assert client.delete(f"/documents/{document_id}", headers=headers).status_code == 204
+    _collect_garbage(session_factory)
+    assert _blob(session_factory, key) is None
+
+    document_id = _upload(client, headers, content)
+
+    assert _blob(session_factory, key).ref_count == 1
+    assert client.get(f"/documents/{document_id}", headers=headers).content == content
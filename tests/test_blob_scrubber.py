@@ -0,0 +1,123 @@
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from models import Blob, ScrubCursor
+from repositories.blob_repository import BlobRepository
+from services import blob_scrubber
+from services.blob_scrubber import BlobScrubber
+from storage.blob_store import LocalBlobStore
+
+CHUNK_SIZE = 4096
+
+
+@pytest.fixture
+def scrub_session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'scrub.db'}", future=True)
+    Blob.__table__.create(engine)
+    ScrubCursor.__table__.create(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False, future=True)
+
+
+class ObservedBlobStore(LocalBlobStore):
+    # runs a callback before every chunk, i.e. while the scrubber is mid-read
+    def __init__(self, root, on_chunk):
+        super().__init__(root)
+        self._on_chunk = on_chunk
+
+    def iter_chunks(self, key, chunk_size):
+        for chunk in super().iter_chunks(key, chunk_size):
+            self._on_chunk()
+            yield chunk
+
+
+def _store_blob(session_factory, store, content):
+    key = hashlib.sha256(content).hexdigest()
+    staged = store.stage()
+    staged.file.write(content)
+    store.commit(staged, key)
+    with session_factory() as session:
+        session.add(Blob(key=key, size_bytes=len(content), ref_count=1))
+        session.commit()
+    return key
+
+
+def _steal_lease(session_factory, *, force=False):
+    with session_factory() as session:
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(hours=1)
+        if force:
+            session.execute(
+                update(ScrubCursor).values(lease_owner="intruder", lease_expires_at=expires_at)
+            )
+            session.commit()
+            return True
+        repository = BlobRepository(session)
+        taken = repository.acquire_scrub_lease("background", "intruder", now, expires_at)
+        session.rollback()
+        return taken
+
+
+def _blob(session_factory, key):
+    with session_factory() as session:
+        return session.get(Blob, key)
+
+
+def test_lease_is_renewed_while_a_long_blob_is_read(scrub_session_factory, tmp_path, monkeypatch):
+    # reading the blob takes about three leases' worth of time
+    monkeypatch.setattr(blob_scrubber, "LEASE_SECONDS", 0.6)
+    bytes_per_second = 32 * 1024
+    content = os.urandom(2 * bytes_per_second)
+    stolen = []
+    store = ObservedBlobStore(
+        tmp_path / "blobs", lambda: stolen.append(_steal_lease(scrub_session_factory))
+    )
+    key = _store_blob(scrub_session_factory, store, content)
+    scrubber = BlobScrubber(
+        scrub_session_factory,
+        store,
+        batch_size=10,
+        bytes_per_second=bytes_per_second,
+        chunk_size=CHUNK_SIZE,
+    )
+
+    assert scrubber.run_once() == 1
+
+    assert len(stolen) == len(content) // CHUNK_SIZE
+    assert not any(stolen)
+    assert _blob(scrub_session_factory, key).verified_at is not None
+
+
+def test_run_stops_when_the_lease_is_lost(scrub_session_factory, tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_scrubber, "LEASE_SECONDS", 0)
+    store = ObservedBlobStore(
+        tmp_path / "blobs", lambda: _steal_lease(scrub_session_factory, force=True)
+    )
+    key = _store_blob(scrub_session_factory, store, os.urandom(3 * CHUNK_SIZE))
+    scrubber = BlobScrubber(
+        scrub_session_factory, store, batch_size=10, bytes_per_second=0, chunk_size=CHUNK_SIZE
+    )
+
+    assert scrubber.run_once() == 0
+
+    assert _blob(scrub_session_factory, key).verified_at is None
+
+
+def test_mismatching_blob_is_marked_corrupt(scrub_session_factory, tmp_path):
+    store = LocalBlobStore(tmp_path / "blobs")
+    key = _store_blob(scrub_session_factory, store, b"original content")
+    with open(store.local_path(key), "wb") as handle:
+        handle.write(b"bit-rotted content")
+    scrubber = BlobScrubber(
+        scrub_session_factory, store, batch_size=10, bytes_per_second=0, chunk_size=CHUNK_SIZE
+    )
+
+    assert scrubber.run_once() == 1
+
+    blob = _blob(scrub_session_factory, key)
+    assert blob.corrupt_at is not None
+    assert blob.verified_at is None
@@ -0,0 +1,84 @@
+import hashlib
+import os
+
+import pytest
+
+
+@pytest.fixture
+def document(client, make_user):
+    _, headers = make_user()
+    content = os.urandom(2000)
+    response = client.post(
+        "/documents",
+        files={"file": ("doc.bin", content, "application/octet-stream")},
+        data={"uri": "s3://bucket/doc"},
+        headers=headers,
+    )
+    assert response.status_code == 201, response.text
+    return f"/documents/{response.json()['id']}", headers, content
+
+
+def test_downloads_carry_a_strong_etag_from_the_content_hash(client, document):
+    url, headers, content = document
+
+    response = client.get(url, headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["etag"] == f'"{hashlib.sha256(content).hexdigest()}"'
+    assert "last-modified" in response.headers
+    head = client.head(url, headers=headers)
+    assert head.headers["etag"] == response.headers["etag"]
+
+
+@pytest.mark.parametrize("template", ["{etag}", "W/{etag}", '"other", {etag}', "*"])
+def test_matching_if_none_match_gets_304(client, document, template):
+    url, headers, _ = document
+    etag = client.get(url, headers=headers).headers["etag"]
+
+    response = client.get(url, headers={**headers, "If-None-Match": template.format(etag=etag)})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_changed_etag_gets_the_full_body(client, document):
+    url, headers, content = document
+
+    response = client.get(url, headers={**headers, "If-None-Match": '"stale"'})
+
+    assert response.status_code == 200
+    assert response.content == content
+
+
+def test_if_modified_since(client, document):
+    url, headers, content = document
+    last_modified = client.get(url, headers=headers).headers["last-modified"]
+
+    unchanged = client.get(url, headers={**headers, "If-Modified-Since": last_modified})
+    older = client.get(
+        url, headers={**headers, "If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}
+    )
+
+    assert unchanged.status_code == 304
+    assert older.status_code == 200
+    assert older.content == content
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since(client, document):
+    url, headers, _ = document
+    last_modified = client.get(url, headers=headers).headers["last-modified"]
+
+    response = client.get(
+        url, headers={**headers, "If-None-Match": '"stale"', "If-Modified-Since": last_modified}
+    )
+
+    assert response.status_code == 200
+
+
+def test_revalidation_still_requires_access(client, document, make_user):
+    url, headers, _ = document
+    etag = client.get(url, headers=headers).headers["etag"]
+    _, other = make_user()
+
+    assert client.get(url, headers={**other, "If-None-Match": etag}).status_code == 404
@@ -0,0 +1,84 @@
+import hashlib
+import uuid
+from datetime import datetime, timezone
+
+import manage
+from models import Blob, Document
+
+
+def _upload(client, headers, content=b"hello world", uri="s3://bucket/doc"):
+    response = client.post(
+        "/documents",
+        files={"file": ("doc.txt", content, "text/plain")},
+        data={"uri": uri},
+        headers=headers,
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_documents_of_other_users_are_not_found(client, make_user):
+    _, owner = make_user()
+    _, other = make_user()
+    document_id = _upload(client, owner)
+
+    assert client.get(f"/documents/{document_id}", headers=owner).status_code == 200
+    assert client.get(f"/documents/{document_id}", headers=other).status_code == 404
+    assert client.get(f"/documents/{document_id}/meta", headers=other).status_code == 404
+    export = client.post("/documents/export", json={"ids": [document_id]}, headers=other)
+    assert export.status_code == 404
+    assert client.get("/documents", headers=other).json()["items"] == []
+    assert client.delete(f"/documents/{document_id}", headers=other).status_code == 404
+    assert client.get(f"/documents/{document_id}/meta", headers=owner).status_code == 200
+
+
+def test_usage_follows_uploads_and_deletes(client, make_user):
+    _, headers = make_user()
+    document_id = _upload(client, headers, content=b"x" * 100)
+    _upload(client, headers, content=b"y" * 50)
+
+    usage = client.get("/users/me/usage", headers=headers).json()
+    assert (usage["document_count"], usage["total_bytes"]) == (2, 150)
+
+    assert client.delete(f"/documents/{document_id}", headers=headers).status_code == 204
+    usage = client.get("/users/me/usage", headers=headers).json()
+    assert (usage["document_count"], usage["total_bytes"]) == (1, 50)
+
+
+def _legacy_document(session_factory, uri):
+    content = uuid.uuid4().bytes
+    key = hashlib.sha256(content).hexdigest()
+    with session_factory() as session:
+        now = datetime.now(timezone.utc)
+        session.add(Blob(key=key, size_bytes=len(content), ref_count=1, created_at=now))
+        document = Document(
+            filename="legacy.bin",
+            mime_type="application/octet-stream",
+            uri=uri,
+            blob_key=key,
+            size_bytes=len(content),
+        )
+        session.add(document)
+        session.commit()
+        return document.id
+
+
+def test_migrate_fails_until_legacy_documents_have_owners(client, make_user, session_factory):
+    alice, alice_headers = make_user()
+    bob, _ = make_user()
+    prefix = f"s3://{uuid.uuid4().hex}/"
+    alices = _legacy_document(session_factory, f"{prefix}alice/report.pdf")
+    _legacy_document(session_factory, f"{prefix}bob/report.pdf")
+
+    assert client.get(f"/documents/{alices}/meta", headers=alice_headers).status_code == 404
+    assert manage.main(["migrate"]) == 1
+    assert manage.main(["migrate", "--allow-unowned"]) == 0
+
+    assert manage.main(["assign-owner", alice.username, "--uri-prefix", f"{prefix}alice/"]) == 0
+    assert manage.main(["migrate"]) == 1
+    assert manage.main(["assign-owner", bob.username]) == 0
+    assert manage.main(["migrate"]) == 0
+
+    assert client.get(f"/documents/{alices}/meta", headers=alice_headers).status_code == 200
+    usage = client.get("/users/me/usage", headers=alice_headers).json()
+    assert usage["document_count"] == 1
@@ -0,0 +1,57 @@
+import pytest
+
+from core.http_caching import (
+    RangeNotSatisfiableError,
+    if_range_matches,
+    iter_byte_range,
+    parse_range,
+)
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("bytes=0-4", (0, 4)),
+        ("bytes=5-", (5, 9)),
+        ("bytes=-3", (7, 9)),
+        ("bytes=8-100", (8, 9)),
+        ("bytes=3-1", None),
+        ("bytes=0-1,5-6", None),
+        ("items=0-1", None),
+        ("bytes=a-3", None),
+    ],
+)
+def test_parse_range(header, expected):
+    assert parse_range(header, 10) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=10-", "bytes=-0"])
+def test_unsatisfiable_range(header):
+    with pytest.raises(RangeNotSatisfiableError, match=r"bytes \*/10"):
+        parse_range(header, 10)
+
+
+@pytest.mark.parametrize("start, end", [(0, 9), (2, 5), (3, 3), (9, 9)])
+def test_iter_byte_range_slices_across_chunks(start, end):
+    chunks = [b"abc", b"defg", b"hij"]
+    assert b"".join(iter_byte_range(chunks, start, end)) == b"abcdefghij"[start : end + 1]
+
+
+def test_iter_byte_range_stops_reading_after_the_range():
+    consumed = []
+
+    def chunks():
+        for chunk in (b"abc", b"def", b"ghi"):
+            consumed.append(chunk)
+            yield chunk
+
+    assert b"".join(iter_byte_range(chunks(), 1, 4)) == b"bcde"
+    assert consumed == [b"abc", b"def"]
+
+
+def test_if_range_requires_a_strong_etag_match():
+    etag = '"abc"'
+    assert if_range_matches({}, etag=etag, last_modified=None)
+    assert if_range_matches({"if-range": '"abc"'}, etag=etag, last_modified=None)
+    assert not if_range_matches({"if-range": 'W/"abc"'}, etag=etag, last_modified=None)
+    assert not if_range_matches({"if-range": '"old"'}, etag=etag, last_modified=None)
@@ -0,0 +1,35 @@
+from core.config import get_settings
+
+
+def _families(text):
+    return {
+        line.split()[2]: line.split()[3] for line in text.splitlines() if line.startswith("# TYPE")
+    }
+
+
+def test_pool_checkout_wait_and_connection_age_are_exported(client):
+    client.get("/health")
+
+    text = client.get("/metrics").text
+
+    families = _families(text)
+    assert families["db_pool_checkout_wait_seconds"] == "histogram"
+    assert families["db_pool_checkouts_total"] == "counter"
+    for gauge in (
+        "db_pool_connections",
+        "db_pool_connection_age_max_seconds",
+        "db_pool_connection_age_avg_seconds",
+    ):
+        assert families[gauge] == "gauge"
+    assert 'db_pool_checkout_wait_seconds_bucket{pool="primary",le="+Inf"}' in text
+    assert 'db_pool_checkout_wait_seconds_count{pool="primary"}' in text
+
+
+def test_metrics_token_is_required_when_configured(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "metrics_token", "scrape-secret")
+
+    assert client.get("/metrics").status_code == 401
+    wrong = {"Authorization": "Bearer wrong"}
+    assert client.get("/metrics/db-pool", headers=wrong).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
@@ -0,0 +1,71 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from core.security import generate_refresh_token_value, hash_refresh_token_value
+from repositories.refresh_token_repository import RefreshTokenRepository
+from repositories.user_repository import UserRepository
+from services.auth_service import AuthService, RefreshTokenError
+
+
+def _issue(session_factory, user_id, *, expires_in=timedelta(hours=1)):
+    value = generate_refresh_token_value()
+    with session_factory() as session:
+        RefreshTokenRepository(session).insert(
+            token_hash=hash_refresh_token_value(value),
+            user_id=user_id,
+            expires_at=datetime.now(timezone.utc) + expires_in,
+        )
+        session.commit()
+    return value
+
+
+def _refresh(session_factory, value):
+    with session_factory() as session:
+        service = AuthService(session, UserRepository(session), RefreshTokenRepository(session))
+        return service.refresh(value)
+
+
+def test_refresh_rotates_the_token(session_factory, user_id):
+    value = _issue(session_factory, user_id)
+
+    result = _refresh(session_factory, value)
+
+    assert result.user.id == user_id
+    assert result.tokens.refresh_token != value
+    with pytest.raises(RefreshTokenError):
+        _refresh(session_factory, value)
+    assert _refresh(session_factory, result.tokens.refresh_token).user.id == user_id
+
+
+def test_expired_refresh_token_is_rejected(session_factory, user_id):
+    value = _issue(session_factory, user_id, expires_in=timedelta(seconds=-1))
+    with pytest.raises(RefreshTokenError):
+        _refresh(session_factory, value)
+
+
+def test_concurrent_refreshes_of_one_token_succeed_once(session_factory, user_id):
+    value = _issue(session_factory, user_id)
+    workers = 8
+    barrier = threading.Barrier(workers)
+    successes, rejections, errors = [], [], []
+
+    def refresh():
+        barrier.wait()
+        try:
+            successes.append(_refresh(session_factory, value))
+        except RefreshTokenError:
+            rejections.append(1)
+        except Exception as exc:  # noqa: BLE001 reported by the assertion below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=refresh) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(successes) == 1
+    assert len(rejections) == workers - 1
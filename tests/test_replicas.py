@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.replicas import Replica, ReplicaSet, RoutingSession, read_from_replica
+from models import User
+from repositories.user_repository import UserRepository
+
+
+def _database(path, *usernames):
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    User.__table__.create(engine)
+    with engine.begin() as connection:
+        for username in usernames:
+            connection.execute(User.__table__.insert().values(username=username, password_hash="x"))
+    return engine
+
+
+@pytest.fixture
+def primary(tmp_path):
+    return _database(tmp_path / "primary.db", "alice", "written-after-replication")
+
+
+@pytest.fixture
+def replica_engine(tmp_path):
+    # stands in for a replica that has not replayed the newest row yet
+    return _database(tmp_path / "replica.db", "alice", "only-on-replica")
+
+
+def _session_factory(primary, replicas):
+    return sessionmaker(
+        bind=primary,
+        class_=RoutingSession,
+        replicas=replicas,
+        autoflush=False,
+        expire_on_commit=False,
+        future=True,
+    )
+
+
+def _find(session, username):
+    return read_from_replica(session, UserRepository(session).get_by_username, username)
+
+
+def test_reads_are_served_by_the_replica(primary, replica_engine):
+    replicas = ReplicaSet([Replica("replica_1", replica_engine, replica_engine)], max_lag_seconds=5)
+    with _session_factory(primary, replicas)() as session:
+        assert _find(session, "only-on-replica") is not None
+
+
+def test_rows_missing_on_the_replica_are_read_from_the_primary(primary, replica_engine):
+    replicas = ReplicaSet([Replica("replica_1", replica_engine, replica_engine)], max_lag_seconds=5)
+    with _session_factory(primary, replicas)() as session:
+        assert _find(session, "written-after-replication") is not None
+
+
+def test_reads_after_a_write_stay_on_the_primary(primary, replica_engine):
+    replicas = ReplicaSet([Replica("replica_1", replica_engine, replica_engine)], max_lag_seconds=5)
+    with _session_factory(primary, replicas)() as session:
+        session.add(User(username="bob", password_hash="x"))
+        session.flush()
+        assert _find(session, "bob") is not None
+        assert _find(session, "only-on-replica") is None
+
+
+def test_unreachable_replica_fails_over_to_the_primary(primary, tmp_path):
+    broken = create_engine(f"sqlite:///{tmp_path}/missing/replica.db", future=True)
+    replica = Replica("replica_1", broken, broken)
+    replicas = ReplicaSet([replica], max_lag_seconds=5)
+    with _session_factory(primary, replicas)() as session:
+        assert _find(session, "alice") is not None
+    assert not replica.healthy
+    assert replica.last_error
+    assert replicas.choose() is None
+
+
+def test_health_check_returns_a_recovered_replica_to_rotation(primary, replica_engine):
+    replica = Replica("replica_1", replica_engine, replica_engine)
+    replicas = ReplicaSet([replica], max_lag_seconds=5)
+    replicas.mark_unavailable(replica, RuntimeError("connection refused"))
+    assert replicas.choose() is None
+
+    replicas.check()
+
+    assert replica.healthy
+    assert replica.lag_seconds == 0.0
+    assert replicas.choose() is replica
+
+
+def test_reads_rotate_across_healthy_replicas(replica_engine):
+    first = Replica("replica_1", replica_engine, replica_engine)
+    second = Replica("replica_2", replica_engine, replica_engine)
+    replicas = ReplicaSet([first, second], max_lag_seconds=5)
+    assert {replicas.choose().name for _ in range(4)} == {"replica_1", "replica_2"}
+
+    replicas.mark_unavailable(second, RuntimeError("gone"))
+    assert {replicas.choose().name for _ in range(4)} == {"replica_1"}
@@ -0,0 +1,32 @@
+import asyncio
+import threading
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from database import current_async_session, run_db
+
+
+def test_run_db_uses_the_threadpool_without_an_async_session():
+    caller = threading.get_ident()
+
+    assert asyncio.run(run_db(threading.get_ident)) != caller
+
+
+def test_run_db_runs_sync_code_on_the_request_async_session(tmp_path):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+        try:
+            async with AsyncSession(engine) as async_session:
+                token = current_async_session.set(async_session)
+                try:
+                    # sync Session calls only work inside run_sync's greenlet
+                    return await run_db(
+                        lambda: async_session.sync_session.execute(text("SELECT 42")).scalar()
+                    )
+                finally:
+                    current_async_session.reset(token)
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(scenario()) == 42
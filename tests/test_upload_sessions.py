@@ -0,0 +1,99 @@
+import os
+
+from core.config import get_settings
+from storage.part_store import get_part_store
+
+
+def _create(client, headers):
+    response = client.post(
+        "/uploads", json={"filename": "big.bin", "uri": "s3://bucket/big.bin"}, headers=headers
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def _put(client, headers, upload_id, part_number, content):
+    return client.put(f"/uploads/{upload_id}/parts/{part_number}", content=content, headers=headers)
+
+
+def test_parts_are_assembled_into_one_document(client, make_user):
+    _, headers = make_user()
+    upload_id = _create(client, headers)
+    parts = [os.urandom(3000), os.urandom(2000)]
+    # parts may arrive out of order and be retried
+    assert _put(client, headers, upload_id, 2, parts[1]).status_code == 200
+    assert _put(client, headers, upload_id, 1, b"dropped connection").status_code == 200
+    assert _put(client, headers, upload_id, 1, parts[0]).status_code == 200
+
+    response = client.post(f"/uploads/{upload_id}/complete", headers=headers)
+
+    assert response.status_code == 201, response.text
+    document_id = response.json()["id"]
+    meta = client.get(f"/documents/{document_id}/meta", headers=headers).json()
+    assert meta["size_bytes"] == 5000
+    assert client.get(f"/documents/{document_id}", headers=headers).content == b"".join(parts)
+    assert client.get(f"/uploads/{upload_id}", headers=headers).status_code == 404
+
+
+def test_completion_requires_contiguous_parts(client, make_user):
+    _, headers = make_user()
+    upload_id = _create(client, headers)
+    assert _put(client, headers, upload_id, 2, b"second").status_code == 200
+
+    assert client.post(f"/uploads/{upload_id}/complete", headers=headers).status_code == 400
+    assert _put(client, headers, upload_id, 1, b"first").status_code == 200
+    assert client.post(f"/uploads/{upload_id}/complete", headers=headers).status_code == 201
+
+
+def test_sessions_are_private_to_their_user(client, make_user):
+    _, owner = make_user()
+    _, other = make_user()
+    upload_id = _create(client, owner)
+
+    assert client.get(f"/uploads/{upload_id}", headers=other).status_code == 404
+    assert _put(client, other, upload_id, 1, b"intruder").status_code == 404
+    assert client.delete(f"/uploads/{upload_id}", headers=other).status_code == 404
+    assert client.delete(f"/uploads/{upload_id}", headers=owner).status_code == 204
+    assert _put(client, owner, upload_id, 1, b"late").status_code == 404
+
+
+def test_parts_beyond_the_size_limit_are_rejected(client, make_user, monkeypatch):
+    monkeypatch.setattr(get_settings(), "max_upload_size_bytes", 100)
+    _, headers = make_user()
+    upload_id = _create(client, headers)
+
+    assert _put(client, headers, upload_id, 1, b"x" * 60).status_code == 200
+    assert _put(client, headers, upload_id, 2, b"x" * 60).status_code == 413
+    # replacing a part only counts its new size
+    assert _put(client, headers, upload_id, 1, b"x" * 40).status_code == 200
+    assert _put(client, headers, upload_id, 2, b"x" * 60).status_code == 200
+
+
+def test_failed_completion_closes_parts_and_reopens_the_session(client, make_user, monkeypatch):
+    _, headers = make_user()
+    upload_id = _create(client, headers)
+    for part_number in (1, 2):
+        assert _put(client, headers, upload_id, part_number, b"x" * 5000).status_code == 200
+
+    part_store = get_part_store()
+    iter_chunks = part_store.iter_chunks
+    opened, closed = [], []
+
+    def tracked(upload, part_number, chunk_size):
+        opened.append(part_number)
+        try:
+            yield from iter_chunks(upload, part_number, chunk_size)
+            # the last part file grew on disk; assembly stops at the size limit
+            while part_number == 2:
+                yield b"x" * chunk_size
+        finally:
+            closed.append(part_number)
+
+    monkeypatch.setattr(part_store, "iter_chunks", tracked)
+    monkeypatch.setattr(get_settings(), "upload_chunk_size", 1000)
+    monkeypatch.setattr(get_settings(), "max_upload_size_bytes", 12000)
+
+    assert client.post(f"/uploads/{upload_id}/complete", headers=headers).status_code == 413
+    assert opened == [1, 2]
+    assert closed == [1, 2]
+    assert client.get(f"/uploads/{upload_id}", headers=headers).json()["status"] == "open"
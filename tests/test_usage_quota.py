@@ -0,0 +1,63 @@
+import threading
+
+from repositories.usage_repository import UsageRepository
+
+
+def _reserve_concurrently(session_factory, user_id, workers, **kwargs):
+    barrier = threading.Barrier(workers)
+    results, errors = [], []
+
+    def reserve():
+        barrier.wait()
+        try:
+            with session_factory() as session:
+                reserved = UsageRepository(session).reserve(user_id, **kwargs)
+                session.commit()
+            results.append(reserved)
+        except Exception as exc:  # noqa: BLE001 reported by the assertion below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=reserve) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    return results
+
+
+def _usage(session_factory, user_id):
+    with session_factory() as session:
+        usage = UsageRepository(session).get(user_id)
+        return usage.document_count, usage.total_bytes
+
+
+def test_concurrent_reservations_never_exceed_the_document_quota(session_factory, user_id):
+    # no usage row exists yet, so the workers also race to create it
+    results = _reserve_concurrently(
+        session_factory, user_id, 12, documents=1, size_bytes=10, max_documents=5
+    )
+
+    assert results.count(True) == 5
+    assert _usage(session_factory, user_id) == (5, 50)
+
+
+def test_concurrent_reservations_never_exceed_the_byte_quota(session_factory, user_id):
+    results = _reserve_concurrently(
+        session_factory, user_id, 10, documents=1, size_bytes=300, max_bytes=1000
+    )
+
+    assert results.count(True) == 3
+    assert _usage(session_factory, user_id) == (3, 900)
+
+
+def test_released_usage_can_be_reserved_again(session_factory, user_id):
+    with session_factory() as session:
+        usage = UsageRepository(session)
+        assert usage.reserve(user_id, 1, 600, max_bytes=1000)
+        assert not usage.reserve(user_id, 1, 600, max_bytes=1000)
+        usage.release(user_id, 1, 600)
+        assert usage.reserve(user_id, 1, 600, max_bytes=1000)
+        session.commit()
+
+    assert _usage(session_factory, user_id) == (1, 600)